@@ -0,0 +1,98 @@
+"""
+Native async read endpoints, served under /api/async/ next to the
+regular viewsets.
+
+Under ASGI a sync viewset costs a sync_to_async() hop per request, and a
+slow client holds one of the few threads that run them. These views run
+in the event loop instead:
+
+    auth     StatelessJWTAuthentication, the token checked as usual and the
+             user resolved from it, or read with the async ORM
+    reads    the compiled fast path (apps/core/fastpath.py): rows come from
+             aiterator(), counts from acount(), single rows from afirst()
+    output   the same JSON, errors included, as the sync endpoint with the
+             same query string; it goes through the same exception handler
+
+Only GET: writes, ETags / 304 and anything else stay on the viewsets.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from apps.users.authentication import StatelessJWTAuthentication
+from .fastpath import compile_serializer
+
+
+class AsyncReadView(View):
+    """
+    Base class: authenticates, wraps the request so serializers and
+    paginators see a DRF Request, and turns API exceptions into the usual
+    JSON errors. Subclasses define `action` ('list' / 'retrieve', read by
+    DynamicFieldsMixin) and an async get().
+    """
+    http_method_names = ['get', 'head', 'options']
+    serializer_class = None
+    action = None
+    authentication = StatelessJWTAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request)
+        self.request = request
+        try:
+            auth = await self.authenticate(request)
+            if auth is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = auth
+            return await super().dispatch(request, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            return self.handle_exception(exc)
+
+    async def authenticate(self, request):
+        return await self.authentication.aauthenticate(request)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authentication.authenticate_header(self.request)
+            exc.status_code = 401
+        handler = api_settings.EXCEPTION_HANDLER
+        response = handler(exc, {'view': self, 'request': self.request, 'args': self.args, 'kwargs': self.kwargs})
+        if response is None:
+            raise exc
+        rendered = self.render(response.data, status=response.status_code)
+        # WWW-Authenticate, Retry-After...; the unrendered Response's own Content-Type isn't real
+        for header, value in response.items():
+            if header.lower() != 'content-type':
+                rendered[header] = value
+        return rendered
+
+    def render(self, data, status=200):
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+    # ----------------------------
+    # SERIALIZERS
+    # ----------------------------
+    def get_serializer(self, *args, **kwargs):
+        kwargs['context'] = {'request': self.request, 'format': None, 'view': self}
+        return self.serializer_class(*args, **kwargs)
+
+    def get_compiled_serializer(self):
+        return compile_serializer(self.get_serializer())
+
+    def rows(self, compiled, queryset, extra=()):
+        """Compiled rows, or the model instances when the serializer doesn't compile."""
+        return compiled.rows(queryset, extra) if compiled is not None else queryset
+
+    async def serialize(self, compiled, rows, many=True):
+        if compiled is not None:
+            data = await compiled.arender(rows if many else [rows])
+            return data if many else data[0]
+        # rare (see compile_serializer): the serializer may lazy-load, give it a thread
+        return await sync_to_async(lambda: self.get_serializer(rows, many=many).data)()
+
+    async def paginated(self, queryset, compiled, extra=()):
+        page = await self.paginator.apaginate_queryset(self.rows(compiled, queryset, extra), self.request, view=self)
+        return self.render(self.paginator.get_paginated_response(await self.serialize(compiled, page)).data)
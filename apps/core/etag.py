@@ -0,0 +1,68 @@
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Weak ETags for list and retrieve, computed from version counters
+    before the real query runs. A matching If-None-Match gets an empty
+    304 and the list/retrieve handler is never called.
+
+    Views implement get_list_versions(); retrieve reads `version_lookup`
+    from the object's row (no row -> no ETag, the normal 404 path runs).
+    """
+    version_lookup = 'version'
+
+    def get_list_versions(self):
+        raise NotImplementedError
+
+    def get_object_versions(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().prefetch_related(None).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        try:
+            return list(queryset.values_list(self.version_lookup, flat=True)[:1]) or None
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def get_etag(self, request):
+        if self.action == 'list':
+            versions = self.get_list_versions()
+        elif self.action == 'retrieve':
+            versions = self.get_object_versions()
+        else:
+            return None
+        if versions is None:
+            return None
+
+        key = [
+            type(self).__name__, request.user.pk, request.get_full_path(),
+            request.accepted_media_type, list(versions),
+        ]
+        digest = hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+        return 'W/"%s"' % digest
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is not None:
+            # weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+            presented = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+            if '*' in presented or etag.removeprefix('W/') in presented:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
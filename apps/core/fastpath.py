@@ -0,0 +1,329 @@
+"""
+Compiled read path for list/retrieve.
+
+compile_serializer() walks a (possibly pruned) serializer once per request
+and turns it into a flat list of values_list() columns plus one converter
+per output key. Pages are then fetched as named tuples and rendered into
+plain dicts without instantiating serializers per row; many=True relations
+cost one extra query per page. Anything the compiler does not understand
+(method fields, source='*', custom relations) makes it return None, and the
+caller falls back to the regular serializer.
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db.models import ManyToManyField
+from django.db.models.fields.files import FieldFile
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.permissions import BasePermission
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+from .prefetch import _relation
+
+SCALAR, NESTED, MANY = 0, 1, 2
+
+
+class _Query:
+    """Columns fetched by one values_list() query."""
+
+    def __init__(self):
+        self.columns = []
+        self.index = {}
+        self.many = []
+
+    def column(self, path):
+        if path not in self.index:
+            self.index[path] = len(self.columns)
+            self.columns.append(path)
+        return self.index[path]
+
+
+class _Many:
+    """A many=True relation, loaded for a whole page with one query."""
+
+    def __init__(self, model, key_path, order_by, query, slots, value_index):
+        self.model = model
+        self.key_path = key_path
+        self.order_by = order_by
+        self.query = query
+        self.slots = slots
+        self.value_index = value_index
+
+    def fetch(self, keys, named=False):
+        return self.model._default_manager.filter(
+            **{'%s__in' % self.key_path: keys}
+        ).order_by(*self.order_by).values_list(*self.query.columns, named=named)
+
+
+# ----------------------------
+# CONVERTERS
+# ----------------------------
+def _converter(field, model_field):
+    kind = type(field)
+    if kind is serializers.CharField:
+        return str
+    if kind is serializers.IntegerField:
+        return int
+    if kind is serializers.BooleanField:
+        return bool
+    if kind is serializers.ChoiceField:
+        choices = field.choice_strings_to_values
+        return lambda value: choices.get(str(value), value)
+    if isinstance(field, serializers.FileField):
+        return lambda name: field.to_representation(FieldFile(None, model_field, name))
+    return field.to_representation
+
+
+def _concrete_field(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except Exception:
+        return None
+    if not getattr(field, 'concrete', False) or field.is_relation:
+        return None
+    return field
+
+
+# ----------------------------
+# COMPILER
+# ----------------------------
+def _compile(serializer, model, query, prefix):
+    slots = []
+    for field in serializer._readable_fields:
+        if field.source == '*' or not field.source_attrs:
+            return None
+
+        current, path = model, prefix
+        for attr in field.source_attrs[:-1]:
+            relation = _relation(current, attr)
+            if relation is None or not (relation.many_to_one or relation.one_to_one):
+                return None
+            current, path = relation.related_model, path + attr + '__'
+
+        name = field.source_attrs[-1]
+        relation = _relation(current, name)
+
+        if relation is None:
+            model_field = _concrete_field(current, name)
+            if model_field is None:
+                return None
+            slots.append((SCALAR, field.field_name, query.column(path + name), _converter(field, model_field)))
+
+        elif relation.many_to_many or relation.one_to_many:
+            many = _compile_many(field, relation)
+            if many is None:
+                return None
+            key_index = query.column(path + current._meta.pk.name)
+            query.many.append((key_index, many))
+            slots.append((MANY, field.field_name, key_index, many))
+
+        elif isinstance(field, serializers.Serializer):
+            related = relation.related_model
+            pk_index = query.column(path + name + '__' + related._meta.pk.name)
+            child = _compile(field, related, query, path + name + '__')
+            if child is None:
+                return None
+            slots.append((NESTED, field.field_name, pk_index, child))
+
+        elif isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+            slots.append((SCALAR, field.field_name, query.column(path + name), None))
+
+        else:
+            return None
+
+    return slots
+
+
+def _compile_many(field, relation):
+    if isinstance(field, serializers.ListSerializer):
+        child = field.child
+        if not isinstance(child, serializers.Serializer):
+            return None
+    elif isinstance(field, ManyRelatedField):
+        child = None
+        if not isinstance(field.child_relation, PrimaryKeyRelatedField) or field.child_relation.pk_field:
+            return None
+    else:
+        return None
+
+    target = relation.related_model
+    if relation.many_to_many:
+        # read through the join table, so each row carries the owner key
+        forward = isinstance(relation, ManyToManyField)
+        m2m = relation if forward else relation.field
+        through = m2m.remote_field.through
+        if forward:
+            key_path, target_name = m2m.m2m_field_name(), m2m.m2m_reverse_field_name()
+        else:
+            key_path, target_name = m2m.m2m_reverse_field_name(), m2m.m2m_field_name()
+        model, prefix, order_by = through, target_name + '__', (through._meta.pk.name,)
+    else:
+        key_path = relation.field.name
+        model, prefix = target, ''
+        order_by = tuple(target._meta.ordering) or (target._meta.pk.name,)
+
+    query = _Query()
+    query.column(key_path)
+    value_index = None
+    slots = None
+    if child is None:
+        value_index = query.column(prefix + target._meta.pk.name)
+    else:
+        slots = _compile(child, target, query, prefix)
+        if slots is None:
+            return None
+    return _Many(model, key_path, order_by, query, slots, value_index)
+
+
+# ----------------------------
+# RENDERING
+# ----------------------------
+def _render(row, slots, loaded):
+    data = {}
+    for kind, key, index, payload in slots:
+        value = row[index]
+        if kind == SCALAR:
+            data[key] = value if value is None or payload is None else payload(value)
+        elif kind == NESTED:
+            data[key] = None if value is None else _render(row, payload, loaded)
+        else:
+            data[key] = loaded[id(payload)].get(value, [])
+    return data
+
+
+def _group(many, child_rows, rendered):
+    grouped = defaultdict(list)
+    if many.slots is None:
+        for child in child_rows:
+            grouped[child[0]].append(child[many.value_index])
+    else:
+        for child, data in zip(child_rows, rendered):
+            grouped[child[0]].append(data)
+    return grouped
+
+
+def _keys(rows, key_index):
+    return {row[key_index] for row in rows if row[key_index] is not None}
+
+
+def _load(rows, query):
+    loaded = {}
+    for key_index, many in query.many:
+        keys = _keys(rows, key_index)
+        child_rows = list(many.fetch(keys)) if keys else []
+        rendered = render_rows(child_rows, many.query, many.slots) if many.slots is not None else None
+        loaded[id(many)] = _group(many, child_rows, rendered)
+    return loaded
+
+
+async def _aload(rows, query):
+    loaded = {}
+    for key_index, many in query.many:
+        keys = _keys(rows, key_index)
+        # named: the plain tuple iterable runs its query as soon as it's created, outside aiterator()'s thread
+        child_rows = [child async for child in many.fetch(keys, named=True).aiterator()] if keys else []
+        rendered = await arender_rows(child_rows, many.query, many.slots) if many.slots is not None else None
+        loaded[id(many)] = _group(many, child_rows, rendered)
+    return loaded
+
+
+def render_rows(rows, query, slots):
+    loaded = _load(rows, query) if query.many else {}
+    return [_render(row, slots, loaded) for row in rows]
+
+
+async def arender_rows(rows, query, slots):
+    """render_rows() for async views: the many=True queries go through the async ORM."""
+    loaded = await _aload(rows, query) if query.many else {}
+    return [_render(row, slots, loaded) for row in rows]
+
+
+class CompiledSerializer:
+
+    def __init__(self, query, slots):
+        self.query = query
+        self.slots = slots
+
+    @property
+    def columns(self):
+        return self.query.columns
+
+    def rows(self, queryset, extra=()):
+        """
+        The queryset as named tuples carrying every compiled column plus
+        `extra` (e.g. the ordering keys a cursor is built from).
+        """
+        columns = list(self.query.columns)
+        columns += [name for name in extra if name not in self.query.index]
+        return queryset.prefetch_related(None).values_list(*columns, named=True)
+
+    def render(self, rows):
+        return render_rows(list(rows), self.query, self.slots)
+
+    async def arender(self, rows):
+        return await arender_rows(list(rows), self.query, self.slots)
+
+
+def compile_serializer(serializer):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(serializer, serializers.ModelSerializer):
+        return None
+
+    query = _Query()
+    slots = _compile(serializer, serializer.Meta.model, query, '')
+    if slots is None:
+        return None
+    return CompiledSerializer(query, slots)
+
+
+class CompiledReadMixin:
+    """
+    Serves list and retrieve from compile_serializer() when the serializer
+    compiles; the output is the same JSON the serializer would produce.
+    retrieve() goes the regular way when a permission checks the object:
+    those need the instance, not a row.
+    """
+    compiled_reads = True
+
+    def get_compiled_serializer(self):
+        if not self.compiled_reads:
+            return None
+        return compile_serializer(self.get_serializer())
+
+    def checks_objects(self):
+        return any(type(permission).has_object_permission is not BasePermission.has_object_permission
+                   for permission in self.get_permissions())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        extra = paginator.get_row_fields(request) if hasattr(paginator, 'get_row_fields') else ()
+        rows = compiled.rows(queryset, extra)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.render(page))
+        return Response(compiled.render(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        compiled = None if self.checks_objects() else self.get_compiled_serializer()
+        if compiled is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        not_found = Http404('No %s matches the given query.' % queryset.model._meta.object_name)
+        try:
+            rows = list(compiled.rows(queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})))
+        except (TypeError, ValueError, ValidationError):
+            raise not_found
+        if not rows:
+            raise not_found
+        return Response(compiled.render(rows)[0])
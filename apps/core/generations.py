@@ -0,0 +1,70 @@
+"""
+Cache entries that writes invalidate, safe against a fill that loses the
+race with the write.
+
+Every key has a generation, a random token in a second key. A fill reads
+the generation together with the entry, before it reads the database,
+and stores its value with that generation; invalidate() draws a new one
+right away and once more after commit. An entry is only served while its
+generation is the current one, so a fill that read the database before
+the write can land as late as it likes: nobody reads it.
+
+    value, generation = lookup(key)
+    if value is None:
+        value = ...                      # the database
+        fill(key, generation, value, timeout)
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = '%s:generation'
+
+
+def _entry(key, found):
+    generation, entry = found.get(GENERATION_KEY % key), found.get(key)
+    if generation is not None and entry is not None and entry[0] == generation:
+        return entry[1], generation
+    return None, generation
+
+
+def lookup(key):
+    """(the cached value or None, the generation to fill() a miss with)."""
+    value, generation = _entry(key, cache.get_many([key, GENERATION_KEY % key]))
+    if generation is None:
+        # first use or evicted; if someone else draws one meanwhile, don't fill
+        generation = uuid.uuid4().hex
+        if not cache.add(GENERATION_KEY % key, generation, timeout=None):
+            generation = None
+    return value, generation
+
+
+async def alookup(key):
+    value, generation = _entry(key, await cache.aget_many([key, GENERATION_KEY % key]))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not await cache.aadd(GENERATION_KEY % key, generation, timeout=None):
+            generation = None
+    return value, generation
+
+
+def fill(key, generation, value, timeout):
+    if generation is not None:
+        cache.set(key, (generation, value), timeout)
+
+
+async def afill(key, generation, value, timeout):
+    if generation is not None:
+        await cache.aset(key, (generation, value), timeout)
+
+
+def _draw(keys):
+    cache.set_many({GENERATION_KEY % key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+
+def invalidate(keys):
+    keys = list(keys)
+    if keys:
+        _draw(keys)
+        transaction.on_commit(lambda: _draw(keys))
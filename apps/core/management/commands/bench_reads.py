@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.tasks.models import Task
+from apps.teams.visibility import visible_teams_q
+
+ENDPOINTS = ('tasks', 'task', 'comments', 'projects')
+
+
+# ----------------------------
+# DRIVERS
+# ----------------------------
+def run_wsgi(path, headers, total, concurrency):
+    """
+    One thread per connection, each with its own WSGI client, the way a
+    threaded WSGI server (gunicorn gthread, mod_wsgi) serves them.
+    """
+    counter, latencies, errors = itertools.count(), [], []
+
+    def worker():
+        client = Client(headers=headers)
+        try:
+            while next(counter) < total:
+                start = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def run_asgi(path, headers, total, concurrency):
+    """One coroutine per connection on a single event loop, through Django's ASGI handler."""
+    counter, latencies, errors = itertools.count(), [], []
+
+    async def worker(client):
+        while next(counter) < total:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    async def main():
+        client = AsyncClient(raise_request_exception=False)
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        # the connection of the thread the ORM calls ran in
+        await sync_to_async(connections.close_all)()
+
+    asyncio.run(main())
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks a read endpoint in-process: the viewset under WSGI (a thread per "
+        "connection), the same viewset under ASGI, and the native async view "
+        "(/api/async/...). Prints requests/sec, latency and Python heap per concurrent "
+        "connection. No server or network is involved, only Django's handlers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help="whose token the requests carry")
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='tasks')
+        parser.add_argument('--query', default='', help="query string, e.g. 'page_size=50&expand=project_detail'")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        # the test clients call themselves "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.bench(options)
+
+    def bench(self, options):
+        user = get_user_model().objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError("No user %r." % options['username'])
+        headers = {'Authorization': 'Bearer %s' % AccessToken.for_user(user)}
+
+        sync_path, async_path = self.paths(options['endpoint'], user)
+        if options['query']:
+            sync_path += '?' + options['query']
+            async_path += '?' + options['query']
+        concurrency, total = options['concurrency'], options['requests']
+
+        runs = [
+            ('wsgi', 'viewset', run_wsgi, sync_path),
+            ('asgi', 'viewset', run_asgi, sync_path),
+            ('asgi', 'async view', run_asgi, async_path),
+        ]
+        self.stdout.write(f"{total} requests, {concurrency} concurrent connections\n")
+        self.stdout.write(f"{'':<5} {'':<11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'KiB/conn':>9}  path")
+        for server, view, run, path in runs:
+            # warm up: imports, compiled URL patterns, the visible-team cache
+            run(path, headers, concurrency, concurrency)
+
+            start = time.perf_counter()
+            latencies, errors = run(path, headers, total, concurrency)
+            elapsed = time.perf_counter() - start
+            if errors:
+                raise CommandError("%s %s: %d non-200 responses, e.g. %s" % (server, path, len(errors), errors[0]))
+
+            # memory in a separate, shorter pass: tracemalloc slows everything down
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            run(path, headers, concurrency * 4, concurrency)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            latencies.sort()
+            self.stdout.write("%-5s %-11s %8.0f %8.1f %8.1f %9.1f  %s" % (
+                server, view, len(latencies) / elapsed,
+                statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000,
+                (peak - baseline) / concurrency / 1024, path,
+            ))
+
+        stack = threading.stack_size() or resource.getrlimit(resource.RLIMIT_STACK)[0]
+        if stack > 0:
+            self.stdout.write(
+                "\nKiB/conn is Python heap only. Each WSGI connection also holds a thread, "
+                "whose stack reserves %.0f KiB of address space." % (stack / 1024)
+            )
+
+    def paths(self, endpoint, user):
+        if endpoint == 'tasks':
+            return reverse('task-list'), reverse('async-task-list')
+        if endpoint == 'projects':
+            return reverse('projects-list'), reverse('async-project-list')
+
+        # the busiest task the user can see
+        task = Task.objects.filter(visible_teams_q(user)).order_by('-comment_count', 'pk').first()
+        if task is None:
+            raise CommandError("%s can't see any task." % user.username)
+        if endpoint == 'task':
+            return reverse('task-detail', args=[task.pk]), reverse('async-task-detail', args=[task.pk])
+        return (reverse('task-comments-list', kwargs={'task_id': task.pk}),
+                reverse('async-task-comments', kwargs={'task_id': task.pk}))
@@ -0,0 +1,74 @@
+"""
+Process-independent counters kept in the shared Django cache, so every
+worker adds to the same numbers. Counters are declared once with
+counter() and read back together by snapshot() / the metrics endpoint.
+
+gauge() names hold the last value a worker reported with set_value()
+(sizes, estimates); ratio() names are computed by snapshot() from
+counters.
+"""
+from django.core.cache import cache
+
+PREFIX = 'metrics:'
+
+_counters = []
+_ratios = {}
+
+
+def counter(name):
+    if name not in _counters:
+        _counters.append(name)
+    return name
+
+
+def gauge(name):
+    return counter(name)
+
+
+def ratio(name, numerator, denominator):
+    """`name` = numerator / sum(denominator), all counter names."""
+    _ratios[name] = (numerator, tuple(denominator))
+    return name
+
+
+def incr(name, delta=1):
+    key = PREFIX + name
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # first increment (or evicted): create it, then retry once
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, delta)
+
+
+def set_value(name, value):
+    cache.set(PREFIX + name, value, timeout=None)
+
+
+async def aincr(name, delta=1):
+    key = PREFIX + name
+    try:
+        await cache.aincr(key, delta)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key, delta)
+
+
+def reset():
+    cache.delete_many([PREFIX + name for name in _counters])
+
+
+def snapshot():
+    values = cache.get_many([PREFIX + name for name in _counters])
+    data = {name: values.get(PREFIX + name, 0) for name in _counters}
+
+    # <group>.hit / <group>.miss pairs also get a <group>.hit_rate
+    for name in _counters:
+        if name.endswith('.hit'):
+            group = name[:-len('.hit')]
+            hits, misses = data[name], data.get(group + '.miss', 0)
+            data[group + '.hit_rate'] = round(hits / (hits + misses), 4) if hits + misses else None
+    for name, (numerator, denominator) in _ratios.items():
+        total = sum(data[part] for part in denominator)
+        data[name] = round(data[numerator] / total, 6) if total else None
+    return data
@@ -0,0 +1,43 @@
+from django.db import models
+from django.db.models import F
+
+
+class CounterFieldsModel(models.Model):
+    """
+    Fields listed in `counter_fields` are only changed with UPDATE ... F()
+    statements (counters, rollups). Regular saves never write them back, so
+    a stale in-memory copy can't undo a concurrent increment.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class VersionedModel(CounterFieldsModel):
+    """
+    A counter that only ever goes up, bumped with UPDATE ... SET
+    version = version + 1 whenever something the row's responses depend on
+    changes. Handed out in ETags, so it must never go back.
+    """
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    counter_fields = ('version',)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def bump(cls, *pks, extra=None, **filters):
+        """Bumps the matching rows; `extra` is set in the same UPDATE."""
+        if pks:
+            filters['pk__in'] = [pk for pk in pks if pk is not None]
+        return cls._default_manager.filter(**filters).update(version=F('version') + 1, **(extra or {}))
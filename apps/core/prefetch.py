@@ -0,0 +1,118 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+
+
+class QueryPlan:
+    """
+    select_related paths and Prefetch lookups needed to render a serializer
+    without lazy loads. Prefetches carry their own nested plan, so a nested
+    many=True serializer gets its relations joined inside the prefetch query.
+    """
+
+    def __init__(self):
+        self.select = set()
+        self.prefetch = {}
+
+    def child(self, lookup, model):
+        if lookup not in self.prefetch:
+            self.prefetch[lookup] = (model, QueryPlan())
+        return self.prefetch[lookup][1]
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        for lookup in sorted(self.prefetch):
+            model, plan = self.prefetch[lookup]
+            queryset = queryset.prefetch_related(
+                Prefetch(lookup, queryset=plan.apply(model._default_manager.all()))
+            )
+        return queryset
+
+
+def _relation(model, attr):
+    """The relation field behind attribute `attr` of model, if it is one."""
+    try:
+        field = model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        field = next(
+            (rel for rel in model._meta.related_objects if rel.get_accessor_name() == attr),
+            None,
+        )
+    if field is None or not field.is_relation:
+        return None
+    return field
+
+
+def _pk_only(field):
+    return isinstance(field, RelatedField) and field.use_pk_only_optimization()
+
+
+def _walk(serializer, model, prefix, plan):
+    for field in serializer._readable_fields:
+        if field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                _walk(field, model, prefix, plan)
+            continue
+
+        current_model, path = model, prefix
+        attrs = field.source_attrs
+
+        for index, attr in enumerate(attrs):
+            relation = _relation(current_model, attr)
+            if relation is None:
+                break
+
+            lookup = path + attr
+            is_last = index == len(attrs) - 1
+
+            if relation.many_to_many or relation.one_to_many:
+                child_plan = plan.child(lookup, relation.related_model)
+                if is_last and isinstance(field, serializers.ListSerializer):
+                    _walk(field.child, relation.related_model, '', child_plan)
+                break
+
+            # a primary key of a forward relation is read off the FK column
+            if is_last and _pk_only(field):
+                break
+
+            plan.select.add(lookup)
+            current_model, path = relation.related_model, lookup + '__'
+        else:
+            if isinstance(field, serializers.Serializer):
+                _walk(field, current_model, path, plan)
+
+    return plan
+
+
+def plan_for_serializer(serializer, model=None):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = model or serializer.Meta.model
+    return _walk(serializer, model, '', QueryPlan())
+
+
+def plan_queryset(queryset, serializer):
+    """
+    Adds the select_related/Prefetch chain that `serializer` (with whatever
+    fields it currently has) needs, so rendering a page costs a fixed
+    number of queries regardless of page size or team size.
+    """
+    return plan_for_serializer(serializer, queryset.model).apply(queryset)
+
+
+class PrefetchPlannerMixin:
+    """
+    For generic views: plans the queryset from the serializer that is
+    going to render it. Hooked into filter_queryset so it covers list as
+    well as get_object. Actions that don't render the serializer (listed
+    in unplanned_actions) get the plain queryset.
+    """
+    unplanned_actions = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, 'action', None) in self.unplanned_actions:
+            return queryset
+        return plan_queryset(queryset, self.get_serializer())
@@ -0,0 +1,66 @@
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _parse_paths(value):
+    if not value:
+        return set()
+    return {tuple(part for part in item.strip().split('.') if part) for item in value.split(',') if item.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and opt-in expansion for read requests.
+
+    ?fields=title,status,project_detail.name
+        keeps only the listed fields; dotted paths select inside nested
+        serializers (a nested serializer nobody selected into keeps all its fields).
+    ?expand=project_detail.team_detail
+        fields listed in `expandable_fields` are left out of list responses
+        unless expanded (or named in ?fields=). Expanding a dotted path
+        expands every step of it.
+
+    Write requests are never pruned, the same serializer validates the input.
+    Serializers name their nested / costly fields in `expandable_fields`.
+    """
+    expandable_fields = ()
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+
+        params = getattr(request, 'query_params', request.GET)
+        selected = _parse_paths(params.get(self.fields_query_param))
+        expanded = _parse_paths(params.get(self.expand_query_param))
+        path = self._field_path()
+        depth = len(path)
+
+        # ---- ?fields= ----
+        below = {entry[depth] for entry in selected if entry[:depth] == path and len(entry) > depth}
+        if below:
+            fields = {name: field for name, field in fields.items() if name in below}
+
+        # ---- collapsed details on list endpoints ----
+        view = self.context.get('view')
+        if getattr(view, 'action', None) == 'list':
+            wanted = below | {entry[depth] for entry in expanded if entry[:depth] == path and len(entry) > depth}
+            fields = {
+                name: field for name, field in fields.items()
+                if name not in self.expandable_fields or name in wanted
+            }
+
+        return fields
+
+    def _field_path(self):
+        """Field names from the root serializer down to this one."""
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(names))
@@ -0,0 +1,102 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+
+class DynamicFieldsTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.owner)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.task = Task.objects.create(
+            title="Task 1", description="d", project=self.project,
+            created_by=self.owner, assigned_to=self.owner,
+        )
+        Comment.objects.create(task=self.task, author=self.owner, content="c")
+
+        self.list_url = reverse("task-list")
+        self.client.force_authenticate(user=self.owner)
+
+    def first(self, url):
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = res.data
+        return data["results"][0] if isinstance(data, dict) else data[0]
+
+    # ==========================================================
+    # DEFAULTS
+    # ==========================================================
+
+    def test_list_collapses_nested_details(self):
+        item = self.first(self.list_url)
+        self.assertNotIn("project_detail", item)
+        self.assertNotIn("assigned_to_detail", item)
+        self.assertIn("assigned_to", item)
+
+    def test_retrieve_keeps_nested_details(self):
+        res = self.client.get(reverse("task-detail", kwargs={"pk": self.task.id}))
+        self.assertIn("team_detail", res.data["project_detail"])
+        self.assertIn("members_detail", res.data["project_detail"]["team_detail"])
+
+    def test_comment_list_collapses_task(self):
+        item = self.first(reverse("task-comments-list", kwargs={"task_id": self.task.id}))
+        self.assertNotIn("task_detail", item)
+        self.assertEqual(item["task"], self.task.id)
+
+    def test_collapsed_list_does_not_load_relations(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.list_url)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn('"projects_project"', sql)
+        self.assertNotIn('"users_user"', sql)
+
+    # ==========================================================
+    # ?expand=
+    # ==========================================================
+
+    def test_expand_one_level(self):
+        item = self.first(self.list_url + "?expand=project_detail")
+        self.assertEqual(item["project_detail"]["name"], "Project 1")
+        self.assertNotIn("team_detail", item["project_detail"])
+
+    def test_expand_dotted_path_expands_each_step(self):
+        item = self.first(self.list_url + "?expand=project_detail.team_detail.members_detail")
+        team = item["project_detail"]["team_detail"]
+        self.assertEqual(team["members_detail"][0]["username"], "owner")
+        self.assertNotIn("owner_detail", team)
+
+    # ==========================================================
+    # ?fields=
+    # ==========================================================
+
+    def test_fields_selects_top_level(self):
+        item = self.first(self.list_url + "?fields=title,status")
+        self.assertEqual(set(item), {"title", "status"})
+
+    def test_fields_selects_inside_nested(self):
+        item = self.first(self.list_url + "?fields=title,project_detail.name")
+        self.assertEqual(item["project_detail"], {"name": "Project 1"})
+
+    def test_fields_on_projects_and_teams(self):
+        self.assertEqual(set(self.first(reverse("projects-list") + "?fields=id,name")), {"id", "name"})
+        self.assertEqual(set(self.first(reverse("teams-list") + "?fields=name")), {"name"})
+
+    def test_write_requests_are_not_pruned(self):
+        res = self.client.post(
+            self.list_url + "?fields=title",
+            {"title": "New", "description": "d", "project": self.project.id},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertIn("project_detail", res.data)
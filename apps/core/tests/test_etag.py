@@ -0,0 +1,144 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.owner, self.member)
+        self.other_team = Teams.objects.create(name="Team B", owner=self.owner)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.other_project = Project.objects.create(name="Project 2", team=self.other_team, created_by=self.owner)
+        self.task = Task.objects.create(
+            title="Task 1", description="d", project=self.project,
+            created_by=self.owner, assigned_to=self.member,
+        )
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def etag(self, url, user=None):
+        self.client.force_authenticate(user=user or self.member)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["ETag"].startswith('W/"'))
+        return res["ETag"]
+
+    def poll(self, url, etag, user=None):
+        self.client.force_authenticate(user=user or self.member)
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    # ==========================================================
+    # 304 ON UNCHANGED DATA
+    # ==========================================================
+
+    def test_unchanged_list_is_not_modified(self):
+        for url in (reverse("task-list") + "?status=todo", reverse("projects-list"), reverse("teams-list")):
+            etag = self.etag(url)
+            self.client.force_authenticate(user=self.member)
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(res["ETag"], etag)
+            self.assertEqual(res.content, b"")
+            self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_unchanged_detail_is_not_modified(self):
+        for url in (reverse("task-detail", kwargs={"pk": self.task.id}),
+                    reverse("projects-detail", kwargs={"pk": self.project.id}),
+                    reverse("teams-detail", kwargs={"pk": self.team.id})):
+            etag = self.etag(url)
+            self.assertEqual(self.poll(url, etag), status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(self.poll(url, etag.removeprefix("W/")), status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_user_and_query(self):
+        url = reverse("task-list")
+        self.assertNotEqual(self.etag(url), self.etag(url, user=self.owner))
+        self.assertNotEqual(self.etag(url), self.etag(url + "?status=done"))
+
+    def test_invisible_detail_has_no_etag(self):
+        self.client.force_authenticate(user=self.member)
+        res = self.client.get(reverse("projects-detail", kwargs={"pk": self.other_project.id}), HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", res)
+
+    # ==========================================================
+    # WRITES CHANGE THE ETAG
+    # ==========================================================
+
+    def test_task_write_changes_list_and_detail(self):
+        list_url = reverse("task-list")
+        detail_url = reverse("task-detail", kwargs={"pk": self.task.id})
+        list_etag, detail_etag = self.etag(list_url), self.etag(detail_url)
+
+        self.client.force_authenticate(user=self.owner)
+        self.client.patch(detail_url, {"status": "done"}, format="json")
+
+        self.assertEqual(self.poll(list_url, list_etag), status.HTTP_200_OK)
+        self.assertEqual(self.poll(detail_url, detail_etag), status.HTTP_200_OK)
+
+    def test_comment_and_membership_writes(self):
+        url = reverse("projects-detail", kwargs={"pk": self.project.id})
+        etag = self.etag(url)
+        Comment.objects.create(task=self.task, author=self.owner, content="c")
+        self.assertEqual(self.poll(url, etag), status.HTTP_200_OK)
+
+        etag = self.etag(url)
+        self.team.members.remove(self.owner)
+        self.assertEqual(self.poll(url, etag), status.HTTP_200_OK)
+
+        etag = self.etag(url)
+        self.owner.teams.add(self.team)
+        self.assertEqual(self.poll(url, etag), status.HTTP_200_OK)
+
+    def test_profile_change_bumps_the_users_teams(self):
+        url = reverse("teams-list")
+        etag = self.etag(url)
+        self.owner.last_login = None
+        self.owner.save(update_fields=["last_login"])
+        self.assertEqual(self.poll(url, etag), status.HTTP_304_NOT_MODIFIED)
+
+        self.member.email = "member@example.com"
+        self.member.save()
+        self.assertEqual(self.poll(url, etag), status.HTTP_200_OK)
+
+    def test_writes_elsewhere_keep_detail_etag(self):
+        url = reverse("projects-detail", kwargs={"pk": self.project.id})
+        etag = self.etag(url, user=self.owner)
+        Task.objects.create(title="T", description="d", project=self.other_project, created_by=self.owner)
+        self.assertEqual(self.poll(url, etag, user=self.owner), status.HTTP_304_NOT_MODIFIED)
+
+    def test_moving_a_task_bumps_both_projects(self):
+        before = {p.pk: p.version for p in Project.objects.all()}
+        self.task.project = self.other_project
+        self.task.save()
+        after = {p.pk: p.version for p in Project.objects.all()}
+        self.assertGreater(after[self.project.pk], before[self.project.pk])
+        self.assertGreater(after[self.other_project.pk], before[self.other_project.pk])
+
+    # ==========================================================
+    # COUNTERS
+    # ==========================================================
+
+    def test_stale_instance_does_not_roll_version_back(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        Project.bump(self.project.pk)
+        Project.bump(self.project.pk)
+        current = Project.objects.get(pk=self.project.pk).version
+
+        stale.name = "Renamed"
+        stale.save()
+        self.assertGreater(Project.objects.get(pk=self.project.pk).version, current)
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.core.fastpath import compile_serializer
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task
+from apps.tasks.views import TasksViewSet
+
+User = get_user_model()
+
+FULL = (
+    "?expand=project_detail.team_detail.members_detail,project_detail.team_detail.owner_detail,"
+    "project_detail.created_by_detail,assigned_to_detail"
+)
+
+
+class CompiledReadPathTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner", email="o@x.io")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.lurker = User.objects.create_user(username="lurker", password="1234", is_active=False)
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.owner, self.member, self.lurker)
+        self.empty_team = Teams.objects.create(name="Team B", owner=self.member)
+
+        today = timezone.now().date()
+        self.project = Project.objects.create(
+            name="Project 1", team=self.team, created_by=self.owner,
+            start_date=today, end_date=today + timedelta(days=9),
+        )
+        self.project2 = Project.objects.create(name="Project 2", team=self.empty_team, created_by=self.member)
+
+        self.tasks = []
+        for i in range(12):
+            self.tasks.append(Task.objects.create(
+                title=f"Task {i}",
+                description=f"Description ü {i}",
+                project=self.project if i % 3 else self.project2,
+                created_by=self.owner,
+                assigned_to=[None, self.member, self.owner][i % 3],
+                status=["todo", "doing", "done"][i % 3],
+                priority=(i % 3) + 1,
+                due_date=None if i % 2 else today + timedelta(days=i),
+            ))
+        Task.objects.filter(pk=self.tasks[1].pk).update(attachment="task_attachments/spec.pdf")
+        Task.objects.filter(pk=self.tasks[2].pk).update(attachment="")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def assertParity(self, url, user=None):
+        self.client.force_authenticate(user=user or self.member)
+        fast = self.client.get(url)
+        with mock.patch.object(TasksViewSet, "compiled_reads", False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    # ==========================================================
+    # PARITY WITH THE SERIALIZERS
+    # ==========================================================
+
+    def test_list_default(self):
+        res = self.assertParity(reverse("task-list"))
+        self.assertEqual(res.data["count"], 12)
+
+    def test_list_fully_expanded(self):
+        res = self.assertParity(reverse("task-list") + FULL)
+        self.assertIn("members_detail", res.data["results"][0]["project_detail"]["team_detail"])
+
+    def test_list_fields_and_filters(self):
+        self.assertParity(reverse("task-list") + "?fields=title,attachment,project_detail.name&status=doing")
+        self.assertParity(reverse("task-list") + "?assigned_to=me&page=1")
+
+    def test_cursor_pages(self):
+        url = reverse("task-list") + FULL + "&pagination=cursor&ordering=due_date&page_size=5"
+        res = self.assertParity(url)
+        while res.data["next"]:
+            res = self.assertParity(res.data["next"])
+
+    def test_retrieve(self):
+        for task in self.tasks[:3]:
+            self.assertParity(reverse("task-detail", kwargs={"pk": task.id}))
+
+    def test_retrieve_not_visible(self):
+        res = self.assertParity(reverse("task-detail", kwargs={"pk": self.tasks[1].id}), user=self.outsider)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_with_object_permissions_loads_the_instance(self):
+        class AssigneeOnly(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                return obj.assigned_to == request.user
+
+        self.client.force_authenticate(user=self.member)
+        with mock.patch.object(TasksViewSet, "permission_classes", [IsAuthenticated, AssigneeOnly]):
+            res = self.client.get(reverse("task-detail", kwargs={"pk": self.tasks[1].id}))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            res = self.client.get(reverse("task-detail", kwargs={"pk": self.tasks[2].id}))
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    # ==========================================================
+    # COMPILER
+    # ==========================================================
+
+    def test_uncompilable_serializer_falls_back(self):
+        class WithMethodField(serializers.ModelSerializer):
+            extra = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Task
+                fields = ["title", "extra"]
+
+            def get_extra(self, obj):
+                return 1
+
+        self.assertIsNone(compile_serializer(WithMethodField()))
+
+    def test_page_is_fetched_as_named_rows(self):
+        from apps.tasks.serializers import TaskSerializer
+
+        compiled = compile_serializer(TaskSerializer())
+        row = compiled.rows(Task.objects.all(), extra=("created_at",))[0]
+        self.assertTrue(hasattr(row, "created_at"))
+        self.assertEqual(row.title, Task.objects.first().title)
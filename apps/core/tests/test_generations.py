@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.core import generations
+
+KEY = "tests:generations"
+
+
+class GenerationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fill_then_hit(self):
+        value, generation = generations.lookup(KEY)
+        self.assertIsNone(value)
+        generations.fill(KEY, generation, "a", 60)
+        self.assertEqual(generations.lookup(KEY), ("a", generation))
+
+    def test_fill_that_lost_the_race_is_never_served(self):
+        _, generation = generations.lookup(KEY)   # the miss, then its database read
+        with self.captureOnCommitCallbacks(execute=True):
+            generations.invalidate([KEY])         # the write commits
+        generations.fill(KEY, generation, "stale", 60)
+        self.assertIsNone(generations.lookup(KEY)[0])
+
+    def test_evicted_generation_drops_the_entry(self):
+        _, generation = generations.lookup(KEY)
+        generations.fill(KEY, generation, "a", 60)
+        cache.delete(generations.GENERATION_KEY % KEY)
+        self.assertIsNone(generations.lookup(KEY)[0])
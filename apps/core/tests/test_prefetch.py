@@ -0,0 +1,118 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.core.prefetch import plan_for_serializer
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.projects.serializers import ProjectsSerializer
+from apps.tasks.models import Task, Comment
+from apps.tasks.serializers import TaskSerializer, CommentSerializer
+
+User = get_user_model()
+
+
+class PrefetchPlannerTests(APITestCase):
+    # list endpoints collapse nested details by default; render the full tree
+    EXPAND = [
+        "task_detail.project_detail.team_detail.members_detail",
+        "task_detail.project_detail.team_detail.owner_detail",
+        "task_detail.project_detail.created_by_detail",
+        "task_detail.assigned_to_detail",
+        "project_detail.team_detail.members_detail",
+        "project_detail.team_detail.owner_detail",
+        "project_detail.created_by_detail",
+        "assigned_to_detail",
+        "author_detail",
+        "team_detail.members_detail",
+        "team_detail.owner_detail",
+        "created_by_detail",
+    ]
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.owner)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.seq = 0
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def grow(self, tasks=1, members=1, comments=1):
+        """Adds tasks, team members and comments so query counts can be compared."""
+        for _ in range(members):
+            self.seq += 1
+            user = User.objects.create_user(username=f"member{self.seq}", password="1234")
+            self.team.members.add(user)
+        for _ in range(tasks):
+            self.seq += 1
+            task = Task.objects.create(
+                title=f"Task {self.seq}", description="d", project=self.project,
+                created_by=self.owner, assigned_to=self.owner,
+            )
+            for _ in range(comments):
+                Comment.objects.create(task=task, author=self.owner, content="c")
+
+    def count_queries(self, url):
+        url += "?expand=" + ",".join(self.EXPAND)
+        self.client.force_authenticate(user=self.owner)
+        cache.clear()  # always measure with a cold visible-team cache
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    # ==========================================================
+    # PLAN SHAPE
+    # ==========================================================
+
+    def test_task_plan_joins_single_relations_and_prefetches_members(self):
+        plan = plan_for_serializer(TaskSerializer())
+        self.assertEqual(plan.select, {"project", "project__team", "project__team__owner",
+                                       "project__created_by", "assigned_to", "attachment_metadata"})
+        self.assertEqual(set(plan.prefetch), {"project__team__members"})
+
+    def test_comment_plan_goes_through_nested_task(self):
+        plan = plan_for_serializer(CommentSerializer())
+        self.assertIn("task__project__team__owner", plan.select)
+        self.assertIn("author", plan.select)
+        self.assertEqual(set(plan.prefetch), {"task__project__team__members"})
+
+    # ==========================================================
+    # QUERY COUNTS DO NOT GROW WITH PAGE OR TEAM SIZE
+    # ==========================================================
+
+    def test_task_list_query_count_is_constant(self):
+        self.grow(tasks=1, members=1)
+        small = self.count_queries(reverse("task-list"))
+        self.grow(tasks=9, members=15)
+        self.assertEqual(self.count_queries(reverse("task-list")), small)
+
+    def test_comment_list_query_count_is_constant(self):
+        self.grow(tasks=1, members=1, comments=1)
+        task = Task.objects.first()
+        url = reverse("task-comments-list", kwargs={"task_id": task.id})
+        small = self.count_queries(url)
+        self.grow(tasks=3, members=10, comments=4)
+        self.assertEqual(self.count_queries(url), small)
+
+    def test_project_list_query_count_is_constant(self):
+        small = self.count_queries(reverse("projects-list"))
+        for i in range(5):
+            Project.objects.create(name=f"P{i}", team=self.team, created_by=self.owner)
+        self.grow(tasks=0, members=10)
+        self.assertEqual(self.count_queries(reverse("projects-list")), small)
+
+    def test_planned_output_matches_unplanned(self):
+        self.grow(tasks=3, members=3)
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(reverse("projects-list") + "?expand=team_detail.members_detail,team_detail.owner_detail,created_by_detail")
+        project = Project.objects.get(pk=self.project.pk)
+        request = res.wsgi_request
+        expected = ProjectsSerializer(project, context={"request": request}).data
+        self.assertEqual(res.data[0], expected)
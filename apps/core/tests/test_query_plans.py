@@ -0,0 +1,108 @@
+import re
+from unittest import skipUnless
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+# a full table scan shows up as "SCAN <table>" without "USING ... INDEX"
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+APP_TABLES = {
+    'tasks_task', 'tasks_comment', 'projects_project', 'teams_teams', 'teams_teams_members',
+}
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(APITestCase):
+    """
+    Replays every SELECT an endpoint runs through EXPLAIN QUERY PLAN and
+    fails if any of them falls back to scanning one of the app tables.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.owner, self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.task = Task.objects.create(
+            title="Task 1", description="d", project=self.project,
+            created_by=self.owner, assigned_to=self.member,
+        )
+        Comment.objects.create(task=self.task, author=self.member, content="c")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            details = [row[-1] for row in cursor.fetchall()]
+        scans = []
+        for detail in details:
+            match = FULL_SCAN.match(detail)
+            if match and match.group(1) in APP_TABLES:
+                scans.append(detail)
+        return scans
+
+    def assertNoFullScans(self, method, url, data=None, user=None):
+        self.client.force_authenticate(user=user or self.member)
+        with CaptureQueriesContext(connection) as ctx:
+            res = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(res.status_code, 400, res.data)
+
+        selects = [q["sql"] for q in ctx.captured_queries if q["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(self.full_scans(sql), [], sql)
+
+    # ==========================================================
+    # TASKS
+    # ==========================================================
+
+    def test_task_list(self):
+        self.assertNoFullScans("get", reverse("task-list"))
+
+    def test_task_list_by_status(self):
+        self.assertNoFullScans("get", reverse("task-list") + "?status=todo")
+
+    def test_task_list_assigned_to_me(self):
+        self.assertNoFullScans("get", reverse("task-list") + "?assigned_to=me&status=todo")
+
+    def test_task_list_cursor(self):
+        self.assertNoFullScans("get", reverse("task-list") + "?pagination=cursor&ordering=-priority")
+
+    def test_task_list_by_activity(self):
+        self.assertNoFullScans("get", reverse("task-list") + "?pagination=cursor&ordering=-last_activity_at")
+        self.assertNoFullScans("get", reverse("task-list") + "?ordering=-comment_count")
+
+    def test_task_detail(self):
+        self.assertNoFullScans("get", reverse("task-detail", kwargs={"pk": self.task.id}))
+
+    # ==========================================================
+    # COMMENTS
+    # ==========================================================
+
+    def test_comment_list(self):
+        self.assertNoFullScans("get", reverse("task-comments-list", kwargs={"task_id": self.task.id}))
+
+    # ==========================================================
+    # PROJECTS / TEAMS
+    # ==========================================================
+
+    def test_project_list(self):
+        self.assertNoFullScans("get", reverse("projects-list"))
+
+    def test_project_create_name_check(self):
+        self.assertNoFullScans("post", reverse("projects-list"), {"name": "Project 2", "team": self.team.id})
+
+    def test_team_list(self):
+        self.assertNoFullScans("get", reverse("teams-list"))
@@ -0,0 +1,19 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, BasePermission
+
+from . import metrics
+
+
+class IsAdminRole(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and (user.is_staff or getattr(user, 'role', None) == 'admin'))
+
+
+class MetricsView(APIView):
+    """Cache hit/miss counters, summed over every worker."""
+    permission_classes = [IsAuthenticated, IsAdminRole]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
@@ -0,0 +1,148 @@
+"""
+Transports between the processes that publish events (any web or Celery
+worker) and the brokers that stream them (ASGI workers).
+
+A backend gives every event its id and keeps the last EVENTS_HISTORY
+events of each project, so a reconnecting client can ask for what it
+missed (history()). It hands each event to the broker of every process
+with subscribers for the project, by calling broker.dispatch(project_id,
+event_id, data). Events travel as their JSON text, encoded once.
+
+    LocalBackend  one process: history in memory, events handed straight
+                  to the broker; runserver and tests
+    RedisBackend  one capped Redis stream per project (XADD ... MAXLEN);
+                  each process reads the projects it has subscribers for
+                  with XREAD BLOCK, one reader per project
+"""
+import asyncio
+import itertools
+import threading
+from collections import defaultdict, deque
+
+
+class BaseBackend:
+
+    def __init__(self, history=1000):
+        self.size = history
+        self.broker = None
+
+    def attach(self, broker):
+        self.broker = broker
+
+    def publish(self, project_id, data):
+        """Stores and sends the event (JSON text), returns its id. Sync, callable from any thread."""
+        raise NotImplementedError
+
+    async def history(self, project_id, after):
+        """
+        [(event id, data)] of the project newer than `after`, oldest first,
+        or None when `after` isn't known any more (trimmed, from before a
+        restart, malformed): the client has to reload.
+        """
+        raise NotImplementedError
+
+    async def watch(self, project_id):
+        """The first subscriber of the project in this process arrived."""
+
+    def unwatch(self, project_id):
+        """Its last subscriber left."""
+
+
+class LocalBackend(BaseBackend):
+
+    def __init__(self, history=1000):
+        super().__init__(history)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last = 0
+        self._events = defaultdict(lambda: deque(maxlen=self.size))
+        # newest id each project's history has dropped
+        self._dropped = defaultdict(int)
+
+    def publish(self, project_id, data):
+        with self._lock:
+            self._last = number = next(self._ids)
+            events = self._events[project_id]
+            if len(events) == events.maxlen:
+                self._dropped[project_id] = int(events[0][0])
+            event_id = str(number)
+            events.append((event_id, data))
+        self.broker.dispatch(project_id, event_id, data)
+        return event_id
+
+    async def history(self, project_id, after):
+        try:
+            after = int(after)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            if not 0 <= after <= self._last or after < self._dropped[project_id]:
+                return None
+            return [(event_id, data) for event_id, data in self._events[project_id] if int(event_id) > after]
+
+
+def _stream_id(value):
+    """Redis stream ids ('<ms>-<seq>') as comparable tuples, None if malformed."""
+    try:
+        ms, seq = str(value).split('-')
+        return int(ms), int(seq)
+    except ValueError:
+        return None
+
+
+class RedisBackend(BaseBackend):
+
+    key = 'events:project:%s'
+
+    def __init__(self, url='redis://localhost:6379/0', history=1000, block=5000):
+        super().__init__(history)
+        import redis
+        from redis import asyncio as aioredis
+
+        self.client = redis.Redis.from_url(url)
+        self.aclient = aioredis.Redis.from_url(url)
+        self.block = block
+        self._readers = {}
+
+    def publish(self, project_id, data):
+        event_id = self.client.xadd(self.key % project_id, {'data': data}, maxlen=self.size, approximate=True)
+        return event_id.decode()
+
+    async def history(self, project_id, after):
+        after_id = _stream_id(after)
+        if after_id is None:
+            return None
+        key = self.key % project_id
+        oldest = await self.aclient.xrange(key, count=1)
+        if oldest and _stream_id(oldest[0][0].decode()) > after_id:
+            # `after` itself was trimmed away: events may be missing
+            return None
+        entries = await self.aclient.xrange(key, min='(' + after, count=self.size)
+        return [(entry_id.decode(), fields[b'data'].decode()) for entry_id, fields in entries]
+
+    async def watch(self, project_id):
+        # read on from the current end: events published while history() runs come twice, not never
+        newest = await self.aclient.xrevrange(self.key % project_id, count=1)
+        start = newest[0][0].decode() if newest else '0-0'
+        self._readers[project_id] = asyncio.get_running_loop().create_task(self._read(project_id, start))
+
+    def unwatch(self, project_id):
+        reader = self._readers.pop(project_id, None)
+        if reader is not None:
+            reader.cancel()
+
+    async def _read(self, project_id, last):
+        from redis.exceptions import ConnectionError as RedisConnectionError
+
+        key = self.key % project_id
+        while True:
+            try:
+                streams = await self.aclient.xread({key: last}, block=self.block, count=100)
+            except RedisConnectionError:
+                # Redis restarting: keep the subscribers, read on from `last` once it's back
+                await asyncio.sleep(1)
+                continue
+            for _, entries in streams or ():
+                for entry_id, fields in entries:
+                    last = entry_id.decode()
+                    self.broker.dispatch(project_id, last, fields[b'data'].decode())
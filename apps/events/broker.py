@@ -0,0 +1,129 @@
+"""
+In-process pub/sub for the project event streams.
+
+publish() is called after commit by the signal handlers (signals.py), in
+whatever thread made the change; the backend (backends.py, EVENTS_BACKEND)
+stores the event and brings it to every process with subscribers, where
+Broker.dispatch() hands it to each subscribed stream's queue on the event
+loop. A process with a thousand open streams on a project still reads
+each event from the backend once.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+# per stream: a client this far behind is dropped and told to reload
+QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """One stream's view of a project: the replay, then live events."""
+
+    def __init__(self, broker, project_id, loop):
+        self.broker = broker
+        self.project_id = project_id
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+        # events the replay already gave, in case they arrive live too
+        self.seen = set()
+        self.replay = []
+
+    def put(self, event_id, data):
+        """From any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event_id, data)
+        except RuntimeError:
+            # its event loop is gone without the stream being closed
+            self.close()
+
+    def _put(self, event_id, data):
+        try:
+            self.queue.put_nowait((event_id, data))
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        """(event id, data) of the next live event."""
+        while True:
+            event_id, data = await self.queue.get()
+            if event_id not in self.seen:
+                return event_id, data
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+
+    def __init__(self, backend):
+        self.backend = backend
+        backend.attach(self)
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, project_id, event):
+        return self.backend.publish(project_id, json.dumps(event, cls=DjangoJSONEncoder))
+
+    def dispatch(self, project_id, event_id, data):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(project_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event_id, data)
+
+    async def subscribe(self, project_id, last_event_id=None):
+        """
+        Subscribes first, then reads the history after `last_event_id`, so
+        nothing published in between is lost. replay is None when that
+        history is gone.
+        """
+        subscription = Subscription(self, project_id, asyncio.get_running_loop())
+        with self._lock:
+            first = not self._subscriptions[project_id]
+            self._subscriptions[project_id].add(subscription)
+        try:
+            if first:
+                await self.backend.watch(project_id)
+            if last_event_id is not None:
+                subscription.replay = await self.backend.history(project_id, last_event_id)
+                subscription.seen = {event_id for event_id, _ in subscription.replay or ()}
+        except BaseException:
+            subscription.close()
+            raise
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.project_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            last = not subscriptions
+            if last:
+                del self._subscriptions[subscription.project_id]
+        if last:
+            self.backend.unwatch(subscription.project_id)
+
+    def subscriber_count(self, project_id):
+        with self._lock:
+            return len(self._subscriptions.get(project_id, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process's broker, on the backend named by EVENTS_BACKEND / EVENTS_BACKEND_OPTIONS."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = import_string(getattr(settings, 'EVENTS_BACKEND', 'apps.events.backends.LocalBackend'))
+                _broker = Broker(backend(**getattr(settings, 'EVENTS_BACKEND_OPTIONS', {})))
+    return _broker
@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.tasks.models import Task, Comment
+from apps.tasks.signals import tasks_bulk_changed
+from .broker import get_broker
+
+# what a board needs to redraw a card / a comment without fetching it
+TASK_FIELDS = ('id', 'title', 'status', 'priority', 'assigned_to_id', 'due_date', 'project_id',
+               'comment_count', 'last_activity_at')
+COMMENT_FIELDS = ('id', 'task_id', 'author_id', 'content', 'created_at')
+
+
+def _fields(instance, names):
+    return {name.removesuffix('_id'): getattr(instance, name) for name in names}
+
+
+def publish(project_id, event):
+    """
+    Sends the event to the project's streams once the transaction commits.
+    Robust: a broker that is down is logged, it never fails the write.
+    """
+    event = {'project': project_id, **event}
+    transaction.on_commit(lambda: get_broker().publish(project_id, event), robust=True)
+
+
+def _cascaded(origin, model):
+    # a delete cascading from a parent: the parent's own event says it all
+    return origin is not None and not isinstance(origin, model) and getattr(origin, 'model', None) is not model
+
+
+# ----------------------------
+# TASKS
+# ----------------------------
+@receiver(post_save, sender=Task)
+def publish_task_save(sender, instance, created, **kwargs):
+    data = _fields(instance, TASK_FIELDS)
+    previous = instance._loaded_project_id
+    if not created and previous not in (None, instance.project_id):
+        # moved: it leaves one board and lands on the other
+        publish(previous, {'type': 'task.deleted', 'task': {'id': instance.pk}})
+        created = True
+    publish(instance.project_id, {'type': 'task.created' if created else 'task.updated', 'task': data})
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, Task):
+        return
+    publish(instance.project_id, {'type': 'task.deleted', 'task': {'id': instance.pk}})
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def publish_bulk_write(sender, action, rows, fields=None, **kwargs):
+    ids = defaultdict(list)
+    for task_id, project_id, _ in rows:
+        ids[project_id].append(task_id)
+    for project_id, task_ids in ids.items():
+        publish(project_id, {'type': 'tasks.%s' % action, 'ids': task_ids,
+                             'fields': sorted(fields) if fields else None})
+
+
+# ----------------------------
+# COMMENTS
+# ----------------------------
+@receiver(post_save, sender=Comment)
+def publish_comment_save(sender, instance, created, **kwargs):
+    publish(instance.task.project_id, {
+        'type': 'comment.created' if created else 'comment.updated',
+        'comment': _fields(instance, COMMENT_FIELDS),
+    })
+
+
+@receiver(post_delete, sender=Comment)
+def publish_comment_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, Comment):
+        return
+    publish(instance.task.project_id, {
+        'type': 'comment.deleted',
+        'comment': {'id': instance.pk, 'task': instance.task_id},
+    })
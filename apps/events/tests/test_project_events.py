@@ -0,0 +1,227 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task
+from apps.events.backends import LocalBackend
+from apps.events.broker import Broker, get_broker, QUEUE_SIZE
+
+User = get_user_model()
+
+
+class ProjectEventsTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.other_project = Project.objects.create(name="Project 2", team=self.team, created_by=self.owner)
+        self.task = Task.objects.create(title="T", description="D", project=self.project, created_by=self.owner)
+
+        self.url = reverse("project-events", args=[self.project.id])
+        self.client.force_authenticate(user=self.owner)
+        self.token = str(AccessToken.for_user(self.member))
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    async def open(self, url=None, token=True, **headers):
+        if token:
+            headers["Authorization"] = "Bearer " + self.token
+        response = await self.async_client.get(url or self.url, headers=headers)
+        if response.status_code != 200:
+            return response, None
+        stream = response.streaming_content
+        # the retry line comes once the stream has subscribed
+        self.assertEqual(await self.next_chunk(stream), "retry: 3000\n\n")
+        return response, stream
+
+    async def next_chunk(self, stream):
+        return (await asyncio.wait_for(anext(stream), 2)).decode()
+
+    async def read(self, stream):
+        """(id, data) of the next message, keepalives skipped."""
+        while True:
+            chunk = await self.next_chunk(stream)
+            if not chunk.startswith(":"):
+                break
+        lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+        return lines["id"], json.loads(lines["data"])
+
+    async def write(self, method, url, data=None):
+        """An API write by the owner, its on_commit publishing run."""
+        def call():
+            with self.captureOnCommitCallbacks(execute=True):
+                return getattr(self.client, method)(url, data, format="json")
+        return await sync_to_async(call)()
+
+    # ==========================================================
+    # EVENTS
+    # ==========================================================
+
+    async def test_task_events(self):
+        response, stream = await self.open()
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+        await self.write("post", reverse("task-list"), {"title": "New", "description": "D",
+                                                         "project": self.project.id})
+        created = await Task.objects.aget(title="New")
+        _, event = await self.read(stream)
+        self.assertEqual(event["type"], "task.created")
+        self.assertEqual((event["project"], event["task"]["id"]), (self.project.id, created.id))
+        self.assertEqual(event["task"]["title"], "New")
+
+        await self.write("patch", reverse("task-detail", args=[self.task.id]), {"status": "done"})
+        _, event = await self.read(stream)
+        self.assertEqual((event["type"], event["task"]["status"]), ("task.updated", "done"))
+
+        await self.write("delete", reverse("task-detail", args=[self.task.id]))
+        _, event = await self.read(stream)
+        self.assertEqual(event, {"project": self.project.id, "type": "task.deleted", "task": {"id": self.task.id}})
+        await stream.aclose()
+
+    async def test_comment_events(self):
+        _, stream = await self.open()
+        await self.write("post", reverse("task-comments-list", kwargs={"task_id": self.task.id}), {"content": "hi"})
+        _, event = await self.read(stream)
+        self.assertEqual(event["type"], "comment.created")
+        self.assertEqual((event["comment"]["task"], event["comment"]["content"]), (self.task.id, "hi"))
+        await stream.aclose()
+
+    async def test_only_the_projects_events(self):
+        _, stream = await self.open()
+        await self.write("post", reverse("task-list"), {"title": "Elsewhere", "description": "D",
+                                                         "project": self.other_project.id})
+        await self.write("post", reverse("task-list"), {"title": "Here", "description": "D",
+                                                         "project": self.project.id})
+        _, event = await self.read(stream)
+        self.assertEqual(event["task"]["title"], "Here")
+        await stream.aclose()
+
+    async def test_moving_a_task_between_projects(self):
+        _, stream = await self.open()
+        await self.write("patch", reverse("task-detail", args=[self.task.id]), {"project": self.other_project.id})
+        _, event = await self.read(stream)
+        self.assertEqual((event["type"], event["task"]), ("task.deleted", {"id": self.task.id}))
+        await stream.aclose()
+
+    async def test_bulk_writes(self):
+        _, stream = await self.open()
+        await self.write("post", reverse("task-bulk-mutate"), {"ids": [self.task.id], "set": {"status": "doing"}})
+        _, event = await self.read(stream)
+        self.assertEqual(event, {"project": self.project.id, "type": "tasks.updated",
+                                 "ids": [self.task.id], "fields": ["status"]})
+        await stream.aclose()
+
+    def test_broker_down_does_not_fail_the_write(self):
+        with mock.patch.object(get_broker(), "publish", side_effect=ConnectionError), \
+                self.assertLogs("django", "ERROR"), \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(reverse("task-detail", args=[self.task.id]), {"status": "done"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, "done")
+
+    # ==========================================================
+    # RESUME
+    # ==========================================================
+
+    async def test_last_event_id_resumes(self):
+        _, stream = await self.open()
+        await self.write("patch", reverse("task-detail", args=[self.task.id]), {"title": "seen"})
+        seen_id, _ = await self.read(stream)
+        await stream.aclose()
+
+        # missed while disconnected
+        await self.write("patch", reverse("task-detail", args=[self.task.id]), {"title": "missed 1"})
+        await self.write("patch", reverse("task-detail", args=[self.task.id]), {"title": "missed 2"})
+
+        _, stream = await self.open(**{"Last-Event-ID": seen_id})
+        self.assertEqual((await self.read(stream))[1]["task"]["title"], "missed 1")
+        self.assertEqual((await self.read(stream))[1]["task"]["title"], "missed 2")
+        # then live
+        await self.write("patch", reverse("task-detail", args=[self.task.id]), {"title": "live"})
+        self.assertEqual((await self.read(stream))[1]["task"]["title"], "live")
+        await stream.aclose()
+
+    async def test_reset_when_the_history_is_gone(self):
+        for last_event_id in ("999999999", "nonsense"):
+            _, stream = await self.open(**{"Last-Event-ID": last_event_id})
+            event_id, event = await self.read(stream)
+            self.assertEqual((event_id, event["type"]), ("", "reset"))
+            await stream.aclose()
+
+    @override_settings(EVENTS_STREAM_TIMEOUT=0.1, EVENTS_KEEPALIVE=0.05)
+    async def test_streams_end_and_keep_alive(self):
+        _, stream = await self.open()
+        self.assertEqual(await self.next_chunk(stream), ": keepalive\n\n")
+        with self.assertRaises(StopAsyncIteration):
+            while True:
+                await self.next_chunk(stream)
+        self.assertEqual(get_broker().subscriber_count(self.project.id), 0)
+
+    # ==========================================================
+    # ACCESS
+    # ==========================================================
+
+    async def test_access_is_checked_at_subscribe(self):
+        response, _ = await self.open(token=False)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.token = str(AccessToken.for_user(self.outsider))
+        response, _ = await self.open()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(get_broker().subscriber_count(self.project.id), 0)
+
+    async def test_token_in_the_query_string(self):
+        # EventSource can't send an Authorization header
+        _, stream = await self.open(self.url + "?access_token=" + self.token, token=False)
+        self.assertIsNotNone(stream)
+        await stream.aclose()
+
+
+class BrokerTests(TestCase):
+
+    async def test_replay_then_live_without_duplicates(self):
+        broker = Broker(LocalBackend(history=3))
+        first = broker.publish(1, {"n": 1})
+        broker.publish(1, {"n": 2})
+        broker.publish(2, {"n": "other project"})
+
+        subscription = await broker.subscribe(1, first)
+        self.assertEqual([json.loads(data) for _, data in subscription.replay], [{"n": 2}])
+        broker.publish(1, {"n": 3})
+        self.assertEqual(json.loads((await subscription.get())[1]), {"n": 3})
+        subscription.close()
+        self.assertEqual(broker.subscriber_count(1), 0)
+
+    async def test_trimmed_history(self):
+        broker = Broker(LocalBackend(history=2))
+        first, second, third, _ = [broker.publish(1, {"n": n}) for n in range(4)]
+        # the second is gone: after the first, events may be missing
+        self.assertIsNone(await broker.backend.history(1, first))
+        self.assertEqual(len(await broker.backend.history(1, second)), 2)
+        self.assertEqual(len(await broker.backend.history(1, third)), 1)
+
+    async def test_slow_subscriber_overflows(self):
+        broker = Broker(LocalBackend())
+        subscription = await broker.subscribe(1)
+        for n in range(QUEUE_SIZE + 1):
+            broker.publish(1, {"n": n})
+        await asyncio.sleep(0)
+        self.assertTrue(subscription.overflowed)
+        subscription.close()
@@ -0,0 +1,95 @@
+"""
+GET /api/projects/<id>/events/ -- the project's task and comment changes
+as Server-Sent Events, for boards that would otherwise poll /api/tasks/.
+
+    id: 42
+    data: {"project": 3, "type": "task.updated", "task": {"id": 7, "status": "done", ...}}
+
+types: task.created / task.updated / task.deleted, tasks.created /
+tasks.updated / tasks.deleted (bulk writes: ids and fields only),
+comment.created / comment.updated / comment.deleted, and reset.
+
+Access is checked when the stream opens. Streams end after
+EVENTS_STREAM_TIMEOUT seconds; EventSource reconnects by itself, sending
+Last-Event-ID, and gets what it missed from the backend's history, after
+the access check runs again. {"type": "reset"} means the history no longer
+reaches that far back (or the client fell too far behind): reload the
+board, the stream goes on live.
+
+EventSource can't set headers: the token may come as ?access_token=.
+Meant for ASGI; under WSGI each open stream holds a worker thread.
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+
+from apps.core.asyncviews import AsyncReadView
+from apps.projects.models import Project
+from apps.teams.visibility import avisible_teams_q
+from .broker import get_broker
+
+
+def _message(event_id, data):
+    return 'id: %s\ndata: %s\n\n' % (event_id, data)
+
+
+def _reset(project_id):
+    # the empty id clears the client's Last-Event-ID: after reloading it goes on live
+    return _message('', json.dumps({'project': project_id, 'type': 'reset'}))
+
+
+async def stream(project_id, last_event_id):
+    keepalive = getattr(settings, 'EVENTS_KEEPALIVE', 15)
+    timeout = getattr(settings, 'EVENTS_STREAM_TIMEOUT', 300)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    subscription = await get_broker().subscribe(project_id, last_event_id)
+    try:
+        # how long EventSource waits before reconnecting, in ms
+        yield 'retry: 3000\n\n'
+        if subscription.replay is None:
+            yield _reset(project_id)
+        for event_id, data in subscription.replay or ():
+            yield _message(event_id, data)
+
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                event_id, data = await asyncio.wait_for(subscription.get(), min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                # a comment line: keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+            if subscription.overflowed:
+                yield _reset(project_id)
+                return
+            yield _message(event_id, data)
+    finally:
+        subscription.close()
+
+
+class ProjectEventsView(AsyncReadView):
+    action = 'events'
+
+    async def authenticate(self, request):
+        token = request.query_params.get('access_token')
+        if token and self.authentication.get_header(request) is None:
+            return await self.authentication.aresolve(token.encode())
+        return await super().authenticate(request)
+
+    async def get(self, request, pk):
+        visible = await avisible_teams_q(request.user)
+        if not await Project.objects.filter(visible, pk=pk).aexists():
+            raise Http404('No Project matches the given query.')
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        response = StreamingHttpResponse(stream(pk, last_event_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx: pass each event on as it comes
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,17 @@
+from apps.core.asyncviews import AsyncReadView
+from apps.teams.visibility import avisible_teams_q
+
+from .models import Project
+from .serializers import ProjectsSerializer
+
+
+class AsyncProjectListView(AsyncReadView):
+    """GET /api/async/projects/ -- GET /api/projects/ (not paginated either)."""
+    serializer_class = ProjectsSerializer
+    action = 'list'
+
+    async def get(self, request):
+        queryset = Project.objects.filter(await avisible_teams_q(request.user))
+        compiled = self.get_compiled_serializer()
+        rows = [row async for row in self.rows(compiled, queryset).aiterator(chunk_size=2000)]
+        return self.render(await self.serialize(compiled, rows))
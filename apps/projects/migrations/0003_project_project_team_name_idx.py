@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_alter_project_created_by'),
+        ('teams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['team', 'name'], name='project_team_name_idx'),
+        ),
+    ]
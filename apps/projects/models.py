@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from apps.teams.models import *
 from apps.users.models import *
+from apps.core.models import VersionedModel
+from .signals import project_moved
 
-class Project(models.Model):
+class Project(VersionedModel):
     name = models.CharField(max_length=30)
     team = models.ForeignKey(Teams, on_delete=models.CASCADE, related_name='projects')
     created_by = models.ForeignKey(User, on_delete=models.PROTECT)
@@ -10,6 +12,34 @@ class Project(models.Model):
     end_date = models.DateField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # rollups of the project's tasks, kept up to date by apps/tasks/signals.py
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    counter_fields = ('version', 'comment_count', 'last_activity_at')
+
+    class Meta:
+        indexes = [
+            # ProjectsSerializer.validate_name: unique name within a team
+            models.Index(fields=['team', 'name'], name='project_team_name_idx'),
+        ]
+
+    # team_id as loaded from the database, to notice moves between teams
+    _loaded_team_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_team_id = instance.__dict__.get('team_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        previous_team_id = self._loaded_team_id
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous_team_id is not None and previous_team_id != self.team_id:
+                project_moved.send(sender=Project, project=self, previous_team_id=previous_team_id)
+        self._loaded_team_id = self.team_id
 
     def __str__(self):
         return self.name
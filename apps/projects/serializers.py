@@ -1,13 +1,17 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from apps.core.serializers import DynamicFieldsMixin
+
 from .models import Project
 from apps.teams.models import Teams
 from apps.teams.serializers import TeamSerialiser
 from apps.users.serializers import UserSerializer
 
 
-class ProjectsSerializer(serializers.ModelSerializer):
+class ProjectsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('team_detail', 'created_by_detail')
+
     # ----------------------------
     # WRITE
     # ----------------------------
@@ -30,7 +34,10 @@ class ProjectsSerializer(serializers.ModelSerializer):
             'is_active',
             'start_date',
             'end_date',
+            'comment_count',
+            'last_activity_at',
         ]
+        read_only_fields = ['comment_count', 'last_activity_at']
         extra_kwargs = {
             'start_date': {'required': False, 'allow_null': True},
             'end_date': {'required': False, 'allow_null': True},
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+# sent after a project was saved under a different team;
+# kwargs: project, previous_team_id
+project_moved = Signal()
+
+
+# ----------------------------
+# VERSION COUNTERS
+# ----------------------------
+@receiver(post_save, sender='projects.Project')
+def bump_versions_on_project_save(sender, instance, **kwargs):
+    from apps.teams.models import Teams
+
+    sender.bump(instance.pk)
+    Teams.bump(instance.team_id, instance._loaded_team_id)
+
+
+@receiver(post_delete, sender='projects.Project')
+def bump_versions_on_project_delete(sender, instance, **kwargs):
+    from apps.teams.models import Teams
+
+    Teams.bump(instance.team_id)
@@ -1,9 +1,13 @@
 from django.urls import path
 from .views import *
 from rest_framework.routers import DefaultRouter
+from apps.events.views import ProjectEventsView
 
 router = DefaultRouter()
 router.register('', ProjectsView, basename='projects')
 
-urlpatterns = []
+urlpatterns = [
+    # async, see apps/events/views.py
+    path('<int:pk>/events/', ProjectEventsView.as_view(), name='project-events'),
+]
 urlpatterns += router.urls
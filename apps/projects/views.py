@@ -1,21 +1,37 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
-from django.db.models import Q
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from apps.core.etag import ConditionalGetMixin
+from apps.core.prefetch import PrefetchPlannerMixin
+from apps.teams.visibility import visible_teams_q, visible_team_versions
+from apps.tasks.stats import project_stats
 
 from .models import Project
 from .serializers import ProjectsSerializer
 
 
-class ProjectsView(ModelViewSet):
+class ProjectsView(ConditionalGetMixin, PrefetchPlannerMixin, ModelViewSet):
     serializer_class = ProjectsSerializer
     permission_classes = [IsAuthenticated]
+    unplanned_actions = ('stats',)
 
     def get_queryset(self):
         user = self.request.user
-        return Project.objects.filter(
-            Q(team__owner=user) | Q(team__members=user)
-        ).distinct()
+        return Project.objects.filter(visible_teams_q(user))
+
+    def get_list_versions(self):
+        return visible_team_versions(self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        GET /api/projects/<id>/stats/
+        Status x priority counts, overdue tasks and open tasks per assignee.
+        """
+        return Response(project_stats(self.get_object()))
 
     def perform_create(self, serializer):
         # تمام چک‌های دسترسی توی serializer انجام شده
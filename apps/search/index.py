@@ -0,0 +1,201 @@
+"""
+The FTS5 index behind /api/search/.
+
+One contentful FTS5 table holds a row per task (title + description) and
+per comment (content). Rows are keyed by rowid, so every write touches
+them through the rowid b-tree and never scans the index:
+
+    task     rowid = 2 * task.id
+    comment  rowid = 2 * comment.id + 1
+
+A task's body is its description followed by the text extracted from its
+attachment (AttachmentMetadata.text), so attachments are found through
+their task.
+
+team_id / task_id are stored UNINDEXED: team_id narrows the MATCH results
+to the visible teams inside the same statement, task_id points comments
+at their task.
+
+FTS5 only exists on SQLite; on any other backend every function here is
+a no-op and available() is False.
+"""
+import re
+
+from django.db import connection
+
+from apps.tasks.models import Task, Comment, AttachmentMetadata
+
+TASK, COMMENT = 0, 1
+# ids per statement, well under SQLite's bound-parameter limit
+CHUNK = 500
+MAX_TERMS = 8
+# shorter prefixes expand to too many terms to rank
+MIN_PREFIX = 3
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "team_id UNINDEXED, task_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '3')"
+)
+
+# the task row: description + attachment text
+TASK_SELECT = (
+    "SELECT 2 * t.id, t.team_id, t.id, t.title, t.description || COALESCE(char(10) || m.text, '') "
+    "FROM %s t LEFT JOIN %s m ON m.task_id = t.id AND m.status = 'done' "
+    % (Task._meta.db_table, AttachmentMetadata._meta.db_table)
+)
+
+# bm25 weights in column order: team_id, task_id, title, body
+RANK = "bm25(search_index, 0.0, 0.0, 10.0, 1.0)"
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def rowid(kind, pk):
+    return 2 * pk + kind
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK):
+        yield ids[start:start + CHUNK]
+
+
+def _placeholders(ids):
+    return ', '.join(['%s'] * len(ids))
+
+
+def _delete_rowids(cursor, rowids):
+    for chunk in _chunks(rowids):
+        cursor.execute("DELETE FROM search_index WHERE rowid IN (%s)" % _placeholders(chunk), chunk)
+
+
+# ----------------------------
+# WRITES
+# ----------------------------
+def index_tasks(task_ids):
+    """(Re)indexes the tasks as they are in the database now; missing ids are dropped."""
+    if not available() or not task_ids:
+        return
+    with connection.cursor() as cursor:
+        _delete_rowids(cursor, [rowid(TASK, pk) for pk in task_ids])
+        for chunk in _chunks(task_ids):
+            cursor.execute(
+                "INSERT INTO search_index (rowid, team_id, task_id, title, body) "
+                + TASK_SELECT + "WHERE t.id IN (%s)" % _placeholders(chunk),
+                chunk,
+            )
+
+
+def index_comments(comment_ids):
+    if not available() or not comment_ids:
+        return
+    with connection.cursor() as cursor:
+        _delete_rowids(cursor, [rowid(COMMENT, pk) for pk in comment_ids])
+        for chunk in _chunks(comment_ids):
+            # comments take the team of their task, which is what visibility follows
+            cursor.execute(
+                "INSERT INTO search_index (rowid, team_id, task_id, title, body) "
+                "SELECT 2 * c.id + 1, t.team_id, c.task_id, '', c.content "
+                "FROM %s c JOIN %s t ON t.id = c.task_id WHERE c.id IN (%s)"
+                % (Comment._meta.db_table, Task._meta.db_table, _placeholders(chunk)),
+                chunk,
+            )
+
+
+def remove(kind, pks):
+    if not available() or not pks:
+        return
+    with connection.cursor() as cursor:
+        _delete_rowids(cursor, [rowid(kind, pk) for pk in pks])
+
+
+def remove_task_comments(task_ids):
+    """
+    Drops the comment rows of deleted tasks. Only bulk deletes need this
+    (they remove comments without per-row signals), and it is the one
+    write that scans: task_id is not indexed by FTS5.
+    """
+    if not available() or not task_ids:
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(task_ids):
+            cursor.execute(
+                "DELETE FROM search_index WHERE rowid %% 2 = 1 AND task_id IN (%s)" % _placeholders(chunk),
+                chunk,
+            )
+
+
+def rebuild(batch_size=5000, stdout=None):
+    """Empties the index and refills it from the tables, one primary-key range per statement."""
+    if not available():
+        return 0
+    rows = 0
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute("DELETE FROM search_index")
+        for model, select in (
+            (Task, TASK_SELECT + "WHERE t.id > %s AND t.id <= %s"),
+            (Comment, "SELECT 2 * c.id + 1, t.team_id, c.task_id, '', c.content FROM {table} c "
+                      "JOIN %s t ON t.id = c.task_id WHERE c.id > %%s AND c.id <= %%s" % Task._meta.db_table),
+        ):
+            last_pk = 0
+            while True:
+                pks = list(model._base_manager.filter(pk__gt=last_pk).order_by('pk')
+                           .values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                cursor.execute(
+                    "INSERT INTO search_index (rowid, team_id, task_id, title, body) "
+                    + select.format(table=model._meta.db_table),
+                    [last_pk, pks[-1]],
+                )
+                rows += len(pks)
+                last_pk = pks[-1]
+            if stdout is not None:
+                stdout.write(f"{model._meta.label}: indexed up to pk {last_pk}")
+        # merge the b-tree segments left by the batches
+        cursor.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    return rows
+
+
+# ----------------------------
+# QUERIES
+# ----------------------------
+def match_expression(text):
+    """
+    Turns user input into an FTS5 query: every word must match, the last
+    one as a prefix when it is long enough (search-as-you-type). Words are
+    quoted, so FTS5 syntax in the input (AND, NEAR, "col:", stray quotes)
+    is searched as text.
+    """
+    terms = re.findall(r'\w+', text or '')[:MAX_TERMS]
+    if not terms:
+        return None
+    quoted = ['"%s"' % term for term in terms]
+    if len(terms[-1]) >= MIN_PREFIX:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(expression, team_ids, limit, offset=0):
+    """
+    [(kind, pk, task_id, score, snippet)] for the best matches in the
+    given teams, best first. Scores are BM25, higher is better.
+    """
+    if not available() or not team_ids:
+        return []
+    team_ids = list(team_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid, task_id, %s AS score, snippet(search_index, -1, '', '', '…', 12) "
+            "FROM search_index WHERE search_index MATCH %%s AND team_id IN (%s) "
+            "ORDER BY score LIMIT %%s OFFSET %%s" % (RANK, _placeholders(team_ids)),
+            [expression, *team_ids, limit, offset],
+        )
+        return [
+            (row_id % 2, row_id // 2, task_id, round(-score, 4), snippet)
+            for row_id, task_id, score, snippet in cursor.fetchall()
+        ]
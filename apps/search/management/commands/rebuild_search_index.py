@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.search import index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index from the tasks and comments tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not index.available():
+            self.stderr.write("The search index needs SQLite (FTS5), nothing to do.")
+            return
+        # one transaction: searches keep reading the old index until the new one is complete
+        with transaction.atomic():
+            rows = index.rebuild(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(f"indexed {rows} rows")
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# same as apps/search/index.py at the time of writing
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "team_id UNINDEXED, task_id UNINDEXED, title, body, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '3')"
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+
+    Task = apps.get_model('tasks', 'Task')
+    Comment = apps.get_model('tasks', 'Comment')
+    schema_editor.execute(
+        "INSERT INTO search_index (rowid, team_id, task_id, title, body) "
+        "SELECT 2 * id, team_id, id, title, description FROM %s" % Task._meta.db_table
+    )
+    schema_editor.execute(
+        "INSERT INTO search_index (rowid, team_id, task_id, title, body) "
+        "SELECT 2 * c.id + 1, t.team_id, c.task_id, '', c.content FROM %s c JOIN %s t ON t.id = c.task_id"
+        % (Comment._meta.db_table, Task._meta.db_table)
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_backfill_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
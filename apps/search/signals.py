@@ -0,0 +1,71 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.projects.models import Project
+from apps.projects.signals import project_moved
+from apps.tasks.models import Task, Comment, AttachmentMetadata
+from apps.tasks.signals import tasks_bulk_changed
+from . import index
+
+# The index is written in the same transaction as the rows it mirrors,
+# so a rolled back write leaves no trace in it either.
+INDEXED_TASK_FIELDS = {'title', 'description', 'project', 'team'}
+
+
+@receiver(post_save, sender=Task)
+def index_task_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_TASK_FIELDS & set(update_fields):
+        return
+    previous_team = instance._loaded_team_id
+    if not created and (instance._loaded_text, instance._loaded_project_id, previous_team) == (
+            (instance.title, instance.description), instance.project_id, instance.team_id):
+        # plain saves list every field in update_fields (CounterFieldsModel): compare with the row
+        return
+    index.index_tasks([instance.pk])
+    if not created and previous_team not in (None, instance.team_id):
+        # the comments are searchable by whoever can see the task now
+        index.index_comments(list(instance.comments.values_list('pk', flat=True)))
+
+
+@receiver(post_delete, sender=Task)
+def unindex_task_on_delete(sender, instance, **kwargs):
+    # cascaded comments send their own post_delete
+    index.remove(index.TASK, [instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def index_comment_on_save(sender, instance, **kwargs):
+    index.index_comments([instance.pk])
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment_on_delete(sender, instance, **kwargs):
+    index.remove(index.COMMENT, [instance.pk])
+
+
+@receiver(post_save, sender=AttachmentMetadata)
+def index_attachment_text(sender, instance, **kwargs):
+    index.index_tasks([instance.task_id])
+
+
+@receiver(post_delete, sender=AttachmentMetadata)
+def unindex_attachment_text(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Task):
+        # deleted with its task, which leaves the index on its own
+        return
+    index.index_tasks([instance.task_id])
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def index_tasks_on_bulk_write(sender, action, task_ids, fields=None, **kwargs):
+    if action == 'deleted':
+        index.remove(index.TASK, task_ids)
+        index.remove_task_comments(task_ids)
+    elif action == 'created' or fields is None or INDEXED_TASK_FIELDS & set(fields):
+        index.index_tasks(task_ids)
+
+
+@receiver(project_moved, sender=Project)
+def reindex_moved_project(sender, project, **kwargs):
+    index.index_tasks(list(Task.objects.filter(project=project).values_list('pk', flat=True)))
+    index.index_comments(list(Comment.objects.filter(task__project=project).values_list('pk', flat=True)))
@@ -0,0 +1,171 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+
+class SearchTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+
+        self.other_team = Teams.objects.create(name="Team B", owner=self.outsider)
+        self.other_project = Project.objects.create(name="Other", team=self.other_team, created_by=self.outsider)
+
+        self.invoice = self.task("Invoice export", "Export as CSV")
+        self.login = self.task("Login page", "Fix the invoice link in the footer")
+        self.hidden = Task.objects.create(title="Invoice secret", description="d", project=self.other_project,
+                                          created_by=self.outsider)
+        self.url = reverse("search")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def task(self, title, description="d"):
+        return Task.objects.create(title=title, description=description, project=self.project, created_by=self.owner)
+
+    def search(self, q, user=None, **params):
+        self.client.force_authenticate(user=user or self.member)
+        res = self.client.get(self.url, {"q": q, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res
+
+    def hits(self, q, user=None):
+        return [(row["type"], row["id"]) for row in self.search(q, user).data["results"]]
+
+    def indexed_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM search_index")
+            return cursor.fetchone()[0]
+
+    # ==========================================================
+    # RANKING AND VISIBILITY
+    # ==========================================================
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.hits("invoice"), [("task", self.invoice.id), ("task", self.login.id)])
+
+        row = self.search("invoice").data["results"][0]
+        self.assertEqual(row["title"], "Invoice export")
+        self.assertIn("Invoice", row["snippet"])
+        self.assertIsInstance(row["score"], float)
+
+    def test_other_teams_are_not_searched(self):
+        self.assertNotIn(("task", self.hidden.id), self.hits("invoice"))
+        self.assertEqual(self.hits("invoice", user=self.outsider), [("task", self.hidden.id)])
+
+    def test_prefix_and_hostile_input(self):
+        self.assertEqual(self.hits("invoice exp"), [("task", self.invoice.id)])
+        self.assertEqual(self.hits('invoice" OR title:*'), [])
+        self.assertEqual(self.hits("NEAR(invoice"), [])
+
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get(self.url, {"q": "  ?! "}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limit_and_offset(self):
+        for i in range(5):
+            self.task(f"Invoice {i}")
+        first = self.search("invoice", limit=4)
+        self.assertEqual(len(first.data["results"]), 4)
+        self.assertIsNone(first.data["previous"])
+
+        second = self.client.get(first.data["next"])
+        self.assertEqual(len(second.data["results"]), 3)
+        self.assertIsNone(second.data["next"])
+        ids = {row["id"] for row in first.data["results"] + second.data["results"]}
+        self.assertEqual(len(ids), 7)
+
+    def test_search_costs_three_queries(self):
+        Comment.objects.create(task=self.login, author=self.member, content="invoice footer is broken")
+        self.search("invoice")  # warm the visible-team cache
+        with self.assertNumQueries(3):
+            self.search("invoice")
+
+    # ==========================================================
+    # KEPT UP TO DATE
+    # ==========================================================
+
+    def test_comments_follow_saves_and_deletes(self):
+        comment = Comment.objects.create(task=self.login, author=self.member, content="the footer link is broken")
+        self.assertEqual(set(self.hits("footer")), {("task", self.login.id), ("comment", comment.id)})
+        self.assertEqual(self.hits("broken"), [("comment", comment.id)])
+
+        comment.content = "fixed now"
+        comment.save()
+        self.assertEqual(self.hits("broken"), [])
+
+        comment.delete()
+        self.assertEqual(self.hits("fixed"), [])
+
+    def test_task_edits_and_deletes(self):
+        self.invoice.title = "Receipt export"
+        self.invoice.save()
+        self.assertEqual(self.hits("receipt"), [("task", self.invoice.id)])
+        self.assertEqual(self.hits("invoice"), [("task", self.login.id)])
+
+        Comment.objects.create(task=self.login, author=self.member, content="footer")
+        self.login.delete()
+        self.assertEqual(self.hits("footer"), [])
+        self.assertEqual(self.indexed_rows(), 2)
+
+    def test_only_text_and_team_changes_reindex(self):
+        from apps.search import index
+        with mock.patch.object(index, "index_tasks", wraps=index.index_tasks) as index_tasks:
+            self.invoice.status = "done"
+            self.invoice.save()
+            self.client.force_authenticate(user=self.owner)
+            self.client.patch(reverse("task-detail", args=[self.invoice.id]), {"priority": 3}, format="json")
+            self.assertEqual(index_tasks.call_count, 0)
+
+            stale = Task.objects.get(pk=self.invoice.pk)
+            self.invoice.title = "Receipt export"
+            self.invoice.save()
+            # a stale copy putting the old title back is compared with the row, not with itself
+            stale.save()
+            self.assertEqual(index_tasks.call_count, 2)
+        self.assertEqual(set(self.hits("invoice")), {("task", self.invoice.id), ("task", self.login.id)})
+
+    def test_bulk_writes_and_project_moves(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.post(reverse("task-bulk"), [
+            {"title": "Quarterly report", "description": "d", "project": self.project.id},
+        ], format="json")
+        created = res.data["ids"][0]
+        self.assertEqual(self.hits("quarterly"), [("task", created)])
+
+        Comment.objects.create(task_id=created, author=self.owner, content="numbers look off")
+        self.client.post(reverse("task-bulk-mutate"), {"ids": [created], "delete": True}, format="json")
+        self.assertEqual(self.hits("quarterly"), [])
+        self.assertEqual(self.hits("numbers"), [])
+
+        new_team = Teams.objects.create(name="Team C", owner=self.owner)
+        self.project.team = new_team
+        self.project.save()
+        self.assertEqual(self.hits("invoice"), [])
+        self.assertEqual(len(self.hits("invoice", user=self.owner)), 2)
+
+    def test_rebuild_command(self):
+        Comment.objects.create(task=self.login, author=self.member, content="footer")
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_index")
+
+        call_command("rebuild_search_index", batch_size=1, stdout=StringIO())
+        self.assertEqual(self.indexed_rows(), 4)
+        self.assertEqual(set(self.hits("footer")), {("task", self.login.id), ("comment", self.login.comments.get().id)})
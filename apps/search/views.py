@@ -0,0 +1,85 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+
+from apps.tasks.models import Task, Comment
+from apps.teams.cache import visible_team_ids
+from apps.teams.visibility import visible_teams_q
+from . import index
+
+
+def _int_param(params, name, default, maximum):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return max(0, min(value, maximum))
+
+
+class SearchView(APIView):
+    """
+    GET /api/search/?q=<words>
+    Tasks (title, description) and comments of the visible teams, best
+    BM25 match first. Paged with ?limit= (up to 100) and ?offset=.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+    max_offset = 1000
+
+    def get(self, request):
+        if not index.available():
+            return Response({'detail': 'Search is only available on SQLite (FTS5).'},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        expression = index.match_expression(request.query_params.get('q'))
+        if expression is None:
+            return Response({'q': ['Enter at least one word to search for.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = _int_param(request.query_params, 'limit', self.default_limit, self.max_limit) or self.default_limit
+        offset = _int_param(request.query_params, 'offset', 0, self.max_offset)
+
+        # one extra row tells whether there is a next page, no COUNT over the matches
+        matches = index.search(expression, visible_team_ids(request.user), limit + 1, offset)
+        has_next = len(matches) > limit
+        results = self.resolve(request.user, matches[:limit])
+
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'offset', offset + limit) if has_next else None,
+            'previous': (
+                None if offset == 0
+                else remove_query_param(url, 'offset') if offset <= limit
+                else replace_query_param(url, 'offset', offset - limit)
+            ),
+            'results': results,
+        })
+
+    def resolve(self, user, matches):
+        """
+        Checks the matches against the tables (the index may briefly lag a
+        raw write) and adds the task titles: two queries per page.
+        """
+        task_ids = {task_id for _, _, task_id, _, _ in matches}
+        comment_ids = [pk for kind, pk, _, _, _ in matches if kind == index.COMMENT]
+
+        titles = dict(Task.objects.filter(visible_teams_q(user), pk__in=task_ids).values_list('pk', 'title'))
+        comments = set(
+            Comment.objects.filter(pk__in=comment_ids).values_list('pk', flat=True)
+        ) if comment_ids else set()
+
+        results = []
+        for kind, pk, task_id, score, snippet in matches:
+            if task_id not in titles or (kind == index.COMMENT and pk not in comments):
+                continue
+            results.append({
+                'type': 'task' if kind == index.TASK else 'comment',
+                'id': pk,
+                'task': task_id,
+                'title': titles[task_id],
+                'snippet': snippet,
+                'score': score,
+            })
+        return results
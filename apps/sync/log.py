@@ -0,0 +1,169 @@
+"""
+The change log behind /api/sync/.
+
+Every write to a project, task or comment records the object under its
+team (record()), in the writer's transaction: the team's sequence
+(TeamSequence) moves on by the number of objects, and each object's one
+Change row is upserted with its new number. A client's token is the
+number it has read up to in each of its teams; changes_since() returns
+the objects whose row moved past it.
+
+Deletes leave a tombstone. A delete cascading from a parent records only
+the parent: clients drop a project's tasks and comments, and a task's
+comments, with it. A row whose object has vanished in any other way is
+reported as deleted too, so the log never has to be exact about deletes.
+"""
+import base64
+import binascii
+import json
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .models import Change, TeamSequence
+
+# ids per read
+CHUNK = 500
+# rows per upsert, 6 parameters each: under SQLite's 32766 and PostgreSQL's 65535
+# (bulk_create would stop at 999 on SQLite, one statement per 166 rows)
+UPSERT_ROWS = 2500
+
+UPSERT_SQL = (
+    "INSERT INTO %s (team_id, kind, object_id, seq, deleted, changed_at) VALUES %%s "
+    "ON CONFLICT (team_id, kind, object_id) DO UPDATE SET "
+    "seq = excluded.seq, deleted = excluded.deleted, changed_at = excluded.changed_at"
+    % Change._meta.db_table
+)
+
+
+def chunks(items, size=CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ----------------------------
+# WRITES
+# ----------------------------
+def _advance(team_id, count):
+    """Moves the team's sequence on by `count`, returns the new value."""
+    sequences = TeamSequence.objects.filter(team_id=team_id)
+    if not sequences.update(value=F('value') + count):
+        # teams from before the log, or written without signals
+        TeamSequence.objects.bulk_create([TeamSequence(team_id=team_id)], ignore_conflicts=True)
+        sequences.update(value=F('value') + count)
+    return sequences.values_list('value', flat=True).get()
+
+
+def record(changes):
+    """
+    changes: (team id, kind, object id, deleted) tuples; the last one of an
+    object wins. Three queries per team, however many objects.
+    """
+    by_team = defaultdict(dict)
+    for team_id, kind, object_id, deleted in changes:
+        if team_id is not None and object_id is not None:
+            by_team[team_id][kind, object_id] = deleted
+    if not by_team:
+        return
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        # teams in a fixed order: two writers touching the same teams can't deadlock
+        for team_id in sorted(by_team):
+            objects = by_team[team_id]
+            first = _advance(team_id, len(objects)) - len(objects) + 1
+            rows = [
+                (team_id, kind, object_id, seq, deleted, now)
+                for seq, ((kind, object_id), deleted) in enumerate(objects.items(), start=first)
+            ]
+            for chunk in chunks(rows, UPSERT_ROWS):
+                values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk))
+                cursor.execute(UPSERT_SQL % values, [value for row in chunk for value in row])
+
+
+def prune(before):
+    """
+    Drops the tombstones older than `before`; returns how many. Tokens
+    from before the newest of them can't be served any more: those teams
+    are sent again in full (see changes_since()).
+    """
+    tombstones = Change.objects.filter(deleted=True, changed_at__lt=before)
+    with transaction.atomic():
+        newest = tombstones.order_by().values('team_id').annotate(newest=Max('seq')).values_list('team_id', 'newest')
+        for team_id, seq in newest:
+            TeamSequence.objects.filter(team_id=team_id, pruned__lt=seq).update(pruned=seq)
+        return tombstones.delete()[0]
+
+
+# ----------------------------
+# READS
+# ----------------------------
+def encode_token(positions):
+    """{team id: number} as an opaque, URL-safe token."""
+    data = json.dumps(sorted(positions.items()), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_token(token):
+    """The {team id: number} of a token (empty for none); ValueError when it is malformed."""
+    if not token:
+        return {}
+    try:
+        pairs = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return {int(team_id): int(seq) for team_id, seq in pairs}
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError('Invalid sync token.')
+
+
+def changes_since(team_ids, positions, limit):
+    """
+    The objects changed in the teams `team_ids` after `positions`, at most
+    `limit` change rows, oldest first within a team. Returns (changes,
+    positions, reset, more):
+
+        changes    set of (kind, object id)
+        positions  the {team id: number} to hand out as the next token
+        reset      teams the client has to drop first: no longer visible,
+                   or its token is older than the pruned tombstones (the
+                   team is then sent in full)
+        more       whether another call has more changes
+
+    A warm sync of unchanged teams is one query.
+    """
+    sequences = {
+        team_id: (value, pruned) for team_id, value, pruned
+        in TeamSequence.objects.filter(team_id__in=team_ids).values_list('team_id', 'value', 'pruned')
+    }
+    reset = sorted(set(positions) - set(team_ids))
+    positions = {team_id: positions.get(team_id, 0) for team_id in team_ids}
+    pending = {}
+    for team_id, since in positions.items():
+        value, pruned = sequences.get(team_id, (0, 0))
+        if since > value or 0 < since < pruned:
+            reset.append(team_id)
+            positions[team_id] = since = 0
+        if value > since:
+            pending[team_id] = since
+    if not pending:
+        return set(), positions, sorted(reset), False
+
+    where = reduce(or_, (Q(team_id=team_id, seq__gt=since) for team_id, since in pending.items()))
+    rows = list(
+        Change.objects.filter(where).order_by('team_id', 'seq').values_list('team_id', 'seq', 'kind', 'object_id')[:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    last_team = rows[-1][0] if more else None
+    for team_id in pending:
+        if last_team is None or team_id < last_team:
+            # read to the end
+            positions[team_id] = sequences[team_id][0]
+    for team_id, seq, _, _ in rows:
+        positions[team_id] = max(positions[team_id], seq) if team_id != last_team else seq
+    return {(kind, object_id) for _, _, kind, object_id in rows}, positions, sorted(reset), more
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.sync import log
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes sync tombstones older than --days. Clients that haven't synced "
+        "since get their teams in full on the next sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+
+    def handle(self, *args, **options):
+        removed = log.prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(f"removed {removed} tombstones")
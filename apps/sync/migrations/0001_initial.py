@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-17 03:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('teams', '0002_teams_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamSequence',
+            fields=[
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='teams.teams')),
+                ('value', models.PositiveBigIntegerField(default=0)),
+                ('pruned', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('task', 'Task'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('seq', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='teams.teams')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['team', 'seq'], name='sync_change_team_seq_idx'), models.Index(fields=['deleted', 'changed_at'], name='sync_change_tombstone_idx')],
+                'constraints': [models.UniqueConstraint(fields=('team', 'kind', 'object_id'), name='sync_change_object_unique')],
+            },
+        ),
+    ]
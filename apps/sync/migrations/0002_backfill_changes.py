@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def backfill_changes(apps, schema_editor):
+    """Every existing project, task and comment becomes a change of its team, so a first sync sends it."""
+    Teams = apps.get_model('teams', 'Teams')
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    Comment = apps.get_model('tasks', 'Comment')
+    TeamSequence = apps.get_model('sync', 'TeamSequence')
+    Change = apps.get_model('sync', 'Change')
+
+    now = timezone.now()
+    for team_id in Teams.objects.order_by('pk').values_list('pk', flat=True).iterator():
+        objects = [
+            (kind, pk)
+            for kind, model in (('project', Project), ('task', Task), ('comment', Comment))
+            for pk in model.objects.filter(team_id=team_id).order_by('pk').values_list('pk', flat=True).iterator()
+        ]
+        Change.objects.bulk_create([
+            Change(team_id=team_id, kind=kind, object_id=pk, seq=seq, changed_at=now)
+            for seq, (kind, pk) in enumerate(objects, start=1)
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        TeamSequence.objects.update_or_create(team_id=team_id, defaults={'value': len(objects)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('projects', '0005_project_activity'),
+        ('tasks', '0015_attachmentmetadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
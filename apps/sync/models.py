@@ -0,0 +1,54 @@
+from django.db import models
+from django.utils import timezone
+
+from apps.teams.models import Teams
+
+
+class TeamSequence(models.Model):
+    """
+    A team's change counter. Only moved by apps.sync.log.record(), with an
+    UPDATE ... F() that keeps the row locked until the writer commits: the
+    changes of a team commit in sequence order, so a reader never passes
+    over a number that is still in flight.
+    """
+    team = models.OneToOneField(Teams, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    value = models.PositiveBigIntegerField(default=0)
+    # newest number prune_sync_log dropped a tombstone of: older tokens have to start over
+    pruned = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"team {self.team_id}: {self.value}"
+
+
+class Change(models.Model):
+    """
+    The last change of one project, task or comment as seen by a team:
+    one row per object, moved to the team's next number on every write.
+    A tombstone (deleted) stays until prune_sync_log removes it.
+    """
+    PROJECT, TASK, COMMENT = 'project', 'task', 'comment'
+    KIND_CHOICES = (
+        (PROJECT, 'Project'),
+        (TASK, 'Task'),
+        (COMMENT, 'Comment'),
+    )
+    team = models.ForeignKey(Teams, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    seq = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'kind', 'object_id'], name='sync_change_object_unique'),
+        ]
+        indexes = [
+            # GET /api/sync/: seq > token, per team
+            models.Index(fields=['team', 'seq'], name='sync_change_team_seq_idx'),
+            # prune_sync_log
+            models.Index(fields=['deleted', 'changed_at'], name='sync_change_tombstone_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} @ team {self.team_id}:{self.seq}{' (deleted)' if self.deleted else ''}"
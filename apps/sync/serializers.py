@@ -0,0 +1,27 @@
+from rest_framework import serializers
+
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+
+# Flat rows, ids for every relation: what an offline copy stores.
+# Served through apps.core.fastpath, so keep them to plain model fields.
+
+class SyncProjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ['id', 'name', 'team', 'created_by', 'is_active', 'start_date', 'end_date', 'created_at',
+                  'comment_count', 'last_activity_at']
+
+
+class SyncTaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'description', 'project', 'created_by', 'assigned_to', 'status', 'priority',
+                  'due_date', 'attachment', 'created_at', 'comment_count', 'last_activity_at']
+
+
+class SyncCommentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Comment
+        fields = ['id', 'task', 'author', 'content', 'created_at']
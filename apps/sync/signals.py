@@ -0,0 +1,123 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.projects.models import Project
+from apps.projects.signals import project_moved
+from apps.tasks.models import Task, Comment, AttachmentMetadata
+from apps.tasks.signals import tasks_bulk_changed
+from . import log
+from .models import Change
+
+# Changes are recorded in the same transaction as the rows they describe:
+# Project, Task and Comment.save() send post_save inside their own atomic
+# block, deletes send post_delete inside the Collector's, and the bulk
+# writes in apps/tasks/bulk.py send tasks_bulk_changed inside theirs.
+# A task write also records its project, and a comment write its task and
+# project: their counters and last_activity_at moved with it.
+PROJECT, TASK, COMMENT = Change.PROJECT, Change.TASK, Change.COMMENT
+
+
+def _cascaded(origin, model):
+    # deleted with its project / task / team: the parent's tombstone covers it
+    return origin is not None and not isinstance(origin, model) and getattr(origin, 'model', None) is not model
+
+
+# ----------------------------
+# PROJECTS
+# ----------------------------
+@receiver(post_save, sender=Project)
+def record_project_save(sender, instance, **kwargs):
+    log.record([(instance.team_id, PROJECT, instance.pk, False)])
+
+
+@receiver(project_moved, sender=Project)
+def record_project_move(sender, project, previous_team_id, **kwargs):
+    # gone from the old team, arrives in the new one with all of its tasks and comments
+    tasks = Task.objects.filter(project=project).values_list('pk', flat=True)
+    comments = Comment.objects.filter(task__project=project).values_list('pk', flat=True)
+    log.record([
+        (previous_team_id, PROJECT, project.pk, True),
+        (project.team_id, PROJECT, project.pk, False),
+        *((project.team_id, TASK, pk, False) for pk in tasks),
+        *((project.team_id, COMMENT, pk, False) for pk in comments),
+    ])
+
+
+@receiver(post_delete, sender=Project)
+def record_project_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, Project):
+        return
+    log.record([(instance.team_id, PROJECT, instance.pk, True)])
+
+
+# ----------------------------
+# TASKS
+# ----------------------------
+@receiver(post_save, sender=Task)
+def record_task_save(sender, instance, created, **kwargs):
+    changes = [
+        (instance.team_id, TASK, instance.pk, False),
+        (instance.team_id, PROJECT, instance.project_id, False),
+    ]
+    previous_team = instance._loaded_team_id
+    previous_project = instance._loaded_project_id
+    if not created and previous_project not in (None, instance.project_id):
+        changes.append((previous_team, PROJECT, previous_project, False))
+    if not created and previous_team not in (None, instance.team_id):
+        changes.append((previous_team, TASK, instance.pk, True))
+        changes += [(instance.team_id, COMMENT, pk, False) for pk in instance.comments.values_list('pk', flat=True)]
+    log.record(changes)
+
+
+@receiver(post_delete, sender=Task)
+def record_task_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, Task):
+        return
+    log.record([
+        (instance.team_id, TASK, instance.pk, True),
+        (instance.team_id, PROJECT, instance.project_id, False),
+    ])
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def record_bulk_write(sender, action, rows, **kwargs):
+    deleted = action == 'deleted'
+    changes = []
+    for task_id, project_id, team_id in rows:
+        changes += [(team_id, TASK, task_id, deleted), (team_id, PROJECT, project_id, False)]
+    log.record(changes)
+
+
+@receiver(post_save, sender=AttachmentMetadata)
+def record_metadata_save(sender, instance, **kwargs):
+    log.record([(instance.task.team_id, TASK, instance.task_id, False)])
+
+
+@receiver(post_delete, sender=AttachmentMetadata)
+def record_metadata_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Task):
+        return
+    log.record([(instance.task.team_id, TASK, instance.task_id, False)])
+
+
+# ----------------------------
+# COMMENTS
+# ----------------------------
+def _comment_changes(instance, deleted):
+    return [
+        (instance.team_id, COMMENT, instance.pk, deleted),
+        (instance.team_id, TASK, instance.task_id, False),
+        (instance.team_id, PROJECT, instance.task.project_id, False),
+    ]
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_save(sender, instance, **kwargs):
+    log.record(_comment_changes(instance, False))
+
+
+@receiver(post_delete, sender=Comment)
+def record_comment_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin, Comment):
+        return
+    log.record(_comment_changes(instance, True))
@@ -0,0 +1,222 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+from apps.sync import log
+from apps.sync.models import Change, TeamSequence
+
+User = get_user_model()
+
+
+class SyncTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+
+        self.other_team = Teams.objects.create(name="Team B", owner=self.outsider)
+        self.other_project = Project.objects.create(name="Other", team=self.other_team, created_by=self.outsider)
+
+        self.task = self.create_task("Visible")
+        self.comment = Comment.objects.create(task=self.task, author=self.owner, content="hello")
+        self.hidden = Task.objects.create(title="Hidden", description="d", project=self.other_project,
+                                          created_by=self.outsider)
+        self.url = reverse("sync")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def create_task(self, title, project=None):
+        return Task.objects.create(title=title, description="d", project=project or self.project,
+                                   created_by=self.owner)
+
+    def sync(self, token=None, user=None, **params):
+        self.client.force_authenticate(user=user or self.member)
+        if token is not None:
+            params["since"] = token
+        res = self.client.get(self.url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res.data
+
+    def ids(self, data, key):
+        return [row["id"] for row in data[key]]
+
+    # ==========================================================
+    # FIRST AND WARM SYNCS
+    # ==========================================================
+
+    def test_first_sync_sends_the_visible_teams(self):
+        data = self.sync()
+        self.assertEqual(self.ids(data, "projects"), [self.project.id])
+        self.assertEqual(self.ids(data, "tasks"), [self.task.id])
+        self.assertEqual(self.ids(data, "comments"), [self.comment.id])
+        self.assertEqual(data["deleted"], {"projects": [], "tasks": [], "comments": []})
+        self.assertEqual((data["more"], data["reset_teams"]), (False, []))
+
+        task = data["tasks"][0]
+        self.assertEqual((task["title"], task["project"], task["status"]), ("Visible", self.project.id, "todo"))
+        self.assertEqual(data["comments"][0], {"id": self.comment.id, "task": self.task.id, "author": self.owner.id,
+                                               "content": "hello", "created_at": data["comments"][0]["created_at"]})
+
+    def test_warm_sync_sends_nothing(self):
+        token = self.sync()["token"]
+        self.client.force_authenticate(user=self.member)
+        self.client.get(self.url, {"since": token})
+        # the team sequences only; the visible teams come from the cache
+        with self.assertNumQueries(1):
+            data = self.sync(token)
+        self.assertEqual(data["token"], token)
+        self.assertEqual((data["projects"], data["tasks"], data["comments"]), ([], [], []))
+
+    def test_changes_and_deletes_since_the_token(self):
+        gone = self.create_task("Gone")
+        token = self.sync()["token"]
+
+        self.client.force_authenticate(user=self.owner)
+        self.client.patch(reverse("task-detail", args=[self.task.id]), {"status": "done"}, format="json")
+        self.client.delete(reverse("task-detail", args=[gone.id]))
+        self.client.delete(reverse("task-comments-detail", args=[self.task.id, self.comment.id]))
+        Task.objects.create(title="Hidden 2", description="d", project=self.other_project, created_by=self.outsider)
+
+        data = self.sync(token)
+        self.assertEqual(self.ids(data, "tasks"), [self.task.id])
+        self.assertEqual(data["tasks"][0]["status"], "done")
+        # its rollups moved
+        self.assertEqual(self.ids(data, "projects"), [self.project.id])
+        self.assertEqual(data["deleted"], {"projects": [], "tasks": [gone.id], "comments": [self.comment.id]})
+
+        # once only
+        data = self.sync(data["token"])
+        self.assertEqual((data["tasks"], data["deleted"]["tasks"]), ([], []))
+
+    def test_deleted_project_covers_its_tasks(self):
+        token = self.sync()["token"]
+        project_id = self.project.id
+        self.project.delete()
+        data = self.sync(token)
+        self.assertEqual(data["deleted"], {"projects": [project_id], "tasks": [], "comments": []})
+
+    def test_bulk_writes(self):
+        token = self.sync()["token"]
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.post(reverse("task-bulk-mutate"), {"ids": [self.task.id], "set": {"priority": 1}},
+                               format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        data = self.sync(token)
+        self.assertEqual(data["tasks"][0]["priority"], 1)
+
+        self.client.force_authenticate(user=self.owner)
+        self.client.post(reverse("task-bulk-mutate"), {"ids": [self.task.id], "delete": True}, format="json")
+        data = self.sync(data["token"])
+        self.assertEqual(data["deleted"]["tasks"], [self.task.id])
+
+    # ==========================================================
+    # MOVES AND VISIBILITY
+    # ==========================================================
+
+    def test_task_moved_out_of_sight_is_deleted(self):
+        token = self.sync()["token"]
+        self.task.project = self.other_project
+        self.task.save()
+        data = self.sync(token)
+        self.assertEqual(data["deleted"]["tasks"], [self.task.id])
+        self.assertEqual(Comment.objects.get(pk=self.comment.pk).team_id, self.other_team.id)
+
+        # and arrives for the other team with its comments
+        data = self.sync(user=self.outsider)
+        self.assertIn(self.task.id, self.ids(data, "tasks"))
+        self.assertEqual(self.ids(data, "comments"), [self.comment.id])
+
+    def test_project_moved_into_sight_brings_its_tasks(self):
+        token = self.sync()["token"]
+        self.other_team.members.add(self.member)
+        self.project.team = self.other_team
+        self.project.save()
+        data = self.sync(token)
+        # the tombstone left in team A is not a delete for someone who sees team B
+        self.assertEqual(data["deleted"], {"projects": [], "tasks": [], "comments": []})
+        self.assertEqual(self.ids(data, "projects"), [self.project.id, self.other_project.id])
+        self.assertEqual(self.ids(data, "tasks"), [self.task.id, self.hidden.id])
+        self.assertEqual(data["projects"][0]["team"], self.other_team.id)
+
+    def test_leaving_a_team_resets_it(self):
+        token = self.sync()["token"]
+        self.team.members.remove(self.member)
+        data = self.sync(token)
+        self.assertEqual(data["reset_teams"], [self.team.id])
+        self.assertEqual(log.decode_token(data["token"]), {})
+
+    # ==========================================================
+    # PAGING, TOKENS, PRUNING
+    # ==========================================================
+
+    def test_limit_pages_through_the_changes(self):
+        created = [self.create_task(f"T{i}").id for i in range(5)]
+        token = self.sync()["token"]
+        for task_id in created:
+            Task.objects.filter(pk=task_id).get().save()
+
+        seen, pages = [], 0
+        while True:
+            data = self.sync(token, limit=2)
+            seen += self.ids(data, "tasks")
+            token, pages = data["token"], pages + 1
+            if not data["more"]:
+                break
+        # five task rows and one project row: its row moved along with each save
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), created)
+
+    def test_invalid_token(self):
+        self.client.force_authenticate(user=self.member)
+        for token in ("not-a-token", log.encode_token({1: 2})[:-2] + "!!"):
+            res = self.client.get(self.url, {"since": token})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pruned_tombstones_send_the_team_again(self):
+        gone = self.create_task("Gone")
+        token = self.sync()["token"]
+        gone.delete()
+        Change.objects.filter(deleted=True).update(changed_at=timezone.now() - timedelta(days=100))
+        out = StringIO()
+        call_command("prune_sync_log", "--days", "90", stdout=out)
+        self.assertIn("removed 1 tombstones", out.getvalue())
+        self.assertFalse(Change.objects.filter(deleted=True).exists())
+
+        data = self.sync(token)
+        self.assertEqual(data["reset_teams"], [self.team.id])
+        self.assertEqual(self.ids(data, "tasks"), [self.task.id])
+        # after the reset, syncing goes on as usual
+        self.assertEqual(self.sync(data["token"])["reset_teams"], [])
+
+    def test_sequence_moves_once_per_write(self):
+        before = TeamSequence.objects.get(team=self.team).value
+        Comment.objects.create(task=self.task, author=self.owner, content="again")
+        # the comment, its task and its project
+        self.assertEqual(TeamSequence.objects.get(team=self.team).value, before + 3)
+        self.assertEqual(Change.objects.filter(team=self.team, kind=Change.TASK, object_id=self.task.id).count(), 1)
+
+    def test_failed_record_rolls_the_write_back(self):
+        with mock.patch.object(log, "record", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Comment.objects.create(task=self.task, author=self.owner, content="lost")
+            self.task.title = "lost"
+            with self.assertRaises(RuntimeError):
+                self.task.save()
+        self.assertFalse(Comment.objects.filter(content="lost").exists())
+        self.assertEqual(Task.objects.get(pk=self.task.pk).title, "Visible")
@@ -0,0 +1,79 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.fastpath import compile_serializer
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+from apps.teams.cache import visible_team_ids
+from apps.teams.visibility import visible_teams_q
+from . import log
+from .models import Change
+from .serializers import SyncProjectSerializer, SyncTaskSerializer, SyncCommentSerializer
+
+# response key, model, serializer per kind of change
+KINDS = (
+    (Change.PROJECT, 'projects', Project, SyncProjectSerializer),
+    (Change.TASK, 'tasks', Task, SyncTaskSerializer),
+    (Change.COMMENT, 'comments', Comment, SyncCommentSerializer),
+)
+
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?since=<token>
+    The projects, tasks and comments of the visible teams that changed
+    since the token was handed out (everything without one), plus the ids
+    deleted since, and the token to send next time:
+
+        {"token": "...", "more": false, "reset_teams": [],
+         "projects": [...], "tasks": [...], "comments": [...],
+         "deleted": {"projects": [...], "tasks": [...], "comments": [...]}}
+
+    Apply in that order: drop everything of `reset_teams`, then the deleted
+    ids (a deleted project takes its tasks and comments with it, a deleted
+    task its comments), then upsert the rows. With `more`, call again with
+    the new token right away. ?limit= caps the changes per response
+    (default 1000, up to 5000).
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 1000
+    max_limit = 5000
+
+    def get(self, request):
+        try:
+            positions = log.decode_token(request.query_params.get('since'))
+        except ValueError as exc:
+            return Response({'since': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except (TypeError, ValueError):
+            limit = self.default_limit
+
+        changes, positions, reset, more = log.changes_since(visible_team_ids(request.user), positions, limit)
+
+        body = {'token': log.encode_token(positions), 'more': more, 'reset_teams': reset}
+        deleted = {}
+        for kind, key, model, serializer_class in KINDS:
+            ids = sorted(object_id for changed_kind, object_id in changes if changed_kind == kind)
+            rows = self.rows(request, model, serializer_class, ids)
+            # tombstones, and rows gone or out of sight any other way
+            found = {row['id'] for row in rows}
+            body[key] = rows
+            deleted[key] = [pk for pk in ids if pk not in found]
+        body['deleted'] = deleted
+        return Response(body)
+
+    def rows(self, request, model, serializer_class, ids):
+        """The visible rows among `ids`, one query per CHUNK ids."""
+        serializer = serializer_class(context={'request': request})
+        compiled = compile_serializer(serializer)
+        rows = []
+        for chunk in log.chunks(ids):
+            queryset = model.objects.filter(visible_teams_q(request.user), pk__in=chunk).order_by('pk')
+            if compiled is not None:
+                rows += compiled.render(compiled.rows(queryset))
+            else:
+                rows += serializer_class(queryset, many=True, context={'request': request}).data
+        return rows
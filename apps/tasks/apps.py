@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TasksConfig(AppConfig):
     name = 'apps.tasks'
+
+    def ready(self):
+        from . import signals  # noqa: F401
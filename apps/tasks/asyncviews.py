@@ -0,0 +1,58 @@
+from django.db.models import Q
+from django.http import Http404
+
+from apps.core.asyncviews import AsyncReadView
+from apps.teams.visibility import avisible_teams_q
+from .models import Task, Comment
+from .pagination import TaskPagination, TaskCursorPagination, CommentCursorPagination, CursorSwitchMixin
+from .serializers import TaskSerializer, CommentCompactSerializer
+from .views import TaskFiltersMixin
+
+
+class AsyncTaskListView(CursorSwitchMixin, TaskFiltersMixin, AsyncReadView):
+    """GET /api/async/tasks/ -- GET /api/tasks/, same filters, pagination and count modes."""
+    serializer_class = TaskSerializer
+    pagination_class = TaskPagination
+    cursor_pagination_class = TaskCursorPagination
+    action = 'list'
+
+    async def get(self, request):
+        queryset = self.filter_tasks(Task.objects.filter(await avisible_teams_q(request.user)))
+        paginator = self.paginator
+        extra = paginator.get_row_fields(request) if hasattr(paginator, 'get_row_fields') else ()
+        return await self.paginated(queryset, self.get_compiled_serializer(), extra)
+
+
+class AsyncTaskDetailView(TaskFiltersMixin, AsyncReadView):
+    """GET /api/async/tasks/<id>/"""
+    serializer_class = TaskSerializer
+    action = 'retrieve'
+
+    async def get(self, request, pk):
+        queryset = self.filter_tasks(Task.objects.filter(await avisible_teams_q(request.user)))
+        compiled = self.get_compiled_serializer()
+        row = await self.rows(compiled, queryset.filter(pk=pk)).afirst()
+        if row is None:
+            raise Http404('No Task matches the given query.')
+        return self.render(await self.serialize(compiled, row, many=False))
+
+
+class AsyncCommentListView(AsyncReadView):
+    """GET /api/async/tasks/<task_id>/comments/"""
+    serializer_class = CommentCompactSerializer
+    action = 'list'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.paginator = CommentCursorPagination()
+
+    async def get(self, request, task_id):
+        user = request.user
+
+        # the same rule as CommentViewSet.get_queryset
+        queryset = Comment.objects.filter(task_id=task_id)
+        visible = await avisible_teams_q(user) | Q(assigned_to=user)
+        if not await Task.objects.filter(pk=task_id).filter(visible).aexists():
+            queryset = queryset.filter(author=user)
+
+        return await self.paginated(queryset, self.get_compiled_serializer(), self.paginator.get_row_fields(request))
@@ -0,0 +1,158 @@
+"""
+Resumable chunked attachment uploads, stored content-addressed.
+
+    POST  /api/tasks/uploads/       {filename, size, sha256?}  -> upload id, offset 0
+    PATCH /api/tasks/uploads/<id>/  raw bytes, Content-Range: bytes <start>-<end>/<size>
+    GET   /api/tasks/uploads/<id>/  offset to resume from after a failure
+
+Chunks are streamed from the request into a file of their own, never held
+in memory, and a dropped connection keeps the bytes that made it. Only
+the request that moves the upload's offset on (a conditional UPDATE)
+copies them into the part file, inside that UPDATE's transaction: two
+requests racing for one offset can't interleave their bytes, and a
+failed copy leaves the offset where it was. Once the part file is
+complete it is hashed, then either moved to blobs/<sha256> or, when a
+blob with the same hash exists, dropped: the same file attached to 30
+tasks is stored once.
+
+A hash state can't outlive the request, so the whole file is hashed as it
+streams only when it arrives in one request; files sent in several chunks
+are hashed in one pass over the part file when the last chunk is in.
+
+Part files are written in place, so they need a local (or shared)
+filesystem under MEDIA_ROOT: the default FileSystemStorage.
+"""
+import hashlib
+import os
+import re
+import shutil
+import uuid
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Blob, AttachmentUpload
+
+READ_SIZE = 1024 * 1024
+MAX_SIZE = 5 * 1024 ** 3
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """The chunk can't be taken; `offset` is where the client should resume."""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def parse_content_range(header):
+    """'bytes 0-1023/4096' -> (0, 1024, 4096): start, end (exclusive), total."""
+    match = CONTENT_RANGE.match((header or '').strip())
+    if not match:
+        raise ValueError('Expected a Content-Range header: "bytes <start>-<end>/<size>".')
+    start, last, total = map(int, match.groups())
+    if last < start or last >= total:
+        raise ValueError('Invalid Content-Range.')
+    return start, last + 1, total
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(READ_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chunk_path(upload):
+    """A file of its own for one request's chunk, next to the part file."""
+    return '%s.%s' % (default_storage.path(upload.part_name), uuid.uuid4().hex)
+
+
+def write_chunk(upload, start, end, stream):
+    """
+    Copies end - start bytes of `stream` into the part file at `start`.
+    Returns the upload, completed when this was the last chunk.
+    """
+    if upload.complete or start != upload.offset:
+        raise UploadError('Expected the chunk at offset %d.' % upload.offset, upload.offset)
+
+    path = default_storage.path(upload.part_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # the whole file in one request: hash it on the way in
+    digest = hashlib.sha256() if start == 0 and end == upload.size else None
+
+    chunk = chunk_path(upload)
+    try:
+        remaining = end - start
+        with open(chunk, 'wb') as out:
+            while remaining:
+                data = stream.read(min(READ_SIZE, remaining))
+                if not data:
+                    # client gone: keep what arrived, it resumes from there
+                    break
+                out.write(data)
+                if digest is not None:
+                    digest.update(data)
+                remaining -= len(data)
+
+        offset = end - remaining
+        with transaction.atomic():
+            # a concurrent request for the same offset wins or loses here; the
+            # UPDATE's lock holds the loser until the winner's bytes are in
+            if not AttachmentUpload.objects.filter(pk=upload.pk, offset=start, blob=None).update(
+                offset=offset, updated_at=timezone.now(),
+            ):
+                upload.refresh_from_db(fields=['offset', 'blob'])
+                raise UploadError('Expected the chunk at offset %d.' % upload.offset, upload.offset)
+            if start == 0:
+                os.replace(chunk, path)
+            else:
+                with open(chunk, 'rb') as data, open(path, 'r+b') as part:
+                    part.seek(start)
+                    shutil.copyfileobj(data, part, READ_SIZE)
+    finally:
+        if os.path.exists(chunk):
+            os.remove(chunk)
+    upload.offset = offset
+
+    if offset == upload.size:
+        complete(upload, digest.hexdigest() if digest is not None and not remaining else None)
+    return upload
+
+
+def complete(upload, sha256=None):
+    """Links the finished part file to its blob, storing it only when the content is new."""
+    path = default_storage.path(upload.part_name)
+    if sha256 is None:
+        sha256 = file_sha256(path)
+
+    if upload.sha256 and upload.sha256 != sha256:
+        os.remove(path)
+        AttachmentUpload.objects.filter(pk=upload.pk).update(offset=0, updated_at=timezone.now())
+        upload.offset = 0
+        raise UploadError('Checksum mismatch, the upload starts over.', 0)
+
+    name = Blob.name_for(sha256)
+    blob = Blob.objects.filter(sha256=sha256).first()
+    # restart the blob's grace period, so gc_blobs leaves it alone until it's attached;
+    # nothing updated means gc_blobs just removed it
+    if blob is not None and Blob.objects.filter(pk=blob.pk).update(touched_at=timezone.now()):
+        os.remove(path)
+    else:
+        target = default_storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # same name, same bytes: racing uploads of one file just replace each other
+        os.replace(path, target)
+        try:
+            with transaction.atomic():
+                blob = Blob.objects.create(sha256=sha256, size=upload.size, file=name)
+        except IntegrityError:
+            blob = Blob.objects.get(sha256=sha256)
+
+    AttachmentUpload.objects.filter(pk=upload.pk).update(blob=blob, updated_at=timezone.now())
+    upload.blob = blob
+    return blob
@@ -0,0 +1,394 @@
+"""
+Bulk task create/update, and set-based mutation.
+
+Items go through TaskBulkItemSerializer for the per-field checks (no
+queries), then the rules TaskSerializer.validate applies per task are
+applied once per distinct project / team and assignee:
+
+    projects   one in_bulk()
+    assignees  one in_bulk() + one membership query covering every (team, user) pair
+    tasks      one query for the visible tasks being updated
+
+Everything is written with bulk_create / bulk_update in one transaction,
+and only when every item is valid. The save() hooks and post_save signals
+don't run for bulk writes, so tasks_bulk_changed is sent instead, and the
+ProjectStats deltas are applied here.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.projects.models import Project
+from apps.teams.cache import visible_team_ids
+from apps.teams.models import Teams
+from apps.teams.visibility import visible_teams_q
+from apps.users.models import User
+from .models import Task, ProjectStats, Blob
+from .serializers import TaskBulkItemSerializer
+from .signals import tasks_bulk_changed
+
+MAX_ITEMS = 5000
+# rows per UPDATE ... CASE statement
+BATCH_SIZE = 500
+
+STRUCTURAL_FIELDS = ('title', 'description', 'due_date')
+EXECUTION_FIELDS = ('status', 'priority')
+
+
+class BulkError(Exception):
+    """Raised with a list of per-item error dicts, aligned with the input."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _validate_items(items, partial):
+    if not isinstance(items, list):
+        raise serializers.ValidationError({'non_field_errors': ['Expected a list of items.']})
+    if not items:
+        raise serializers.ValidationError({'non_field_errors': ['This list may not be empty.']})
+    if len(items) > MAX_ITEMS:
+        raise serializers.ValidationError(
+            {'non_field_errors': ['Ensure this list has no more than %d items.' % MAX_ITEMS]}
+        )
+
+    child = TaskBulkItemSerializer(partial=partial)
+    validated, errors = [], []
+    for item in items:
+        try:
+            validated.append(child.run_validation(item))
+            errors.append({})
+        except serializers.ValidationError as exc:
+            # keep going, so one response lists every problem
+            validated.append(None)
+            errors.append(dict(exc.detail))
+    return validated, errors
+
+
+def _add_error(errors, index, field, message):
+    errors[index].setdefault(field, []).append(message)
+
+
+def _invalid_pk(pk):
+    return 'Invalid pk "%s" - object does not exist.' % pk
+
+
+def _assignees(items, team_of):
+    """
+    Resolves `assigned_to` ids to users and checks them against the team
+    each item lands in: (user, team) pairs -> is the user owner/member.
+    """
+    user_ids = {item['assigned_to'] for item in items if item and item.get('assigned_to') is not None}
+    users = User.objects.in_bulk(user_ids) if user_ids else {}
+
+    pairs = {(team_of(i), item['assigned_to']) for i, item in enumerate(items)
+             if item and item.get('assigned_to') in users and team_of(i) is not None}
+    team_ids = {team_id for team_id, _ in pairs}
+    members = set(
+        Teams.members.through.objects.filter(teams_id__in=team_ids, user_id__in=user_ids)
+        .values_list('teams_id', 'user_id')
+    ) if pairs else set()
+    return users, members
+
+
+def _send_changed(action, rows, fields=None):
+    """rows: (task id, project id, team id) for every task written."""
+    tasks_bulk_changed.send(
+        sender=Task, action=action,
+        task_ids=[row[0] for row in rows],
+        project_ids={row[1] for row in rows},
+        team_ids={row[2] for row in rows},
+        fields=fields,
+        rows=rows,
+    )
+
+
+def _stats_cells(ids):
+    """Counter of the ProjectStats cells the tasks are in now, one grouped query."""
+    rows = (Task._base_manager.filter(pk__in=ids).order_by()
+            .values_list('project_id', 'status', 'priority').annotate(n=Count('pk')))
+    return Counter({(project_id, status, priority): n for project_id, status, priority, n in rows})
+
+
+def _check_due_date(errors, index, item):
+    due_date = item.get('due_date')
+    if due_date and due_date < timezone.now().date():
+        _add_error(errors, index, 'due_date', 'Due date cannot be in the past.')
+
+
+def prepare_tasks(user, items, allow_past_due=False):
+    """
+    Validates create items and builds their (unsaved) tasks. Returns
+    (tasks, errors), both aligned with the input: tasks[i] is None when
+    errors[i] isn't empty.
+    """
+    items, errors = _validate_items(items, partial=False)
+
+    project_ids = {item['project'] for item in items if item}
+    projects = Project.objects.select_related('team').in_bulk(project_ids)
+    visible = set(visible_team_ids(user))
+
+    def team_of(index):
+        project = projects.get(items[index]['project']) if items[index] else None
+        return project.team_id if project else None
+
+    users, members = _assignees(items, team_of)
+
+    tasks = [None] * len(items)
+    for index, item in enumerate(items):
+        if item is None:
+            continue
+        project = projects.get(item['project'])
+        if project is None:
+            _add_error(errors, index, 'project', _invalid_pk(item['project']))
+            continue
+        if project.team_id not in visible:
+            _add_error(errors, index, 'non_field_errors',
+                       'You do not have permission to create a task in this project.')
+            continue
+
+        assigned_to = item.get('assigned_to')
+        if assigned_to is not None:
+            if assigned_to not in users:
+                _add_error(errors, index, 'assigned_to', _invalid_pk(assigned_to))
+            elif assigned_to != project.team.owner_id and (project.team_id, assigned_to) not in members:
+                _add_error(errors, index, 'non_field_errors', 'Assigned user must be a member of the team.')
+        if not allow_past_due:
+            _check_due_date(errors, index, item)
+        if errors[index]:
+            continue
+
+        fields = {name: value for name, value in item.items() if name not in ('id', 'project', 'assigned_to')}
+        tasks[index] = Task(
+            project=project, team_id=project.team_id, assigned_to_id=assigned_to,
+            created_by=user, **fields
+        )
+    return tasks, errors
+
+
+def create_tasks(tasks):
+    """Writes prepared tasks with bulk_create, plus what the per-row signals would have done."""
+    if not tasks:
+        return []
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create(tasks)
+        ProjectStats.apply(Counter(task.stats_cell for task in tasks))
+        _send_changed('created', [(task.pk, task.project_id, task.team_id) for task in tasks])
+    return tasks
+
+
+def bulk_create_tasks(user, items):
+    tasks, errors = prepare_tasks(user, items)
+    if any(errors):
+        raise BulkError(errors)
+    return create_tasks(tasks)
+
+
+def bulk_update_tasks(user, items):
+    items, errors = _validate_items(items, partial=True)
+
+    for index, item in enumerate(items):
+        if item is not None and item.get('id') is None:
+            _add_error(errors, index, 'id', 'This field is required.')
+            items[index] = None
+        elif item is not None and 'project' in item:
+            _add_error(errors, index, 'project', 'Tasks cannot be moved in bulk.')
+            items[index] = None
+
+    ids = [item['id'] for item in items if item]
+    if len(ids) != len(set(ids)):
+        seen = set()
+        for index, item in enumerate(items):
+            if item and item['id'] in seen:
+                _add_error(errors, index, 'id', 'Duplicate task.')
+            elif item:
+                seen.add(item['id'])
+
+    tasks = Task.objects.filter(visible_teams_q(user)).select_related('team').in_bulk(ids)
+
+    def team_of(index):
+        task = tasks.get(items[index]['id']) if items[index] else None
+        return task.team_id if task else None
+
+    users, members = _assignees(items, team_of)
+
+    changed, fields, deltas = [], set(), Counter()
+    for index, item in enumerate(items):
+        if item is None:
+            continue
+        task = tasks.get(item['id'])
+        if task is None:
+            _add_error(errors, index, 'id', 'Not found.')
+            continue
+        owner_id = task.team.owner_id
+
+        # same rules as TaskSerializer.validate on update
+        if any(name in item for name in STRUCTURAL_FIELDS) and user.id not in (task.created_by_id, owner_id):
+            _add_error(errors, index, 'non_field_errors',
+                       'Only task creator or team owner can modify task details.')
+        if any(name in item for name in EXECUTION_FIELDS) and user.id not in (task.assigned_to_id, owner_id):
+            _add_error(errors, index, 'non_field_errors',
+                       'Only assigned user or team owner can update task status or priority.')
+        if 'assigned_to' in item:
+            assigned_to = item['assigned_to']
+            if user.id != owner_id:
+                _add_error(errors, index, 'non_field_errors', 'Only team owner can change task assignee.')
+            elif assigned_to is not None and assigned_to not in users:
+                _add_error(errors, index, 'assigned_to', _invalid_pk(assigned_to))
+            elif assigned_to is not None and assigned_to != owner_id and (task.team_id, assigned_to) not in members:
+                _add_error(errors, index, 'non_field_errors', 'Assigned user must be a member of the team.')
+        _check_due_date(errors, index, item)
+
+        deltas[task.stats_cell] -= 1
+        for name, value in item.items():
+            if name == 'id':
+                continue
+            attname = 'assigned_to_id' if name == 'assigned_to' else name
+            setattr(task, attname, value)
+            fields.add(attname)
+        deltas[task.stats_cell] += 1
+        changed.append(task)
+
+    if any(errors):
+        raise BulkError(errors)
+
+    now = timezone.now()
+    for task in changed:
+        task.last_activity_at = now
+
+    with transaction.atomic():
+        if fields:
+            Task.objects.bulk_update(changed, sorted(fields | {'last_activity_at'}), batch_size=BATCH_SIZE)
+        ProjectStats.apply(deltas)
+        _send_changed('updated', [(task.pk, task.project_id, task.team_id) for task in changed], fields)
+    return changed
+
+
+# ----------------------------
+# SET-BASED MUTATION
+# ----------------------------
+MAX_MUTATED = 20000
+LISTED_IDS = 50
+
+
+class MutationError(Exception):
+    def __init__(self, message, task_ids=None):
+        super().__init__(message)
+        self.detail = {'non_field_errors': [message]}
+        if task_ids is not None:
+            self.detail['task_ids'] = list(task_ids)
+
+
+def _target(user, data):
+    queryset = Task.objects.filter(visible_teams_q(user))
+    if 'ids' in data:
+        return queryset.filter(pk__in=set(data['ids']))
+
+    lookups = dict(data['filter'])
+    if lookups.get('assigned_to') == 'me':
+        lookups['assigned_to'] = user.id
+    return queryset.filter(**lookups)
+
+
+def _refuse(target, allowed, message):
+    """Fails when any target task does not match `allowed`, listing a few of them."""
+    violators = list(target.exclude(allowed).order_by('pk').values_list('pk', flat=True)[:LISTED_IDS])
+    if violators:
+        raise MutationError(message, violators)
+
+
+def _delete(ids):
+    """
+    DELETE by id, without Django's collector loading every row to send
+    pre/post_delete: rows pointing at the tasks are deleted (CASCADE) or
+    detached (SET_NULL) with one statement per relation first.
+    """
+    # the comments leave their projects' rollups with the tasks
+    removed = (Task._base_manager.filter(pk__in=ids, comment_count__gt=0).order_by()
+               .values_list('project_id').annotate(count=Sum('comment_count')))
+    for project_id, count in removed:
+        Project.objects.filter(pk=project_id).update(comment_count=Greatest(F('comment_count') - count, 0))
+    ProjectStats.apply({cell: -n for cell, n in _stats_cells(ids).items()})
+    Blob.adjust({
+        blob_id: -n for blob_id, n in Task._base_manager.filter(pk__in=ids, blob__isnull=False).order_by()
+        .values_list('blob_id').annotate(n=Count('pk'))
+    })
+
+    for relation in Task._meta.related_objects:
+        related = relation.related_model._base_manager.filter(**{'%s__in' % relation.field.name: ids})
+        on_delete = relation.on_delete.__name__
+        if on_delete == 'CASCADE' and not relation.related_model._meta.related_objects:
+            related._raw_delete(related.db)
+        elif on_delete == 'SET_NULL':
+            related.update(**{relation.field.name: None})
+        else:
+            # anything else needs the collector
+            related.delete()
+    queryset = Task._base_manager.filter(pk__in=ids)
+    queryset._raw_delete(queryset.db)
+
+
+def mutate_tasks(user, data):
+    """
+    Applies data['set'] (or a delete) to every task in data['ids'] /
+    data['filter'] with one UPDATE / DELETE. The TaskSerializer.validate
+    rules are checked as queries over the whole target set; nothing is
+    written when any task fails them. Returns the affected ids.
+    """
+    target = _target(user, data)
+    changes = data.get('set', {})
+    owner = Q(team__owner=user)
+
+    with transaction.atomic():
+        rows = list(target.select_for_update().order_by('pk').values_list('pk', 'project_id', 'team_id')[:MAX_MUTATED + 1])
+        if len(rows) > MAX_MUTATED:
+            raise MutationError('More than %d tasks match, narrow the filter.' % MAX_MUTATED)
+        ids = [row[0] for row in rows]
+
+        if 'ids' in data:
+            missing = sorted(set(data['ids']) - set(ids))
+            if missing:
+                raise MutationError('Tasks not found.', missing[:LISTED_IDS])
+
+        # ---- same rules as TaskSerializer.validate on update ----
+        if 'due_date' in changes:
+            _refuse(target, Q(created_by=user) | owner,
+                    'Only task creator or team owner can modify task details.')
+            if changes['due_date'] and changes['due_date'] < timezone.now().date():
+                raise MutationError('Due date cannot be in the past.')
+        if 'status' in changes or 'priority' in changes:
+            _refuse(target, Q(assigned_to=user) | owner,
+                    'Only assigned user or team owner can update task status or priority.')
+        if 'assigned_to' in changes:
+            _refuse(target, owner, 'Only team owner can change task assignee.')
+            assignee = changes['assigned_to']
+            if assignee is not None:
+                if not User.objects.filter(pk=assignee).exists():
+                    raise MutationError(_invalid_pk(assignee))
+                # every team the tasks live in must have the assignee as owner or member
+                _refuse(target, Q(team__owner_id=assignee) | Q(team__members__id=assignee),
+                        'Assigned user must be a member of the team.')
+
+        if ids:
+            if data['delete']:
+                _delete(ids)
+            else:
+                fields = {('assigned_to_id' if name == 'assigned_to' else name): value
+                          for name, value in changes.items()}
+                if 'status' in changes or 'priority' in changes:
+                    deltas = Counter()
+                    for (project_id, status, priority), n in _stats_cells(ids).items():
+                        deltas[(project_id, status, priority)] -= n
+                        deltas[(project_id, changes.get('status', status), changes.get('priority', priority))] += n
+                    ProjectStats.apply(deltas)
+                Task._base_manager.filter(pk__in=ids).update(last_activity_at=timezone.now(), **fields)
+            if data['delete']:
+                _send_changed('deleted', rows)
+            else:
+                _send_changed('updated', rows, set(fields))
+    return ids
@@ -0,0 +1,163 @@
+"""
+Attachment downloads: GET /api/tasks/<id>/attachment/, after the same
+visibility check as the task itself.
+
+    conditional  ETag (the blob's SHA-256, or size + mtime for plain
+                 files) and Last-Modified; If-None-Match /
+                 If-Modified-Since answer 304 without touching the file
+    ranges       one "Range: bytes=" range per request answers 206 (If-Range
+                 respected); an unsatisfiable one answers 416, several are
+                 served as the whole file
+    offload      with ATTACHMENT_OFFLOAD set, no file byte goes through
+                 Python: the response carries X-Accel-Redirect (nginx) or
+                 X-Sendfile (Apache, lighttpd) and the proxy sends the file,
+                 ranges included
+    otherwise    a FileResponse: WSGI servers with wsgi.file_wrapper send it
+                 with sendfile(); a range is the file seeked to its start plus
+                 a Content-Length, which gunicorn's sendfile honours too
+
+nginx, with ATTACHMENT_OFFLOAD = 'x-accel-redirect':
+
+    location /protected-media/ {
+        internal;
+        alias /path/to/media/;
+    }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+X_ACCEL_REDIRECT = 'x-accel-redirect'
+X_SENDFILE = 'x-sendfile'
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _FileRange:
+    """
+    `length` bytes of `file` from `start`. Keeps fileno(), so a
+    sendfile-based wsgi.file_wrapper still sends it zero-copy.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file, self.remaining = file, length
+
+    def read(self, size=-1):
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end exclusive) of a single "bytes=" range, None to send the whole
+    file (no header, or a form not handled), or False when unsatisfiable.
+    """
+    match = RANGE.match((header or '').replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+        if last and int(last) < start:
+            return None
+    else:
+        # suffix: the last N bytes
+        start, end = max(size - int(last), 0), size
+        if not int(last):
+            return False
+    if start >= size:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        # strong comparison only
+        return value == etag
+    date = parse_http_date_safe(value)
+    return date is not None and int(mtime) <= date
+
+
+def serve(request, name, filename, etag=None):
+    """The storage file `name`, downloaded as `filename`."""
+    path = default_storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if etag is None:
+        etag = '"%x-%x"' % (stat.st_size, int(stat.st_mtime))
+
+    content_type, encoding = mimetypes.guess_type(filename)
+    if content_type is None or encoding:
+        # a .gz is downloaded as is, not decoded by the browser
+        content_type = 'application/octet-stream'
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': "attachment; filename*=UTF-8''%s" % quote(filename),
+        # behind a permission check: browsers may keep it, shared caches may not
+        'Cache-Control': 'private, no-cache',
+    }
+    # 304 / 412 before the file is opened
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if conditional is not None:
+        for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+            conditional[header] = headers[header]
+        return conditional
+
+    offload = getattr(settings, 'ATTACHMENT_OFFLOAD', None)
+    if offload == X_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = getattr(settings, 'ATTACHMENT_ACCEL_PREFIX', '/protected-media/') + quote(name)
+    elif offload == X_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _file_response(request, path, stat.st_size, etag, stat.st_mtime, content_type)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _file_response(request, path, size, etag, mtime, content_type):
+    byte_range = parse_range(request.headers.get('Range'), size) if _if_range_matches(request, etag, mtime) else None
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%d' % size
+        return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = size
+        return response
+
+    start, end = byte_range
+    response = FileResponse(_FileRange(file, start, end - start), status=206, content_type=content_type)
+    response['Content-Length'] = end - start
+    response['Content-Range'] = 'bytes %d-%d/%d' % (start, end - 1, size)
+    return response
@@ -0,0 +1,165 @@
+"""
+Row readers for task imports. Each one reads the file as a stream and
+yields one dict per task in TaskBulkItemSerializer's shape (or a
+RowError), never holding more than a read buffer and one row:
+
+    csv      header row, then one task per row (the columns of the export work)
+    ndjson   one JSON object per line
+    trello   a board export: its "cards" array
+    jira     a search / export result: its "issues" array
+
+Trello and Jira exports are a single JSON document, so their array is
+walked item by item with JSONDecoder.raw_decode over a sliding buffer
+instead of json.load()-ing the whole file.
+"""
+import csv
+import io
+import json
+import re
+
+COLUMNS = ('title', 'description', 'project', 'assigned_to', 'status', 'priority', 'due_date')
+READ_SIZE = 64 * 1024
+
+JIRA_PRIORITIES = {'highest': 1, 'high': 1, 'medium': 2, 'low': 3, 'lowest': 3}
+JIRA_STATUSES = {'new': 'todo', 'indeterminate': 'doing', 'done': 'done'}
+
+
+class RowError(Exception):
+    """A row that could not be read at all; the import goes on with the next one."""
+
+
+def _clean(row):
+    # only the task columns; empty cells count as missing
+    return {name: row[name] for name in COLUMNS if row.get(name) not in (None, '')}
+
+
+def read_csv(text):
+    for row in csv.DictReader(text):
+        yield _clean(row)
+
+
+def read_ndjson(text):
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield RowError('Invalid JSON.')
+            continue
+        yield _clean(row) if isinstance(row, dict) else RowError('Expected a JSON object.')
+
+
+def iter_json_array(text, key):
+    """
+    Yields the items of the first `"key": [...]` array in a JSON document,
+    one at a time. Objects under the same key that aren't arrays (Trello's
+    "limits": {"cards": {...}}) are skipped.
+    """
+    decoder = json.JSONDecoder()
+    opening = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer, position = '', 0
+
+    def fill():
+        nonlocal buffer, position
+        chunk = text.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        return bool(chunk)
+
+    # find the array; keep a tail in the buffer in case the key spans two reads
+    while True:
+        match = opening.search(buffer, position)
+        if match:
+            position = match.end()
+            break
+        position = max(position, len(buffer) - len(key) - 64)
+        if not fill():
+            return
+
+    while True:
+        # skip separators, refilling as needed
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or not fill():
+                break
+        if position >= len(buffer) or buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # the item runs past the buffer
+            if not fill():
+                raise ValueError('Truncated JSON array "%s".' % key)
+            continue
+        position = end
+        yield item
+
+
+def _trello_card(card):
+    row = {'title': card.get('name', ''), 'description': card.get('desc', ''),
+           'status': 'done' if card.get('dueComplete') or card.get('closed') else 'todo'}
+    if card.get('due'):
+        row['due_date'] = card['due'][:10]
+    return row
+
+
+def read_trello(text):
+    for card in iter_json_array(text, 'cards'):
+        yield _trello_card(card) if isinstance(card, dict) else RowError('Expected a card object.')
+
+
+def _jira_text(node):
+    # Jira Cloud sends descriptions as a document tree (Atlassian Document
+    # Format); keep its text, a paragraph per line
+    if isinstance(node, str):
+        return node
+    if not isinstance(node, dict):
+        return ''
+    if node.get('type') == 'text':
+        return node.get('text', '')
+    if node.get('type') == 'hardBreak':
+        return '\n'
+    text = ''.join(_jira_text(child) for child in node.get('content') or [])
+    return text + '\n' if node.get('type') in ('paragraph', 'heading') else text
+
+
+def _jira_issue(issue):
+    fields = issue.get('fields') or {}
+    row = {
+        'title': fields.get('summary', ''),
+        'description': _jira_text(fields.get('description')).strip(),
+    }
+    category = ((fields.get('status') or {}).get('statusCategory') or {}).get('key')
+    if category in JIRA_STATUSES:
+        row['status'] = JIRA_STATUSES[category]
+    priority = ((fields.get('priority') or {}).get('name') or '').lower()
+    if priority in JIRA_PRIORITIES:
+        row['priority'] = JIRA_PRIORITIES[priority]
+    if fields.get('duedate'):
+        row['due_date'] = fields['duedate']
+    return row
+
+
+def read_jira(text):
+    for issue in iter_json_array(text, 'issues'):
+        yield _jira_issue(issue) if isinstance(issue, dict) else RowError('Expected an issue object.')
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+    'trello': read_trello,
+    'jira': read_jira,
+}
+
+
+def open_rows(binary, fmt):
+    """Rows of the binary file object `binary`, decoded as UTF-8 (a BOM is dropped)."""
+    text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    try:
+        yield from READERS[fmt](text)
+    finally:
+        # hand the file back open: the caller owns it (and reads tell() from it)
+        text.detach()
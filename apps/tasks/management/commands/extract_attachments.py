@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.tasks.models import Task, AttachmentMetadata
+from apps.tasks.tasks import extract_attachment_metadata
+
+
+class Command(BaseCommand):
+    help = (
+        "Queues metadata extraction for attachments that have none yet (uploaded "
+        "before the pipeline existed), or with --failed, retries the failed ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help="retry failed extractions too")
+        parser.add_argument('--sync', action='store_true', help="extract here instead of in a Celery worker")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        missing = Q(attachment_metadata=None)
+        if options['failed']:
+            missing |= Q(attachment_metadata__status='failed')
+        tasks = Task._base_manager.exclude(attachment='').exclude(attachment=None).filter(missing)
+
+        queued, last_pk = 0, 0
+        while True:
+            batch = list(tasks.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'attachment')[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, name in batch:
+                AttachmentMetadata.objects.update_or_create(task_id=pk, defaults={'file': name, 'status': 'pending'})
+                if options['sync']:
+                    extract_attachment_metadata(pk)
+                else:
+                    extract_attachment_metadata.delay(pk)
+            queued += len(batch)
+        self.stdout.write(f"attachments: {queued} queued")
@@ -0,0 +1,71 @@
+import glob
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.tasks.models import Task, Blob, AttachmentUpload
+
+
+def _remove(name):
+    try:
+        os.remove(default_storage.path(name))
+    except FileNotFoundError:
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes attachment blobs no task refers to, and chunked uploads "
+        "left unfinished or unattached, once they are older than the grace period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        batch_size = options['batch_size']
+
+        # ---- upload sessions: the unfinished ones take their part file along ----
+        uploads = 0
+        while True:
+            stale = list(AttachmentUpload.objects.filter(updated_at__lt=cutoff).order_by('pk')[:batch_size])
+            if not stale:
+                break
+            for upload in stale:
+                if not upload.complete:
+                    _remove(upload.part_name)
+                # chunk files of a worker killed mid-request
+                for leftover in glob.glob(glob.escape(default_storage.path(upload.part_name)) + '.*'):
+                    os.remove(leftover)
+            AttachmentUpload.objects.filter(pk__in=[upload.pk for upload in stale]).delete()
+            uploads += len(stale)
+        self.stdout.write(f"uploads: {uploads} removed")
+
+        # ---- blobs at zero references ----
+        # ref_count is only trusted as a hint: the task table is checked under the row lock
+        orphaned = Blob.objects.filter(ref_count=0, touched_at__lt=cutoff).filter(
+            ~Exists(Task._base_manager.filter(blob=OuterRef('pk')))
+        )
+        blobs, size, last_pk = 0, 0, 0
+        while True:
+            pks = list(orphaned.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            with transaction.atomic():
+                locked = list(orphaned.select_for_update().filter(pk__in=pks))
+                Blob.objects.filter(pk__in=[blob.pk for blob in locked]).delete()
+                # before the commit: an upload of the same bytes waits on the lock, and
+                # only then finds the blob gone and stores the file again
+                for blob in locked:
+                    _remove(blob.file.name)
+            blobs += len(locked)
+            size += sum(blob.size for blob in locked)
+        self.stdout.write(f"blobs: {blobs} removed, {size} bytes freed")
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes Task.comment_count / last_activity_at and their Project "
+        "rollups from the comments table, one primary-key range at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        comments = Comment.objects.filter(task=OuterRef('pk')).order_by().values('task')
+        fixed = self.repair(Task, batch_size, {
+            'comment_count': Coalesce(Subquery(comments.annotate(n=Count('pk')).values('n')), 0),
+            # task edits count as activity too, so this never moves backwards
+            'last_activity_at': Greatest(
+                'last_activity_at',
+                Coalesce(Subquery(comments.annotate(m=Max('created_at')).values('m')), 'created_at'),
+            ),
+        })
+        self.stdout.write(f"tasks: {fixed} batches")
+
+        tasks = Task.objects.filter(project=OuterRef('pk')).order_by().values('project')
+        fixed = self.repair(Project, batch_size, {
+            'comment_count': Coalesce(Subquery(tasks.annotate(n=Sum('comment_count')).values('n')), 0),
+            'last_activity_at': Subquery(tasks.annotate(m=Max('last_activity_at')).values('m')),
+        })
+        self.stdout.write(f"projects: {fixed} batches")
+
+    def repair(self, model, batch_size, values):
+        batches, last_pk = 0, 0
+        while True:
+            pks = list(
+                model._base_manager.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return batches
+            # short transactions: the F() updates from live traffic only wait for one batch
+            with transaction.atomic():
+                model._base_manager.filter(pk__gt=last_pk, pk__lte=pks[-1]).update(**values)
+            batches += 1
+            last_pk = pks[-1]
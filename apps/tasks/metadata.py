@@ -0,0 +1,178 @@
+"""
+Attachment metadata: size, MIME type, SHA-256 and, for text and PDF
+files, the text to index for search. Run by the
+extract_attachment_metadata Celery task, never in the request.
+
+Memory stays bounded whatever the file size:
+
+    hashing  the file is mmap()ed and fed to SHA-256 a window at a time;
+             the pages come from the page cache and are never copied
+             into Python objects
+    type     sniffed from the first bytes (magic numbers, then UTF-8 text),
+             the file name only breaks ties
+    text     text files are decoded incrementally up to MAX_TEXT
+             characters; PDFs are scanned through the same mmap for their
+             content streams, each inflated with an output cap, and the
+             strings shown by their text operators are kept
+
+The PDF reader only understands what most generated PDFs use (Flate or
+unfiltered content streams, literal strings); text it can't read is left
+out, never guessed.
+"""
+import codecs
+import hashlib
+import mimetypes
+import mmap
+import os
+import re
+import zlib
+
+HASH_WINDOW = 8 * 1024 * 1024
+SNIFF_SIZE = 2048
+READ_SIZE = 64 * 1024
+MAX_TEXT = 100_000
+# per PDF stream: compressed bytes read, and bytes inflated
+MAX_STREAM = 8 * 1024 * 1024
+MAX_INFLATED = 4 * 1024 * 1024
+
+SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'7z\xbc\xaf\x27\x1c', 'application/x-7z-compressed'),
+)
+
+
+def sha256_of(path, size):
+    digest = hashlib.sha256()
+    if not size:
+        return digest.hexdigest()
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        with memoryview(mapped) as view:
+            for start in range(0, size, HASH_WINDOW):
+                digest.update(view[start:start + HASH_WINDOW])
+    return digest.hexdigest()
+
+
+def _is_text(head):
+    if b'\x00' in head:
+        return False
+    try:
+        # the sniffed bytes may end inside a character
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def sniff(head, filename):
+    guessed, encoding = mimetypes.guess_type(filename)
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            # docx / xlsx / odt are zip files too, their name tells them apart
+            if mime_type == 'application/zip' and guessed and not encoding:
+                return guessed
+            return mime_type
+    if _is_text(head):
+        if guessed and not encoding and (guessed.startswith('text/') or guessed.endswith(('json', 'xml'))):
+            return guessed
+        return 'text/plain'
+    # not text, whatever the name says
+    if guessed and not encoding and not guessed.startswith('text/'):
+        return guessed
+    return 'application/octet-stream'
+
+
+def read_text(path):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    parts, length = [], 0
+    with open(path, 'rb') as file:
+        while length < MAX_TEXT:
+            chunk = file.read(READ_SIZE)
+            part = decoder.decode(chunk, final=not chunk)
+            parts.append(part)
+            length += len(part)
+            if not chunk:
+                break
+    return ''.join(parts)[:MAX_TEXT]
+
+
+# ----------------------------
+# PDF
+# ----------------------------
+STREAM = re.compile(rb'<<((?:[^<>]|<<[^<>]*>>|<[0-9A-Fa-f\s]*>){0,4000})>>\s*stream\r?\n')
+TEXT_BLOCK = re.compile(rb'BT\b(.*?)\bET\b', re.S)
+# a literal string, or a TJ array of them, followed by its operator
+SHOWN = re.compile(rb'(\((?:\\.|[^\\)])*\))\s*(?:Tj|\'|")|\[((?:[^\]\\]|\\.)*)\]\s*TJ', re.S)
+LITERAL = re.compile(rb'\((?:\\.|[^\\)])*\)', re.S)
+ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+def _unescape(literal):
+    def replace(match):
+        escaped = match.group(1)
+        if escaped[:1].isdigit():
+            return bytes([int(escaped, 8) & 0xFF])
+        return ESCAPES.get(escaped, escaped)
+    return re.sub(rb'\\([0-7]{1,3}|.)', replace, literal[1:-1], flags=re.S)
+
+
+def _shown_text(content):
+    words = []
+    for block in TEXT_BLOCK.finditer(content):
+        for single, array in SHOWN.findall(block.group(1)):
+            literals = [single] if single else LITERAL.findall(array)
+            words.append(b''.join(_unescape(literal) for literal in literals))
+    return ' '.join(word.decode('latin-1') for word in words if word.strip())
+
+
+def pdf_text(path):
+    parts, length = [], 0
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for match in STREAM.finditer(mapped):
+            dictionary, start = match.group(1), match.end()
+            end = mapped.find(b'endstream', start, start + MAX_STREAM + 2)
+            if end < 0 or b'/Subtype/Image' in dictionary.replace(b' ', b''):
+                continue
+            data = mapped[start:end]
+            if b'/FlateDecode' in dictionary:
+                try:
+                    data = zlib.decompressobj().decompress(data, MAX_INFLATED)
+                except zlib.error:
+                    continue
+            elif b'/Filter' in dictionary:
+                # images, DCT, LZW...: nothing to read
+                continue
+            text = _shown_text(data)
+            if text:
+                parts.append(text)
+                length += len(text) + 1
+                if length >= MAX_TEXT:
+                    break
+    return '\n'.join(parts)[:MAX_TEXT]
+
+
+def extract(path, filename, sha256=None):
+    """{size, mime_type, sha256, text} of the file at `path`. sha256 is reused when known."""
+    size = os.stat(path).st_size
+    with open(path, 'rb') as file:
+        head = file.read(SNIFF_SIZE)
+    mime_type = sniff(head, filename)
+
+    text = ''
+    if mime_type == 'application/pdf':
+        text = pdf_text(path)
+    elif mime_type.startswith('text/') or mime_type.endswith(('json', 'xml')):
+        text = read_text(path)
+    return {
+        'size': size,
+        'mime_type': mime_type,
+        'sha256': sha256 or sha256_of(path, size),
+        'text': text,
+    }
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 5000
+
+
+def _backfill(model, team_subquery):
+    # walk the primary key in ranges so each UPDATE stays small
+    last_pk = 0
+    while True:
+        pks = list(
+            model.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not pks:
+            break
+        model.objects.filter(pk__gt=last_pk, pk__lte=pks[-1]).update(team_id=Subquery(team_subquery))
+        last_pk = pks[-1]
+
+
+def backfill_team(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    Comment = apps.get_model('tasks', 'Comment')
+
+    _backfill(Task, Project.objects.filter(pk=OuterRef('project_id')).values('team_id')[:1])
+    _backfill(Comment, Task.objects.filter(pk=OuterRef('task_id')).values('team_id')[:1])
+
+
+class Migration(migrations.Migration):
+    # every batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('projects', '0002_alter_project_created_by'),
+        ('tasks', '0004_task_team_comment_team'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_team, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 02:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_project_activity'),
+        ('tasks', '0007_task_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team', 'last_activity_at', 'created_at', 'id'], name='task_team_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team', 'comment_count', 'created_at', 'id'], name='task_team_comments_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+def _batches(model):
+    last_pk = 0
+    while True:
+        pks = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not pks:
+            break
+        yield model.objects.filter(pk__gt=last_pk, pk__lte=pks[-1])
+        last_pk = pks[-1]
+
+
+def backfill_activity(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    Comment = apps.get_model('tasks', 'Comment')
+
+    comments = Comment.objects.filter(task=OuterRef('pk')).order_by().values('task')
+    for batch in _batches(Task):
+        batch.update(
+            comment_count=Coalesce(Subquery(comments.annotate(n=Count('pk')).values('n')), 0),
+            last_activity_at=Coalesce(Subquery(comments.annotate(m=Max('created_at')).values('m')), 'created_at'),
+        )
+
+    tasks = Task.objects.filter(project=OuterRef('pk')).order_by().values('project')
+    for batch in _batches(Project):
+        batch.update(
+            comment_count=Coalesce(Subquery(tasks.annotate(n=Sum('comment_count')).values('n')), 0),
+            last_activity_at=Subquery(tasks.annotate(m=Max('last_activity_at')).values('m')),
+        )
+
+
+class Migration(migrations.Migration):
+    # every batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0008_task_activity'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-17 02:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_project_activity'),
+        ('tasks', '0009_backfill_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('todo', 'TODO'), ('doing', 'DOING'), ('done', 'DONE')], max_length=10)),
+                ('priority', models.PositiveIntegerField(choices=[(1, 'High'), (2, 'Medium'), (3, 'Low')])),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'status', 'priority'), name='project_stats_cell_unique')],
+            },
+        ),
+    ]
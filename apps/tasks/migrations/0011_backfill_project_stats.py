@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 500
+
+
+def backfill_project_stats(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    ProjectStats = apps.get_model('tasks', 'ProjectStats')
+
+    statuses = [value for value, _ in Task._meta.get_field('status').choices]
+    priorities = [value for value, _ in Task._meta.get_field('priority').choices]
+
+    last_pk = 0
+    while True:
+        project_ids = list(
+            Project.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not project_ids:
+            break
+        counts = {
+            (project_id, status, priority): n
+            for project_id, status, priority, n in (
+                Task.objects.filter(project_id__in=project_ids).order_by()
+                .values_list('project_id', 'status', 'priority').annotate(n=Count('pk'))
+            )
+        }
+        ProjectStats.objects.bulk_create([
+            ProjectStats(project_id=project_id, status=status, priority=priority,
+                         count=counts.get((project_id, status, priority), 0))
+            for project_id in project_ids for status in statuses for priority in priorities
+        ], ignore_conflicts=True)
+        last_pk = project_ids[-1]
+
+
+class Migration(migrations.Migration):
+    # every batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0010_projectstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_project_stats, migrations.RunPython.noop),
+    ]
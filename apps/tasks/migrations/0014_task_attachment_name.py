@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='attachment_name',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 03:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_task_attachment_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentMetadata',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('sha256', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('text', models.TextField(blank=True)),
+                ('detail', models.TextField(blank=True)),
+                ('extracted_at', models.DateTimeField(blank=True, null=True)),
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attachment_metadata', to='tasks.task')),
+            ],
+        ),
+    ]
@@ -1,8 +1,16 @@
-from django.db import models
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from apps.core.models import CounterFieldsModel
 from apps.projects.models import *
 from apps.users.models import *
 
-class Task(models.Model):
+class Task(CounterFieldsModel):
     STATUS_CHOICES = (
         ('todo', 'TODO'),
         ('doing', 'DOING'),
@@ -16,6 +24,8 @@ class Task(models.Model):
     title = models.CharField(max_length=50)
     description = models.TextField()
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
+    # copy of project.team, so visibility filters don't need to join through projects
+    team = models.ForeignKey(Teams, on_delete=models.CASCADE, related_name='tasks', editable=False)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_tasks')
     assigned_to = models.ForeignKey(
     User,
@@ -27,8 +37,94 @@ class Task(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='todo')
     priority = models.PositiveIntegerField(choices=PRIORITY_CHOICES, default=2)
     attachment = models.FileField(upload_to="task_attachments/", null=True, blank=True)
+    # set when the attachment came through a chunked upload; attachment then names the blob's file
+    blob = models.ForeignKey('Blob', on_delete=models.PROTECT, null=True, blank=True, editable=False,
+                             related_name='tasks')
+    # the uploaded file's own name, for downloads (blob files are named by their hash)
+    attachment_name = models.CharField(max_length=255, blank=True, editable=False)
     due_date = models.DateField(null=True, blank=True) 
     created_at = models.DateTimeField(auto_now_add=True)
+    # kept up to date by the comment signals, see apps/tasks/signals.py
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # last write to the task or one of its comments
+    last_activity_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    counter_fields = ('comment_count',)
+
+    class Meta:
+        indexes = [
+            # visible list: team_id IN (...) ordered by the keyset
+            models.Index(fields=['team', 'created_at', 'id'], name='task_team_created_idx'),
+            models.Index(fields=['team', 'last_activity_at', 'created_at', 'id'], name='task_team_activity_idx'),
+            models.Index(fields=['team', 'comment_count', 'created_at', 'id'], name='task_team_comments_idx'),
+            models.Index(fields=['team', 'status'], name='task_team_status_idx'),
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            # ?assigned_to=me, optionally with status, by due date
+            models.Index(fields=['assigned_to', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+        ]
+
+    # project/team as loaded from the database, so a move bumps both sides
+    _loaded_project_id = None
+    _loaded_team_id = None
+    # (project, status, priority) as loaded, the ProjectStats cell to take the task out of
+    _loaded_cell = None
+    # blob as loaded, the one to release when the attachment changes
+    _loaded_blob_id = None
+    # attachment name as loaded, so only a new file queues a metadata extraction
+    _loaded_attachment = ''
+    # (title, description) as loaded, so only a text change re-indexes the task
+    _loaded_text = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_project_id = instance.__dict__.get('project_id')
+        instance._loaded_team_id = instance.__dict__.get('team_id')
+        instance._loaded_blob_id = instance.__dict__.get('blob_id')
+        instance._loaded_attachment = instance.__dict__.get('attachment') or ''
+        cell = tuple(instance.__dict__.get(name) for name in ('project_id', 'status', 'priority'))
+        instance._loaded_cell = None if None in cell else cell
+        text = (instance.__dict__.get('title'), instance.__dict__.get('description'))
+        instance._loaded_text = None if None in text else text
+        return instance
+
+    @property
+    def stats_cell(self):
+        return (self.project_id, self.status, self.priority)
+
+    def lock_loaded(self):
+        """
+        Re-reads the row's project, team, stats cell and text under a row lock, so
+        the post_save / post_delete receivers diff against what is committed
+        rather than against a copy another request may have moved on since.
+        """
+        if self._state.adding or self.pk is None:
+            return
+        row = (Task.objects.select_for_update().filter(pk=self.pk)
+               .values_list('project_id', 'team_id', 'status', 'priority', 'title', 'description').first())
+        if row is not None:
+            self._loaded_project_id, self._loaded_team_id = row[:2]
+            self._loaded_cell = (row[0], *row[2:4])
+            self._loaded_text = row[4:]
+
+    # The row and what its receivers write (ProjectStats, version counters,
+    # the sync log) commit or roll back together: post_save / post_delete
+    # are sent inside this atomic block.
+    def save(self, *args, **kwargs):
+        if self.project_id is not None:
+            self.team_id = self.project.team_id
+        self.last_activity_at = timezone.now()
+        with transaction.atomic():
+            self.lock_loaded()
+            super().save(*args, **kwargs)
+        self._loaded_project_id, self._loaded_team_id = self.project_id, self.team_id
+        self._loaded_cell = self.stats_cell
+        self._loaded_text = (self.title, self.description)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.lock_loaded()
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -37,8 +133,214 @@ class Task(models.Model):
 class Comment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments_authored')
+    # copy of task.team, kept in sync with it
+    team = models.ForeignKey(Teams, on_delete=models.CASCADE, related_name='comments', editable=False)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.task_id is not None:
+            self.team_id = self.task.team_id
+        # the receivers' writes (task rollups, version counters, the sync log) commit with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Comment by {self.author.username} on {self.task.title}"
+
+
+class ProjectStats(models.Model):
+    """
+    Task count of one status x priority cell of a project. Every project
+    has all of its cells (created with the project), and they are only
+    changed by apply() deltas written in the same transaction as the task
+    rows; tasks.reconcile_project_stats fixes any drift.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='stats')
+    status = models.CharField(max_length=10, choices=Task.STATUS_CHOICES)
+    priority = models.PositiveIntegerField(choices=Task.PRIORITY_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'status', 'priority'], name='project_stats_cell_unique'),
+        ]
+
+    @classmethod
+    def cells(cls, project_id):
+        return [(project_id, status, priority)
+                for status, _ in Task.STATUS_CHOICES for priority, _ in Task.PRIORITY_CHOICES]
+
+    @classmethod
+    def create_cells(cls, project_ids):
+        cls.objects.bulk_create(
+            [cls(project_id=p, status=s, priority=pr) for project_id in project_ids
+             for p, s, pr in cls.cells(project_id)],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def apply(cls, deltas):
+        """
+        deltas: {(project id, status, priority): change}. One UPDATE ...
+        SET count = count + n per distinct change.
+        """
+        by_change = defaultdict(list)
+        for cell, change in deltas.items():
+            if change:
+                by_change[change].append(cell)
+
+        for change, cells in by_change.items():
+            where = reduce(or_, (Q(project_id=p, status=s, priority=pr) for p, s, pr in cells))
+            if cls.objects.filter(where).update(count=F('count') + change) < len(cells):
+                # projects written without post_save (bulk_create, raw SQL) have no cells yet
+                existing = set(cls.objects.filter(where).values_list('project_id', 'status', 'priority'))
+                projects = set(Project.objects.filter(pk__in={p for p, _, _ in cells}).values_list('pk', flat=True))
+                missing = [cell for cell in cells if cell not in existing and cell[0] in projects]
+                if missing:
+                    cls.create_cells({p for p, _, _ in missing})
+                    where = reduce(or_, (Q(project_id=p, status=s, priority=pr) for p, s, pr in missing))
+                    cls.objects.filter(where).update(count=F('count') + change)
+
+    def __str__(self):
+        return f"{self.project_id} {self.status}/{self.priority}: {self.count}"
+
+
+class ImportJob(models.Model):
+    """
+    One uploaded file of tasks, imported in the background by
+    apps.tasks.tasks.import_tasks. Counters move after every batch, so the
+    job doubles as its progress report.
+    """
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+        ('trello', 'Trello board JSON'),
+        ('jira', 'Jira issues JSON'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    file = models.FileField(upload_to='task_imports/')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    # for rows that don't name a project (always the case for trello / jira)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='import_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    size = models.PositiveBigIntegerField(default=0)
+    bytes_read = models.PositiveBigIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # the first MAX_ERRORS failed rows: [{"row": n, "errors": {...}}]
+    errors = models.JSONField(default=list, blank=True)
+    detail = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    MAX_ERRORS = 1000
+
+    def __str__(self):
+        return f"Import {self.pk} ({self.format}, {self.status})"
+
+
+class Blob(CounterFieldsModel):
+    """
+    Attachment content, stored once per SHA-256 under blobs/ and shared by
+    every task that attaches it. ref_count is the number of tasks pointing
+    at the blob, changed with adjust() next to the task writes; blobs left
+    at zero are removed by the gc_blobs command.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    file = models.FileField(upload_to='blobs/')
+    ref_count = models.PositiveIntegerField(default=0, editable=False)
+    # last attach / release / upload, gc_blobs waits a grace period after it
+    touched_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    counter_fields = ('ref_count',)
+
+    @staticmethod
+    def name_for(sha256):
+        # two levels of fan-out, so no directory ends up with millions of entries
+        return 'blobs/%s/%s/%s' % (sha256[:2], sha256[2:4], sha256)
+
+    @classmethod
+    def adjust(cls, deltas):
+        """deltas: {blob id: change}. One UPDATE per distinct change."""
+        by_change = defaultdict(list)
+        for blob_id, change in deltas.items():
+            if blob_id is not None and change:
+                by_change[change].append(blob_id)
+        for change, blob_ids in by_change.items():
+            cls.objects.filter(pk__in=blob_ids).update(
+                ref_count=Greatest(F('ref_count') + change, 0), touched_at=timezone.now(),
+            )
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+
+class AttachmentUpload(models.Model):
+    """
+    A resumable upload: chunks are written into a part file at `offset`
+    until it reaches `size`, then the content is hashed and linked to its
+    Blob (an existing one when the same bytes were uploaded before).
+    """
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attachment_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # optional checksum announced by the client, checked once the last chunk is in
+    sha256 = models.CharField(max_length=64, blank=True)
+    offset = models.PositiveBigIntegerField(default=0)
+    blob = models.ForeignKey(Blob, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_name(self):
+        return 'uploads/%d.part' % self.pk
+
+    @property
+    def complete(self):
+        return self.blob_id is not None
+
+    def __str__(self):
+        return f"Upload {self.pk} ({self.filename}, {self.offset}/{self.size})"
+
+
+class AttachmentMetadata(models.Model):
+    """
+    What apps.tasks.tasks.extract_attachment_metadata found in a task's
+    attachment, filled in the background after the attachment changes.
+    `file` is the attachment it describes: a result for a file that has
+    been replaced since is dropped.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name='attachment_metadata')
+    file = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    # text/* and PDF only, indexed for search with the task
+    text = models.TextField(blank=True)
+    detail = models.TextField(blank=True)
+    extracted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.file} ({self.status})"
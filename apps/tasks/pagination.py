@@ -1,4 +1,511 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
 
-class TaskPagination(PageNumberPagination):
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+COUNT_EXACT = 'exact'
+COUNT_CAPPED = 'capped'
+COUNT_ESTIMATED = 'estimated'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_CAPPED, COUNT_ESTIMATED, COUNT_NONE)
+
+
+# ----------------------------
+# COUNT MODES
+# ----------------------------
+def estimate_count(queryset):
+    """
+    Planner row estimate for the queryset, or None when the backend
+    does not expose one (only PostgreSQL does).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_queryset(queryset, mode, cap):
+    """
+    Returns (count, is_exact) for the given count mode.
+    capped: counts at most cap + 1 rows, so the cost is bounded by the cap.
+    estimated: uses the planner estimate, falling back to a capped count.
+    """
+    if mode == COUNT_NONE:
+        return None, False
+
+    if mode == COUNT_ESTIMATED:
+        estimate = estimate_count(queryset)
+        if estimate is not None:
+            return estimate, False
+        mode = COUNT_CAPPED
+
+    if mode == COUNT_CAPPED:
+        count = queryset[:cap + 1].count()
+        if count > cap:
+            return cap, False
+        return count, True
+
+    return queryset.count(), True
+
+
+async def acount_queryset(queryset, mode, cap):
+    """count_queryset() for async views."""
+    if mode == COUNT_NONE:
+        return None, False
+
+    if mode == COUNT_ESTIMATED:
+        estimate = await sync_to_async(estimate_count)(queryset)
+        if estimate is not None:
+            return estimate, False
+        mode = COUNT_CAPPED
+
+    if mode == COUNT_CAPPED:
+        count = await queryset[:cap + 1].acount()
+        if count > cap:
+            return cap, False
+        return count, True
+
+    return await queryset.acount(), True
+
+
+async def _fetch(queryset):
+    # chunk_size: the fallback path may carry prefetches
+    return [row async for row in queryset.aiterator(chunk_size=2000)]
+
+
+class CountModeMixin:
+    count_query_param = 'count'
+    count_mode = COUNT_EXACT
+    count_cap = 1000
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(self.count_query_param, self.count_mode)
+        if mode not in COUNT_MODES:
+            return self.count_mode
+        return mode
+
+
+# ----------------------------
+# PAGE NUMBER (OFFSET)
+# ----------------------------
+class CountModePage(Page):
+    has_more = False
+
+    def has_next(self):
+        if self.paginator.count_is_exact:
+            return super().has_next()
+        return self.has_more
+
+
+class CountModePaginator(Paginator):
+    """
+    Django paginator whose count follows a count mode. When the count is
+    not exact, pages are fetched with one extra row to detect a next page
+    instead of comparing against num_pages.
+    """
+
+    def __init__(self, object_list, per_page, count_mode=COUNT_EXACT, count_cap=1000, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_mode = count_mode
+        self.count_cap = count_cap
+
+    @cached_property
+    def _count_info(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().count, True
+        return count_queryset(self.object_list, self.count_mode, self.count_cap)
+
+    @cached_property
+    def count(self):
+        return self._count_info[0]
+
+    @property
+    def count_is_exact(self):
+        return self._count_info[1]
+
+    def validate_number(self, number):
+        if self.count_is_exact:
+            return super().validate_number(number)
+
+        # without an exact count only the lower bound can be checked up front
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise InvalidPage(self.error_messages['invalid_page'])
+        if number < 1:
+            raise InvalidPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        if self.count_is_exact:
+            return super().page(number)
+
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise InvalidPage(self.error_messages['no_results'])
+
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return CountModePage(*args, **kwargs)
+
+    # ---- async ----
+    async def acount(self):
+        """Runs the count query; call it before page numbers are validated."""
+        self._count_info = await acount_queryset(self.object_list, self.count_mode, self.count_cap)
+
+    async def apage(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if self.count_is_exact:
+            rows = await _fetch(self.object_list[bottom:bottom + self.per_page])
+            return self._get_page(rows, number, self)
+
+        rows = await _fetch(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise InvalidPage(self.error_messages['no_results'])
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+
+class TaskPagination(CountModeMixin, PageNumberPagination):
+    page_size = 10
+    django_paginator_class = CountModePaginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count_mode_used = self.get_count_mode(request)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(
+            queryset,
+            page_size,
+            count_mode=self.count_mode_used,
+            count_cap=self.count_cap,
+        )
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        if paginator.count_is_exact and paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views; the count and the page go through the async ORM."""
+        self.request = request
+        self.count_mode_used = self.get_count_mode(request)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(
+            queryset,
+            page_size,
+            count_mode=self.count_mode_used,
+            count_cap=self.count_cap,
+        )
+        await paginator.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = await paginator.apage(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.count_mode_used == COUNT_EXACT:
+            return super().get_paginated_response(data)
+
+        # clients that opted out of exact counts are told whether it still is one
+        paginator = self.page.paginator
+        return Response({
+            'count': paginator.count,
+            'count_exact': paginator.count_is_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+# ----------------------------
+# CURSOR (KEYSET)
+# ----------------------------
+class KeysetPagination(CountModeMixin, BasePagination):
+    """
+    Keyset pagination with opaque cursors. Rows are ordered by an optional
+    secondary field followed by base_ordering (a unique tie-breaker), and
+    each page is fetched with a WHERE on the last seen key, so page N costs
+    the same as page 1.
+    """
     page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    base_ordering = ('-created_at', '-id')
+    ordering_fields = ()
+    nullable_fields = ()
+    count_mode = COUNT_NONE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        """
+        Ordering as a tuple of (field, descending). The client may put one of
+        ordering_fields in front of base_ordering; base_ordering may also be
+        flipped as a whole with ?ordering=created_at.
+        """
+        base = [self._parse_ordering(field) for field in self.base_ordering]
+        param = request.query_params.get(self.ordering_query_param)
+        if not param:
+            return tuple(base)
+
+        field, descending = self._parse_ordering(param)
+        if field == base[0][0]:
+            return tuple((name, descending) for name, _ in base)
+        if field in self.ordering_fields:
+            return ((field, descending),) + tuple(base)
+        return tuple(base)
+
+    def get_row_fields(self, request):
+        """Attribute names each row must expose for cursors to be built."""
+        return tuple(field for field, _ in self.get_ordering(request))
+
+    def _prepare(self, queryset, request):
+        self.request = request
+        self.page_size_used = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+        self.cursor_given = position is not None
+        self.reverse = reverse
+
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+        return queryset[:self.page_size_used + 1]
+
+    def _set_page(self, rows):
+        self.has_more = len(rows) > self.page_size_used
+        rows = rows[:self.page_size_used]
+        if self.reverse:
+            rows.reverse()
+        self.page = rows
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self._prepare(queryset, request)
+        self.count, self.count_is_exact = count_queryset(
+            queryset, self.get_count_mode(request), self.count_cap
+        )
+        return self._set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views."""
+        page = self._prepare(queryset, request)
+        self.count, self.count_is_exact = await acount_queryset(
+            queryset, self.get_count_mode(request), self.count_cap
+        )
+        return self._set_page(await _fetch(page))
+
+    def get_paginated_response(self, data):
+        payload = {}
+        if self.count is not None:
+            payload['count'] = self.count
+            payload['count_exact'] = self.count_is_exact
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'count_exact': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ---- links ----
+    def get_next_link(self):
+        if not self.page:
+            return None
+        if self.reverse or self.has_more:
+            return self.encode_cursor(self.page[-1], reverse=False)
+        return None
+
+    def get_previous_link(self):
+        if not self.page:
+            return None
+        if (self.reverse and self.has_more) or (not self.reverse and self.cursor_given):
+            return self.encode_cursor(self.page[0], reverse=True)
+        return None
+
+    # ---- cursors ----
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field, _ in self.ordering:
+            value = getattr(row, field)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+
+        raw = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = data['v']
+            reverse = bool(data.get('r'))
+            if len(values) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+    # ---- query building ----
+    @staticmethod
+    def _parse_ordering(value):
+        if value.startswith('-'):
+            return value[1:], True
+        return value, False
+
+    def _order_by(self, reverse):
+        expressions = []
+        for field, descending in self.ordering:
+            direction = F(field).desc if descending != reverse else F(field).asc
+            if field in self.nullable_fields:
+                expressions.append(direction(nulls_first=True) if reverse else direction(nulls_last=True))
+            else:
+                expressions.append(direction())
+        return expressions
+
+    def _to_python(self, field, value):
+        if value is None:
+            return None
+        try:
+            return self.model._meta.get_field(field).to_python(value)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, position, reverse):
+        """
+        Rows strictly after the position in the (possibly reversed) ordering:
+        (a > x) OR (a = x AND b > y) OR ...
+        Nullable fields sort last going forward.
+        """
+        condition = Q(pk__in=[])
+        equal_prefix = Q()
+
+        for (field, descending), raw in zip(self.ordering, position):
+            value = self._to_python(field, raw)
+            nullable = field in self.nullable_fields
+            greater = descending == reverse
+            lookup = '%s__%s' % (field, 'gt' if greater else 'lt')
+
+            if not nullable:
+                step = Q(**{lookup: value})
+            elif not reverse:
+                # going forward, NULLs come after every value
+                step = (Q(**{lookup: value}) | Q(**{'%s__isnull' % field: True})) if value is not None else None
+            else:
+                # going backward, every value comes before the NULLs
+                step = Q(**{lookup: value}) if value is not None else Q(**{'%s__isnull' % field: False})
+
+            if step is not None:
+                condition |= equal_prefix & step
+
+            if value is None:
+                equal_prefix &= Q(**{'%s__isnull' % field: True})
+            else:
+                equal_prefix &= Q(**{field: value})
+
+        return condition
+
+
+class TaskCursorPagination(KeysetPagination):
+    ordering_fields = ('priority', 'due_date', 'last_activity_at', 'comment_count')
+    nullable_fields = ('due_date',)
+
+
+class CommentCursorPagination(KeysetPagination):
+    """Oldest first, served by the (task, created_at, id) index."""
+    page_size = 50
+    max_page_size = 200
+    base_ordering = ('created_at', 'id')
+
+
+class CursorSwitchMixin:
+    """
+    ?pagination=cursor (or any ?cursor=) switches the list to keyset
+    pagination (cursor_pagination_class); page numbers stay the default.
+    """
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            params = getattr(request, 'query_params', {})
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -7,9 +7,24 @@ from apps.teams.serializers import *
 from apps.teams.models import *
 from apps.projects.models import *
 from apps.projects.serializers import *
+import re
 from datetime import date
+from apps.core.serializers import DynamicFieldsMixin
+from apps.teams.cache import visible_team_ids
+from .blobs import MAX_SIZE
+
+class AttachmentMetadataSerializer(serializers.ModelSerializer):
+    """Filled in the background after an upload: status is "pending" until then."""
+
+    class Meta:
+        model = AttachmentMetadata
+        fields = ['status', 'size', 'mime_type', 'sha256', 'extracted_at']
+        read_only_fields = fields
+
+
+class TaskSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('project_detail', 'assigned_to_detail', 'attachment_metadata')
 
-class TaskSerializer(serializers.ModelSerializer):
     # ----------------------------
     # WRITE
     # ----------------------------
@@ -24,6 +39,13 @@ class TaskSerializer(serializers.ModelSerializer):
         allow_null=True
     )
 
+    # a finished chunked upload, attached instead of a multipart file
+    upload = serializers.PrimaryKeyRelatedField(
+        queryset=AttachmentUpload.objects.filter(blob__isnull=False).select_related('blob'),
+        write_only=True,
+        required=False
+    )
+
     # ----------------------------
     # READ
     # ----------------------------
@@ -37,6 +59,10 @@ class TaskSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
+    attachment_metadata = AttachmentMetadataSerializer(
+        read_only=True
+    )
+
     class Meta:
         model = Task
         fields = [
@@ -49,12 +75,32 @@ class TaskSerializer(serializers.ModelSerializer):
             'status',
             'priority',
             'due_date',
-            'attachment'
+            'attachment',
+            'upload',
+            'attachment_metadata',
+            'comment_count',
+            'last_activity_at',
         ]
+        read_only_fields = ['comment_count', 'last_activity_at']
+
+    def validate_upload(self, value):
+        if value.created_by_id != self.context['request'].user.id:
+            raise serializers.ValidationError('Invalid pk "%s" - object does not exist.' % value.pk)
+        return value
 
     def validate(self, data):
         user = self.context['request'].user
 
+        # the upload's blob becomes the attachment; a plain file (or null) replaces it
+        upload = data.pop('upload', None)
+        if upload is not None:
+            data['blob'] = upload.blob
+            data['attachment'] = upload.blob.file.name
+            data['attachment_name'] = upload.filename
+        elif 'attachment' in data:
+            data['blob'] = None
+            data['attachment_name'] = data['attachment'].name if data['attachment'] else ''
+
         # ==================================================
         # CREATE
         # ==================================================
@@ -135,8 +181,121 @@ class TaskSerializer(serializers.ModelSerializer):
                 )
 
         return data
+#-------------------------------bulk-------------------------------
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Field-level checks for one item of a bulk request. Relations stay plain
+    ids here; apps/tasks/bulk.py resolves and checks them for the whole batch.
+    """
+    id = serializers.IntegerField(required=False)
+    project = serializers.IntegerField()
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'description', 'project', 'assigned_to', 'status', 'priority', 'due_date']
+
+
+class TaskMutationFilterSerializer(serializers.Serializer):
+    project = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Task.PRIORITY_CHOICES, required=False)
+    # a user id, null for unassigned, or "me"
+    assigned_to = serializers.CharField(required=False, allow_null=True)
+
+    def validate_assigned_to(self, value):
+        if value is None or value == 'me':
+            return value
+        if not value.isdigit():
+            raise serializers.ValidationError('Expected a user id, null or "me".')
+        return int(value)
+
+
+class TaskMutationChangeSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Task.PRIORITY_CHOICES, required=False)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+    due_date = serializers.DateField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError('Nothing to change.')
+        return data
+
+
+class TaskMutationSerializer(serializers.Serializer):
+    """
+    One change applied to a set of tasks:
+        {"ids": [...]} or {"filter": {...}}
+        plus {"set": {...}} or {"delete": true}
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = TaskMutationFilterSerializer(required=False)
+    set = TaskMutationChangeSerializer(required=False)
+    delete = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError('Give either "ids" or "filter".')
+        if ('set' in data) == data['delete']:
+            raise serializers.ValidationError('Give either "set" or "delete": true.')
+        return data
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Upload (file, format, optional default project) and progress report of one import."""
+    file = serializers.FileField(write_only=True)
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), required=False, allow_null=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'file', 'format', 'project', 'status', 'progress', 'rows', 'created_count',
+                  'error_count', 'errors', 'detail', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'rows', 'created_count', 'error_count', 'errors', 'detail',
+                            'created_at', 'started_at', 'finished_at']
+
+    def get_progress(self, obj):
+        # share of the file read so far
+        return round(min(obj.bytes_read / obj.size, 1.0), 4) if obj.size else None
+
+    def validate_project(self, value):
+        user = self.context['request'].user
+        if value is not None and value.team_id not in visible_team_ids(user):
+            raise serializers.ValidationError('You do not have permission to import into this project.')
+        return value
+
+    def validate(self, data):
+        if data['format'] in ('trello', 'jira') and data.get('project') is None:
+            raise serializers.ValidationError({'project': ['Required for %s imports.' % data['format']]})
+        data['size'] = data['file'].size
+        return data
+
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    """Start of a chunked upload, and its state: where to resume, and the blob once complete."""
+    complete = serializers.BooleanField(read_only=True)
+    blob_sha256 = serializers.CharField(source='blob.sha256', read_only=True, default=None)
+
+    class Meta:
+        model = AttachmentUpload
+        fields = ['id', 'filename', 'size', 'sha256', 'offset', 'complete', 'blob_sha256', 'created_at']
+        read_only_fields = ['offset', 'created_at']
+
+    def validate_size(self, value):
+        if not 0 < value <= MAX_SIZE:
+            raise serializers.ValidationError('Ensure this value is between 1 and %d bytes.' % MAX_SIZE)
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError('Expected a hex SHA-256 digest.')
+        return value
 #-------------------------------comment-------------------------------
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('task_detail', 'author_detail')
+
     task = serializers.PrimaryKeyRelatedField(read_only=True)
     task_detail = TaskSerializer(source = 'task', read_only=True)
     author = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -146,5 +305,13 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'task', 'task_detail', 'author', 'author_detail', 'content', 'created_at']
         read_only_fields = ['id', 'task', 'author', 'created_at']
-    
-        
\ No newline at end of file
+
+
+class CommentCompactSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """List representation: the task stays an id, the author comes as a card."""
+    author_card = UserCardSerializer(source='author', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'task', 'author', 'author_card', 'content', 'created_at']
+        read_only_fields = fields
@@ -0,0 +1,191 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Subquery
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from apps.projects.models import Project
+from apps.projects.signals import project_moved
+from apps.teams.models import Teams
+from .models import Task, Comment, ProjectStats, Blob, AttachmentMetadata
+
+# sent by apps/tasks/bulk.py after bulk writes, which skip the per-row signals;
+# kwargs: action ('created', 'updated' or 'deleted'), task_ids, project_ids, team_ids,
+# rows: (task id, project id, team id) per task, and fields: the attnames written
+# by an update (None otherwise)
+tasks_bulk_changed = Signal()
+
+
+# ----------------------------
+# DENORMALIZED TEAM
+# ----------------------------
+# Task.team / Comment.team are copied on save (models.py); these keep the
+# rows already written in step when a project or a task changes team.
+# Bulk writes can't move tasks (apps/tasks/bulk.py refuses 'project').
+
+@receiver(project_moved, sender=Project)
+def move_tasks_with_project(sender, project, previous_team_id, **kwargs):
+    """Task.team / Comment.team follow their project to the new team."""
+    Task.objects.filter(project=project).update(team_id=project.team_id)
+    Comment.objects.filter(task__project=project).update(team_id=project.team_id)
+
+
+@receiver(post_save, sender=Task)
+def move_comments_with_task(sender, instance, created, **kwargs):
+    """Comment.team follows a task moved to a project of another team."""
+    if not created and instance._loaded_team_id not in (None, instance.team_id):
+        Comment.objects.filter(task=instance).update(team_id=instance.team_id)
+
+
+# ----------------------------
+# VERSION COUNTERS AND ACTIVITY ROLLUPS
+# ----------------------------
+# Task.comment_count / last_activity_at and the Project rollups only change
+# through the UPDATE ... F() statements below.
+
+@receiver(post_save, sender=Task)
+def update_project_on_task_save(sender, instance, created, **kwargs):
+    extra = {'last_activity_at': instance.last_activity_at}
+    previous = instance._loaded_project_id
+    if not created and previous not in (None, instance.project_id):
+        # the task's comments move to the other project's rollup
+        count = Subquery(Task.objects.filter(pk=instance.pk).values('comment_count')[:1])
+        Project.bump(previous, extra={'comment_count': Greatest(F('comment_count') - count, 0)})
+        extra['comment_count'] = F('comment_count') + count
+    Project.bump(instance.project_id, extra=extra)
+    Teams.bump(instance.team_id, instance._loaded_team_id)
+
+
+@receiver(post_delete, sender=Task)
+def update_project_on_task_delete(sender, instance, **kwargs):
+    # comment_count went down with each cascaded comment already
+    Project.bump(instance.project_id)
+    Teams.bump(instance.team_id)
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def update_projects_on_bulk_write(sender, action, project_ids, team_ids, **kwargs):
+    extra = {} if action == 'deleted' else {'last_activity_at': timezone.now()}
+    Project.bump(*project_ids, extra=extra)
+    Teams.bump(*team_ids)
+
+
+@receiver(post_save, sender=Comment)
+def update_task_on_comment_save(sender, instance, created, **kwargs):
+    now = timezone.now()
+    delta = {'comment_count': F('comment_count') + 1} if created else {}
+    Task.objects.filter(pk=instance.task_id).update(last_activity_at=now, **delta)
+    Project.bump(tasks=instance.task_id, extra={'last_activity_at': now, **delta})
+    Teams.bump(instance.team_id)
+
+
+@receiver(post_delete, sender=Comment)
+def update_task_on_comment_delete(sender, instance, **kwargs):
+    Task.objects.filter(pk=instance.task_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+    Project.bump(tasks=instance.task_id, extra={'comment_count': Greatest(F('comment_count') - 1, 0)})
+    Teams.bump(instance.team_id)
+
+
+@receiver(post_save, sender=AttachmentMetadata)
+def update_project_on_metadata_save(sender, instance, **kwargs):
+    # the task's representation carries its attachment_metadata
+    Project.bump(instance.task.project_id)
+    Teams.bump(instance.task.team_id)
+
+
+@receiver(post_delete, sender=AttachmentMetadata)
+def update_project_on_metadata_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Task):
+        return
+    Project.bump(instance.task.project_id)
+    Teams.bump(instance.task.team_id)
+
+
+# ----------------------------
+# PROJECT STATS
+# ----------------------------
+# ProjectStats cells move by the difference between the task row before
+# and after the write, in the writer's transaction: Task.save / delete send
+# their signals inside an atomic block, with "before" read under a row lock
+# (Task.lock_loaded). Bulk writes apply their deltas in apps/tasks/bulk.py.
+STATS_FIELDS = ('project', 'status', 'priority')
+
+
+@receiver(post_save, sender=Project)
+def create_stats_cells(sender, instance, created, **kwargs):
+    if created:
+        ProjectStats.create_cells([instance.pk])
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_task_save(sender, instance, created, update_fields=None, **kwargs):
+    new, old = instance.stats_cell, instance._loaded_cell
+    if not created:
+        if old is None:
+            # not loaded from the database, nothing to diff against
+            return
+        if update_fields is not None:
+            # fields left out of the UPDATE kept their old value
+            new = tuple(value if name in update_fields else before
+                        for name, value, before in zip(STATS_FIELDS, new, old))
+        if new == old:
+            return
+    deltas = Counter({new: 1})
+    if not created:
+        deltas[old] -= 1
+    ProjectStats.apply(deltas)
+
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_task_delete(sender, instance, origin=None, **kwargs):
+    if origin is not None and not isinstance(origin, Task) and getattr(origin, 'model', None) is not Task:
+        # cascaded from a project/team delete: the cells go with the project
+        return
+    ProjectStats.apply({instance._loaded_cell or instance.stats_cell: -1})
+
+
+# ----------------------------
+# BLOB REFERENCES
+# ----------------------------
+# Blob.ref_count follows Task.blob; apps/tasks/bulk.py releases the blobs
+# of the tasks it deletes.
+
+@receiver(post_save, sender=Task)
+def update_blob_refs_on_task_save(sender, instance, created, **kwargs):
+    previous = None if created else instance._loaded_blob_id
+    if instance.blob_id != previous:
+        Blob.adjust({instance.blob_id: 1, previous: -1})
+    instance._loaded_blob_id = instance.blob_id
+
+
+@receiver(post_delete, sender=Task)
+def release_blob_on_task_delete(sender, instance, **kwargs):
+    Blob.adjust({instance.blob_id: -1})
+
+
+# ----------------------------
+# ATTACHMENT METADATA
+# ----------------------------
+# A new attachment resets the task's AttachmentMetadata to pending and
+# queues the extraction once the write is committed; the request never
+# waits for it.
+
+@receiver(post_save, sender=Task)
+def queue_attachment_metadata(sender, instance, created, **kwargs):
+    from .tasks import extract_attachment_metadata
+
+    name = instance.attachment.name or ''
+    if name == instance._loaded_attachment:
+        return
+    instance._loaded_attachment = name
+    if not name:
+        AttachmentMetadata.objects.filter(task=instance).delete()
+        return
+    AttachmentMetadata.objects.update_or_create(task=instance, defaults={
+        'file': name, 'status': 'pending', 'size': None, 'mime_type': '', 'sha256': '', 'text': '',
+        'detail': '', 'extracted_at': None,
+    })
+    transaction.on_commit(lambda: extract_attachment_metadata.delay(instance.pk))
@@ -0,0 +1,93 @@
+"""
+Dashboard aggregates for one project or one team:
+
+    by_status_priority   task counts, every status x priority cell present;
+                         read from the ProjectStats cells, so the cost does
+                         not depend on the number of tasks
+    overdue              open tasks past their due_date, total and by priority
+    workload             open / overdue tasks per assignee (None = unassigned)
+
+overdue and workload depend on the date and the assignee, which the cells
+don't hold: they come from one GROUP BY (priority, assignee) over the
+scope's open tasks.
+
+Results are cached under the scope's version counter, which every task
+write bumps (apps/tasks/signals.py), so a write invalidates them without
+any delete. The date is part of the key too: a task becomes overdue at
+midnight without anyone writing to it.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from apps.core import metrics
+from .models import Task, ProjectStats
+
+KEY = 'stats:%s:%s:v%s:%s'
+TIMEOUT = 60 * 60
+
+HIT = metrics.counter('stats.hit')
+MISS = metrics.counter('stats.miss')
+
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+PRIORITIES = [value for value, _ in Task.PRIORITY_CHOICES]
+DONE = 'done'
+
+
+def compute(today, cells, tasks):
+    """cells: the scope's ProjectStats queryset, tasks: its Task queryset."""
+    grid = {status: {priority: 0 for priority in PRIORITIES} for status in STATUSES}
+    for status, priority, n in cells.order_by().values_list('status', 'priority').annotate(n=Sum('count')):
+        grid.setdefault(status, {})[priority] = n
+
+    rows = (
+        tasks.exclude(status=DONE).order_by()
+        .values_list('priority', 'assigned_to', 'assigned_to__username')
+        .annotate(total=Count('pk'), overdue=Count('pk', filter=Q(due_date__lt=today)))
+    )
+    overdue = {priority: 0 for priority in PRIORITIES}
+    workload = {}
+    for priority, user_id, username, total, late in rows:
+        overdue[priority] = overdue.get(priority, 0) + late
+        entry = workload.setdefault(user_id, {
+            'user': {'id': user_id, 'username': username} if user_id is not None else None,
+            'open': 0,
+            'overdue': 0,
+        })
+        entry['open'] += total
+        entry['overdue'] += late
+
+    return {
+        'date': today.isoformat(),
+        'total': sum(sum(counts.values()) for counts in grid.values()),
+        'by_status': {status: sum(counts.values()) for status, counts in grid.items()},
+        'by_status_priority': grid,
+        'overdue': {'total': sum(overdue.values()), 'by_priority': overdue},
+        # busiest first, unassigned last among equals
+        'workload': sorted(workload.values(), key=lambda entry: (
+            -entry['open'], entry['user'] is None, entry['user']['id'] if entry['user'] else 0,
+        )),
+    }
+
+
+def _cached(scope, instance, cells, tasks):
+    today = timezone.now().date()
+    key = KEY % (scope, instance.pk, instance.version, today.isoformat())
+    data = cache.get(key)
+    if data is None:
+        metrics.incr(MISS)
+        data = compute(today, cells, tasks)
+        cache.set(key, data, TIMEOUT)
+    else:
+        metrics.incr(HIT)
+    return data
+
+
+def project_stats(project):
+    return _cached('project', project, ProjectStats.objects.filter(project_id=project.pk),
+                   Task.objects.filter(project_id=project.pk))
+
+
+def team_stats(team):
+    return _cached('team', team, ProjectStats.objects.filter(project__team_id=team.pk),
+                   Task.objects.filter(team_id=team.pk))
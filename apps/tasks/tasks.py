@@ -0,0 +1,172 @@
+import csv
+
+from celery import shared_task
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from apps.projects.models import Project
+from .bulk import prepare_tasks, create_tasks
+from .importers import RowError, open_rows
+from .metadata import extract
+from .models import Task, ProjectStats, ImportJob, AttachmentMetadata
+
+
+@shared_task
+def reconcile_project_stats(batch_size=200):
+    """
+    Recounts the tasks of every project, a batch of projects at a time, and
+    rewrites the ProjectStats cells that drifted. Returns the number of
+    cells fixed.
+
+    The batch's cells are locked before the tasks are counted: a task write
+    racing with the batch either committed before the count (and is in it),
+    or waits on the lock and applies its delta on top of the fixed value.
+    """
+    fixed, last_pk = 0, 0
+    while True:
+        project_ids = list(
+            Project.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not project_ids:
+            return fixed
+        last_pk = project_ids[-1]
+
+        with transaction.atomic():
+            ProjectStats.create_cells(project_ids)
+            stored = {
+                (cell.project_id, cell.status, cell.priority): cell
+                for cell in ProjectStats.objects.select_for_update().filter(project_id__in=project_ids)
+            }
+            actual = {
+                (project_id, status, priority): n
+                for project_id, status, priority, n in (
+                    Task.objects.filter(project_id__in=project_ids).order_by()
+                    .values_list('project_id', 'status', 'priority').annotate(n=Count('pk'))
+                )
+            }
+
+            drifted = []
+            for key, cell in stored.items():
+                if cell.count != actual.get(key, 0):
+                    cell.count = actual.get(key, 0)
+                    drifted.append(cell)
+            if drifted:
+                ProjectStats.objects.bulk_update(drifted, ['count'])
+            fixed += len(drifted)
+
+
+# ----------------------------
+# IMPORTS
+# ----------------------------
+IMPORT_BATCH_SIZE = 1000
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@shared_task
+def import_tasks(job_id, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Reads the job's file as a stream and writes its rows a batch at a time:
+    one validation pass per batch (projects, assignees and memberships are
+    looked up once per batch), one bulk_create of the valid rows, then the
+    job's counters. Invalid rows are reported, the rest are imported.
+    """
+    # claim the job, so a redelivered message doesn't import the file twice
+    if not ImportJob.objects.filter(pk=job_id, status='pending').update(status='running', started_at=timezone.now()):
+        return None
+    job = ImportJob.objects.select_related('created_by').get(pk=job_id)
+
+    user, errors, row_number = job.created_by, list(job.errors), 0
+    try:
+        with job.file.open('rb') as binary:
+            for batch in _batches(open_rows(binary, job.format), batch_size):
+                items, numbers, failed = [], [], []
+                for row in batch:
+                    row_number += 1
+                    if isinstance(row, RowError):
+                        failed.append({'row': row_number, 'errors': {'non_field_errors': [str(row)]}})
+                        continue
+                    if 'project' not in row and job.project_id is not None:
+                        row['project'] = job.project_id
+                    items.append(row)
+                    numbers.append(row_number)
+
+                created = 0
+                if items:
+                    tasks, item_errors = prepare_tasks(user, items, allow_past_due=True)
+                    failed += [{'row': number, 'errors': error}
+                               for number, error in zip(numbers, item_errors) if error]
+                    created = len(create_tasks([task for task in tasks if task is not None]))
+
+                errors += failed[:ImportJob.MAX_ERRORS - len(errors)]
+                ImportJob.objects.filter(pk=job.pk).update(
+                    bytes_read=binary.tell(), rows=row_number,
+                    created_count=F('created_count') + created,
+                    error_count=F('error_count') + len(failed),
+                    errors=errors,
+                )
+    except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+        ImportJob.objects.filter(pk=job.pk).update(
+            status='failed', detail='Row %d: %s' % (row_number + 1, exc), finished_at=timezone.now(),
+        )
+        return 'failed'
+
+    ImportJob.objects.filter(pk=job.pk).update(status='done', bytes_read=job.size, finished_at=timezone.now())
+    return 'done'
+
+
+# ----------------------------
+# ATTACHMENT METADATA
+# ----------------------------
+METADATA_FIELDS = ('size', 'mime_type', 'sha256', 'text')
+
+
+@shared_task
+def extract_attachment_metadata(task_id):
+    """
+    Fills the task's AttachmentMetadata for its current attachment. Blob
+    content that was extracted before (the same file on another task) is
+    copied instead of read again. Returns the status written, or None when
+    the attachment changed (or went) in the meantime.
+    """
+    metadata = AttachmentMetadata.objects.select_related('task__blob').filter(task_id=task_id).first()
+    if metadata is None or metadata.file != metadata.task.attachment.name:
+        return None
+    task, name = metadata.task, metadata.file
+
+    known = None
+    if task.blob_id is not None:
+        known = AttachmentMetadata.objects.filter(sha256=task.blob.sha256, status='done').exclude(pk=metadata.pk).first()
+    if known is not None:
+        values, detail = {field: getattr(known, field) for field in METADATA_FIELDS}, ''
+    else:
+        try:
+            values, detail = extract(
+                default_storage.path(name), task.attachment_name or name,
+                sha256=task.blob.sha256 if task.blob_id else None,
+            ), ''
+        except OSError as exc:
+            values, detail = {}, str(exc)
+
+    with transaction.atomic():
+        metadata = AttachmentMetadata.objects.select_for_update().filter(pk=metadata.pk, file=name).first()
+        if metadata is None:
+            return None
+        for field, value in values.items():
+            setattr(metadata, field, value)
+        metadata.status, metadata.detail = ('done' if values else 'failed'), detail
+        metadata.extracted_at = timezone.now()
+        # a save, not an update(): the search index follows post_save
+        metadata.save()
+    return metadata.status
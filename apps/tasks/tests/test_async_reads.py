@@ -0,0 +1,145 @@
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+from apps.tasks.asyncviews import AsyncTaskListView
+
+User = get_user_model()
+
+
+class AsyncReadTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        other_team = Teams.objects.create(name="Team B", owner=self.outsider)
+        Project.objects.create(name="Hidden", team=other_team, created_by=self.outsider)
+
+        self.tasks = [
+            Task.objects.create(title=f"Task {i}", description="d", project=self.project, created_by=self.owner,
+                                status="todo" if i % 2 else "done", assigned_to=self.member if i % 3 else None)
+            for i in range(12)
+        ]
+        for i in range(5):
+            Comment.objects.create(task=self.tasks[0], author=[self.owner, self.member][i % 2], content=f"c{i}")
+        self.use(self.member)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def use(self, user):
+        self.token = "Bearer %s" % AccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=self.token)
+
+    def aget(self, url, params=None, **headers):
+        headers.setdefault("Authorization", self.token)
+        return async_to_sync(self.async_client.get)(url, params or {}, headers=headers)
+
+    def assertSameAsSync(self, sync_url, async_url, params=None):
+        expected = self.client.get(sync_url, params or {})
+        res = self.aget(async_url, params)
+        self.assertEqual(res.status_code, expected.status_code)
+        self.assertEqual(res["Content-Type"], "application/json")
+        # links point at the endpoint they came from
+        body = res.content.decode().replace(async_url, sync_url)
+        self.assertJSONEqual(body, expected.content.decode())
+        return res
+
+    # ==========================================================
+    # SAME OUTPUT AS THE VIEWSETS
+    # ==========================================================
+
+    def test_views_are_async(self):
+        self.assertTrue(AsyncTaskListView.view_is_async)
+
+    def test_task_list(self):
+        sync_url, async_url = reverse("task-list"), reverse("async-task-list")
+        for params in [
+            {},
+            {"page": 2},
+            {"status": "todo", "assigned_to": "me"},
+            {"expand": "project_detail,assigned_to_detail", "ordering": "-comment_count"},
+            {"fields": "title,status", "count": "none"},
+            {"pagination": "cursor", "page_size": 5},
+        ]:
+            with self.subTest(params=params):
+                self.assertSameAsSync(sync_url, async_url, params)
+
+    def test_task_list_cursor_walk(self):
+        url, seen = reverse("async-task-list"), []
+        params = {"pagination": "cursor", "page_size": 5}
+        while url:
+            data = self.aget(url, params).json()
+            seen += [row["title"] for row in data["results"]]
+            url, params = data["next"], None
+        self.assertEqual(sorted(seen), sorted(task.title for task in self.tasks))
+
+    def test_bad_page(self):
+        self.assertSameAsSync(reverse("task-list"), reverse("async-task-list"), {"page": 9})
+        self.assertEqual(self.aget(reverse("async-task-list"), {"page": 9}).status_code, 404)
+
+    def test_task_detail(self):
+        task = self.tasks[3]
+        self.assertSameAsSync(reverse("task-detail", args=[task.id]), reverse("async-task-detail", args=[task.id]))
+
+    def test_task_detail_not_visible(self):
+        self.use(self.outsider)
+        res = self.assertSameAsSync(reverse("task-detail", args=[self.tasks[0].id]),
+                                    reverse("async-task-detail", args=[self.tasks[0].id]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_comment_list(self):
+        task_id = self.tasks[0].id
+        sync_url = reverse("task-comments-list", kwargs={"task_id": task_id})
+        async_url = reverse("async-task-comments", kwargs={"task_id": task_id})
+        self.assertSameAsSync(sync_url, async_url, {"page_size": 2})
+
+        # outsiders only get their own comments
+        self.use(self.outsider)
+        res = self.assertSameAsSync(sync_url, async_url)
+        self.assertEqual(res.json()["results"], [])
+
+    def test_project_list(self):
+        res = self.assertSameAsSync(reverse("projects-list"), reverse("async-project-list"))
+        self.assertEqual([row["name"] for row in res.json()], ["Project 1"])
+        self.assertSameAsSync(reverse("projects-list"), reverse("async-project-list"), {"expand": "team_detail"})
+
+    def test_queries(self):
+        self.aget(reverse("async-task-list"))   # warm the visible-team cache
+        # user, count, page
+        with self.assertNumQueries(3):
+            self.aget(reverse("async-task-list"))
+        # user, the row, the team's members and member cards
+        with self.assertNumQueries(4):
+            self.aget(reverse("async-task-detail", args=[self.tasks[0].id]))
+
+    # ==========================================================
+    # AUTHENTICATION
+    # ==========================================================
+
+    def test_unauthenticated(self):
+        self.client.credentials()
+        expected = self.client.get(reverse("task-list"))
+        res = async_to_sync(self.async_client.get)(reverse("async-task-list"))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.json(), expected.json())
+        self.assertEqual(res["WWW-Authenticate"], expected["WWW-Authenticate"])
+
+    def test_bad_token(self):
+        res = self.aget(reverse("async-task-list"), Authorization="Bearer nope")
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user(self):
+        User.objects.filter(pk=self.member.pk).update(is_active=False)
+        self.assertEqual(self.aget(reverse("async-task-list")).status_code, status.HTTP_401_UNAUTHORIZED)
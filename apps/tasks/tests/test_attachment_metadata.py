@@ -0,0 +1,193 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zlib
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, AttachmentMetadata
+from apps.tasks.metadata import sniff, sha256_of, pdf_text
+from apps.tasks.tasks import extract_attachment_metadata
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+TEXT = "Release checklist\nrollback plan: séquence B\n".encode()
+
+
+def make_pdf(content):
+    stream = zlib.compress(content)
+    return (b"%PDF-1.4\n1 0 obj\n<< /Length " + str(len(stream)).encode() + b" /Filter /FlateDecode >>\nstream\n"
+            + stream + b"\nendstream\nendobj\n2 0 obj\n<< /Type /XObject /Subtype /Image /Length 3 >>\nstream\n"
+            + b"(x) Tj\nendstream\nendobj\n%%EOF\n")
+
+
+def extractions(callbacks):
+    # the on_commit callbacks that queue an extraction (task events publish on commit too)
+    return [callback for callback in callbacks if callback.__qualname__.startswith("queue_attachment_metadata.")]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AttachmentMetadataTests(APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.client.force_authenticate(user=self.owner)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def create_task(self, name, content, **data):
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.post(reverse("task-list"), {
+                "title": "T", "description": "D", "project": self.project.id,
+                "attachment": SimpleUploadedFile(name, content), **data,
+            }, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return Task.objects.latest("pk"), res, extractions(callbacks)
+
+    # ==========================================================
+    # PIPELINE
+    # ==========================================================
+
+    def test_upload_returns_before_the_extraction(self):
+        task, res, callbacks = self.create_task("checklist.md", TEXT)
+        self.assertEqual(res.data["attachment_metadata"]["status"], "pending")
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertEqual(extract_attachment_metadata(task.id), "done")
+        data = self.client.get(reverse("task-detail", args=[task.id])).data["attachment_metadata"]
+        self.assertEqual(data["status"], "done")
+        self.assertEqual((data["size"], data["sha256"]), (len(TEXT), hashlib.sha256(TEXT).hexdigest()))
+        self.assertEqual(data["mime_type"], "text/markdown")
+        self.assertEqual(task.attachment_metadata.text, TEXT.decode())
+
+        # collapsed on lists, like the other details
+        listed = self.client.get(reverse("task-list")).data["results"][0]
+        self.assertNotIn("attachment_metadata", listed)
+        listed = self.client.get(reverse("task-list"), {"expand": "attachment_metadata"}).data["results"][0]
+        self.assertEqual(listed["attachment_metadata"]["status"], "done")
+
+    def test_finished_extraction_moves_the_etag_and_the_sync_log(self):
+        task, _, _ = self.create_task("checklist.md", TEXT)
+        url = reverse("task-detail", args=[task.id])
+        etag = self.client.get(url)["ETag"]
+        token = self.client.get(reverse("sync")).data["token"]
+
+        extract_attachment_metadata(task.id)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["attachment_metadata"]["status"], "done")
+        data = self.client.get(reverse("sync"), {"since": token}).data
+        self.assertEqual([row["id"] for row in data["tasks"]], [task.id])
+
+    def test_pdf_text_is_searchable(self):
+        pdf = make_pdf(b"BT /F1 12 Tf 72 712 Td (Quarterly invoice) Tj [(for ) -250 (Acme\\) Corp)] TJ ET")
+        task, _, _ = self.create_task("invoice.pdf", pdf)
+        self.assertEqual(self.client.get(reverse("search"), {"q": "quarterly"}).data["results"], [])
+
+        extract_attachment_metadata(task.id)
+        metadata = AttachmentMetadata.objects.get(task=task)
+        self.assertEqual((metadata.mime_type, metadata.text), ("application/pdf", "Quarterly invoice for Acme) Corp"))
+        results = self.client.get(reverse("search"), {"q": "quarterly"}).data["results"]
+        self.assertEqual([result["task"] for result in results], [task.id])
+
+    def test_new_attachment_starts_over_and_removal_drops_it(self):
+        task, _, _ = self.create_task("a.txt", TEXT)
+        extract_attachment_metadata(task.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.patch(reverse("task-detail", args=[task.id]),
+                              {"attachment": SimpleUploadedFile("b.bin", b"\x00\x01")}, format="multipart")
+        metadata = AttachmentMetadata.objects.get(task=task)
+        self.assertEqual((metadata.status, metadata.text, len(extractions(callbacks))), ("pending", "", 1))
+        # other edits don't queue anything
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.patch(reverse("task-detail", args=[task.id]), {"title": "T2"}, format="json")
+        self.assertEqual(extractions(callbacks), [])
+
+        task = Task.objects.get(pk=task.pk)
+        task.attachment = None
+        task.save()
+        self.assertFalse(AttachmentMetadata.objects.exists())
+        self.assertIsNone(extract_attachment_metadata(task.id))
+
+    def test_missing_file_fails(self):
+        task, _, _ = self.create_task("a.txt", TEXT)
+        os.remove(task.attachment.path)
+        self.assertEqual(extract_attachment_metadata(task.id), "failed")
+        self.assertIn("No such file", AttachmentMetadata.objects.get().detail)
+
+    def test_same_blob_is_read_once(self):
+        content = make_pdf(b"BT (shared spec) Tj ET")
+        upload = self.client.post(reverse("task-upload-list"), {"filename": "spec.pdf", "size": len(content)},
+                                  format="json").data["id"]
+        self.client.patch(reverse("task-upload-detail", args=[upload]), content,
+                          content_type="application/octet-stream",
+                          HTTP_CONTENT_RANGE="bytes 0-%d/%d" % (len(content) - 1, len(content)))
+        first, _, _ = self.create_task("x.txt", b"x", upload=upload)
+        second, _, _ = self.create_task("x.txt", b"x", upload=upload)
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        extract_attachment_metadata(first.id)
+
+        # the second one is copied: the file isn't even needed any more
+        os.remove(default_storage.path(first.attachment.name))
+        self.assertEqual(extract_attachment_metadata(second.id), "done")
+        metadata = AttachmentMetadata.objects.get(task=second)
+        self.assertEqual((metadata.text, metadata.sha256), ("shared spec", hashlib.sha256(content).hexdigest()))
+
+    def test_backfill_command(self):
+        task = Task.objects.create(title="T", description="D", project=self.project, created_by=self.owner)
+        default_storage.save("task_attachments/old.txt", io.BytesIO(TEXT))
+        Task.objects.filter(pk=task.pk).update(attachment="task_attachments/old.txt")
+
+        out = io.StringIO()
+        call_command("extract_attachments", "--sync", stdout=out)
+        self.assertIn("attachments: 1 queued", out.getvalue())
+        self.assertEqual(AttachmentMetadata.objects.get(task=task).status, "done")
+        call_command("extract_attachments", "--sync", stdout=out)
+        self.assertIn("attachments: 0 queued", out.getvalue())
+
+
+class ExtractionTests(TestCase):
+
+    def test_sniff(self):
+        self.assertEqual(sniff(b"\x89PNG\r\n\x1a\nxxxx", "photo.jpg"), "image/png")
+        self.assertEqual(sniff(b"PK\x03\x04xx", "report.docx"),
+                         "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        self.assertEqual(sniff(b"PK\x03\x04xx", "archive"), "application/zip")
+        self.assertEqual(sniff(b'{"a": 1}', "data.json"), "application/json")
+        self.assertEqual(sniff("héllo".encode()[:2], "notes"), "text/plain")
+        self.assertEqual(sniff(b"\x00\xff\x10", "notes.txt"), "application/octet-stream")
+        self.assertEqual(sniff(b"\x1f\x8b\x08", "dump.sql.gz"), "application/gzip")
+
+    def test_sha256_over_several_windows(self):
+        with tempfile.NamedTemporaryFile() as file:
+            content = os.urandom(1024) * (9 * 1024 + 7)   # a bit over 9 MB
+            file.write(content)
+            file.flush()
+            self.assertEqual(sha256_of(file.name, len(content)), hashlib.sha256(content).hexdigest())
+            self.assertEqual(sha256_of(file.name, 0), hashlib.sha256(b"").hexdigest())
+
+    def test_pdf_without_text(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as file:
+            file.write(make_pdf(b"0 0 m 10 10 l S") + b"<< /Filter /DCTDecode >>\nstream\n\xff\xd8\nendstream")
+            file.flush()
+            self.assertEqual(pdf_text(file.name), "")
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+from apps.tasks.views import CommentViewSet
+
+User = get_user_model()
+
+
+class CommentListingTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+
+        self.task = Task.objects.create(title="Task 1", description="d", project=self.project, created_by=self.owner)
+        self.other_task = Task.objects.create(title="Task 2", description="d", project=self.project, created_by=self.owner)
+
+        Comment.objects.bulk_create([
+            Comment(task=self.task, team=self.team, author=[self.owner, self.member][i % 2], content=f"c{i}")
+            for i in range(25)
+        ])
+        Comment.objects.create(task=self.other_task, author=self.owner, content="elsewhere")
+        self.url = reverse("task-comments-list", kwargs={"task_id": self.task.id})
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def walk(self, url):
+        """Follows `next` links, returning every page."""
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res)
+            url = res.data["next"]
+        return pages
+
+    # ==========================================================
+    # SCOPE AND ORDER
+    # ==========================================================
+
+    def test_only_the_tasks_comments_oldest_first(self):
+        self.client.force_authenticate(user=self.member)
+        pages = self.walk(self.url + "?page_size=10")
+        self.assertEqual(len(pages), 3)
+
+        rows = [row for page in pages for row in page.data["results"]]
+        self.assertEqual([row["content"] for row in rows], [f"c{i}" for i in range(25)])
+        self.assertEqual({row["task"] for row in rows}, {self.task.id})
+
+    def test_compact_rows_carry_author_cards(self):
+        self.client.force_authenticate(user=self.member)
+        row = self.client.get(self.url).data["results"][0]
+        self.assertEqual(set(row), {"id", "task", "author", "author_card", "content", "created_at"})
+        self.assertEqual(row["author_card"], {"id": self.owner.id, "username": "owner"})
+
+    def test_detail_keeps_the_full_representation(self):
+        comment = Comment.objects.filter(task=self.task).first()
+        self.client.force_authenticate(user=self.member)
+        res = self.client.get(reverse("task-comments-detail", kwargs={"task_id": self.task.id, "pk": comment.id}))
+        self.assertIn("task_detail", res.data)
+
+    def test_comment_of_another_task_is_not_found_under_this_task(self):
+        comment = Comment.objects.get(task=self.other_task)
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(reverse("task-comments-detail", kwargs={"task_id": self.task.id, "pk": comment.id}))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    # ==========================================================
+    # FAST PATH AND COST
+    # ==========================================================
+
+    def test_compiled_rows_match_the_serializer(self):
+        self.client.force_authenticate(user=self.member)
+        fast = self.walk(self.url + "?page_size=7")
+        with mock.patch.object(CommentViewSet, "compiled_reads", False):
+            slow = self.walk(self.url + "?page_size=7")
+        self.assertEqual([page.content for page in fast], [page.content for page in slow])
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        self.client.force_authenticate(user=self.member)
+        self.client.get(self.url)  # warm the visible-team cache
+
+        counts = []
+        url = self.url + "?page_size=5"
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url)
+            counts.append(len(ctx.captured_queries))
+            url = res.data["next"]
+        self.assertEqual(len(set(counts)), 1, counts)
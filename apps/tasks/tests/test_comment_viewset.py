@@ -105,19 +105,19 @@ class CommentViewSetTests(APITestCase):
         self.client.force_authenticate(user=self.owner)
         res = self.client.get(self.list_url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data["results"]), 2)
 
     def test_list_comments_success_for_team_member(self):
         self.client.force_authenticate(user=self.member)
         res = self.client.get(self.list_url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data["results"]), 2)
 
     def test_list_comments_success_for_assigned_user(self):
         self.client.force_authenticate(user=self.assigned)
         res = self.client.get(self.list_url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data["results"]), 2)
 
     def test_list_comments_forbidden_for_outsider(self):
         self.client.force_authenticate(user=self.outsider)
@@ -126,7 +126,7 @@ class CommentViewSetTests(APITestCase):
         # ما انتظار داریم کامنت‌ها رو نبینه
         self.assertIn(res.status_code, [status.HTTP_200_OK, status.HTTP_403_FORBIDDEN])
         if res.status_code == status.HTTP_200_OK:
-            self.assertEqual(len(res.data), 0)
+            self.assertEqual(len(res.data["results"]), 0)
 
     # ==================================================
     # CREATE
@@ -0,0 +1,157 @@
+from collections import Counter
+from unittest import mock
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, ProjectStats
+from apps.tasks.tasks import reconcile_project_stats
+
+User = get_user_model()
+
+
+class ProjectStatsTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.project2 = Project.objects.create(name="Project 2", team=self.team, created_by=self.owner)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def task(self, project=None, **kwargs):
+        return Task.objects.create(title="T", description="d", project=project or self.project,
+                                   created_by=self.owner, **kwargs)
+
+    def cells(self):
+        return Counter({
+            (cell.project_id, cell.status, cell.priority): cell.count
+            for cell in ProjectStats.objects.filter(count__gt=0)
+        })
+
+    def assertCellsMatchTasks(self):
+        actual = Counter(Task.objects.values_list('project_id', 'status', 'priority'))
+        self.assertEqual(self.cells(), actual)
+
+    # ==========================================================
+    # SINGLE-ROW WRITES
+    # ==========================================================
+
+    def test_every_project_gets_its_cells(self):
+        self.assertEqual(ProjectStats.objects.filter(project=self.project).count(), 9)
+
+    def test_create_update_move_and_delete(self):
+        task = self.task()
+        self.task(priority=1)
+        self.assertEqual(self.cells(), {(self.project.id, "todo", 2): 1, (self.project.id, "todo", 1): 1})
+
+        task.status = "doing"
+        task.save()
+        task.title = "no cell change"
+        task.save()
+        task.project = self.project2
+        task.priority = 3
+        task.save()
+        self.assertCellsMatchTasks()
+
+        Task.objects.get(pk=task.pk).delete()
+        self.assertCellsMatchTasks()
+
+    def test_api_writes(self):
+        self.client.force_authenticate(user=self.owner)
+        self.client.post(reverse("task-list"), {"title": "a", "description": "d", "project": self.project.id,
+                                                "assigned_to": self.owner.id}, format="json")
+        task = Task.objects.get()
+        res = self.client.patch(reverse("task-detail", args=[task.id]), {"status": "done"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.cells(), {(self.project.id, "done", 2): 1})
+
+    def test_update_fields_only_moves_what_was_written(self):
+        task = self.task()
+        task.status = "done"
+        task.priority = 1
+        task.save(update_fields=["status"])
+        self.assertCellsMatchTasks()
+
+    def test_stale_copies_diff_against_the_row(self):
+        task = self.task()
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        # two requests moving the same task todo -> done
+        for copy in (first, second):
+            copy.status = "done"
+            copy.save()
+        self.assertEqual(self.cells(), {(self.project.id, "done", 2): 1})
+
+        first.delete()
+        second.delete()
+        self.assertEqual(self.cells(), {})
+
+    def test_failed_delta_rolls_the_task_back(self):
+        task = self.task()
+        task.status = "done"
+        with mock.patch.object(ProjectStats, "apply", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            task.save()
+        self.assertEqual(Task.objects.get(pk=task.pk).status, "todo")
+        self.assertCellsMatchTasks()
+
+    def test_project_delete_takes_its_cells(self):
+        self.task()
+        self.task(project=self.project2)
+        self.project.delete()
+        self.assertFalse(ProjectStats.objects.filter(project_id=self.project.id).exists())
+        self.assertCellsMatchTasks()
+
+    # ==========================================================
+    # BULK WRITES
+    # ==========================================================
+
+    def test_bulk_create_update_and_mutate(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.post(reverse("task-bulk"), [
+            {"title": f"T{i}", "description": "d", "project": [self.project, self.project2][i % 2].id,
+             "priority": i % 3 + 1, "assigned_to": self.owner.id}
+            for i in range(12)
+        ], format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertCellsMatchTasks()
+        ids = res.data["ids"]
+
+        res = self.client.patch(reverse("task-bulk"), [
+            {"id": ids[0], "status": "done"}, {"id": ids[1], "priority": 3}, {"id": ids[2], "title": "x"},
+        ], format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertCellsMatchTasks()
+
+        res = self.client.post(reverse("task-bulk-mutate"),
+                               {"filter": {"project": self.project.id}, "set": {"status": "doing"}}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertCellsMatchTasks()
+
+        res = self.client.post(reverse("task-bulk-mutate"), {"ids": ids[:5], "delete": True}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertCellsMatchTasks()
+
+    # ==========================================================
+    # RECONCILIATION
+    # ==========================================================
+
+    def test_reconcile_fixes_drift(self):
+        for _ in range(3):
+            self.task()
+        self.task(project=self.project2, status="done")
+        Task.objects.filter(status="done").update(priority=1)
+        ProjectStats.objects.filter(project=self.project, status="todo", priority=2).update(count=40)
+        ProjectStats.objects.filter(project=self.project2).delete()
+
+        self.assertEqual(reconcile_project_stats(batch_size=1), 2)
+        self.assertCellsMatchTasks()
+        self.assertEqual(ProjectStats.objects.filter(project=self.project2).count(), 9)
+        self.assertEqual(reconcile_project_stats(), 0)
@@ -0,0 +1,117 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+
+class TaskActivityTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.project2 = Project.objects.create(name="Project 2", team=self.team, created_by=self.owner)
+
+        self.task = Task.objects.create(title="Task 1", description="d", project=self.project, created_by=self.owner)
+        self.quiet = Task.objects.create(title="Task 2", description="d", project=self.project, created_by=self.owner)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def comment(self, task=None):
+        self.client.force_authenticate(user=self.member)
+        url = reverse("task-comments-list", kwargs={"task_id": (task or self.task).id})
+        res = self.client.post(url, {"content": "hi"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def counts(self):
+        task = Task.objects.get(pk=self.task.pk)
+        project = Project.objects.get(pk=self.project.pk)
+        return task.comment_count, project.comment_count
+
+    # ==========================================================
+    # MAINTAINED ON WRITES
+    # ==========================================================
+
+    def test_comment_create_and_delete(self):
+        before = Task.objects.get(pk=self.task.pk).last_activity_at
+        first = self.comment()
+        self.comment()
+        self.assertEqual(self.counts(), (2, 2))
+
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertGreater(task.last_activity_at, before)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).last_activity_at, task.last_activity_at)
+
+        url = reverse("task-comments-detail", kwargs={"task_id": self.task.id, "pk": first})
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_stale_task_save_keeps_the_count(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        self.comment()
+        stale.title = "Renamed"
+        stale.save()
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_task_move_and_delete_update_project_rollups(self):
+        self.comment()
+        self.comment()
+        task = Task.objects.get(pk=self.task.pk)
+        task.project = self.project2
+        task.save()
+        self.assertEqual(Project.objects.get(pk=self.project.pk).comment_count, 0)
+        self.assertEqual(Project.objects.get(pk=self.project2.pk).comment_count, 2)
+
+        task.delete()
+        self.assertEqual(Project.objects.get(pk=self.project2.pk).comment_count, 0)
+
+    def test_bulk_delete_updates_project_rollup(self):
+        self.comment()
+        self.comment(self.quiet)
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.post(reverse("task-bulk-mutate"), {"ids": [self.task.id], "delete": True}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).comment_count, 1)
+
+    # ==========================================================
+    # ORDERING
+    # ==========================================================
+
+    def test_order_by_activity_and_comment_count(self):
+        self.comment(self.quiet)
+        self.client.force_authenticate(user=self.member)
+
+        res = self.client.get(reverse("task-list") + "?ordering=-last_activity_at")
+        self.assertEqual(res.data["results"][0]["title"], "Task 2")
+        self.assertEqual(res.data["results"][0]["comment_count"], 1)
+
+        res = self.client.get(reverse("task-list") + "?pagination=cursor&ordering=comment_count")
+        self.assertEqual([row["title"] for row in res.data["results"]], ["Task 1", "Task 2"])
+
+    # ==========================================================
+    # REPAIR
+    # ==========================================================
+
+    def test_repair_command_recomputes_counts(self):
+        self.comment()
+        self.comment(self.quiet)
+        Task.objects.update(comment_count=7)
+        Project.objects.update(comment_count=0, last_activity_at=None)
+
+        call_command("repair_activity", batch_size=1, stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 2))
+        self.assertIsNotNone(Project.objects.get(pk=self.project.pk).last_activity_at)
+        self.assertIsNone(Project.objects.get(pk=self.project2.pk).last_activity_at)
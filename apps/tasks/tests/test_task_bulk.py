@@ -0,0 +1,157 @@
+from datetime import timedelta
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task
+
+User = get_user_model()
+
+
+class TaskBulkTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.project2 = Project.objects.create(name="Project 2", team=self.team, created_by=self.owner)
+
+        self.other_team = Teams.objects.create(name="Team B", owner=self.outsider)
+        self.other_project = Project.objects.create(name="Other", team=self.other_team, created_by=self.outsider)
+
+        self.url = reverse("task-bulk")
+        self.tomorrow = (timezone.now().date() + timedelta(days=1)).isoformat()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def items(self, n, **extra):
+        return [
+            {"title": f"Task {i}", "description": "d", "project": self.project.id, **extra}
+            for i in range(n)
+        ]
+
+    # ==========================================================
+    # CREATE
+    # ==========================================================
+
+    def test_bulk_create(self):
+        self.client.force_authenticate(user=self.member)
+        items = self.items(3, assigned_to=self.owner.id) + [
+            {"title": "x", "description": "d", "project": self.project2.id, "assigned_to": self.member.id,
+             "due_date": self.tomorrow, "status": "doing"},
+        ]
+        res = self.client.post(self.url, items, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created"], 4)
+
+        tasks = Task.objects.filter(pk__in=res.data["ids"])
+        self.assertEqual(tasks.count(), 4)
+        task = tasks.get(title="x")
+        self.assertEqual(task.team_id, self.team.id)
+        self.assertEqual(task.created_by, self.member)
+        self.assertEqual(task.status, "doing")
+
+    def test_bulk_create_query_count_does_not_grow(self):
+        self.client.force_authenticate(user=self.member)
+        self.client.post(self.url, self.items(1), format="json")  # warm the visible-team cache
+
+        # 3 of them record the change log (apps/sync)
+        with self.assertNumQueries(14):
+            res = self.client.post(self.url, self.items(2, assigned_to=self.member.id), format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(14):
+            res = self.client.post(self.url, self.items(50, assigned_to=self.member.id), format="json")
+        self.assertEqual(res.data["created"], 50)
+
+    def test_bulk_create_reports_errors_per_item_and_writes_nothing(self):
+        self.client.force_authenticate(user=self.member)
+        items = self.items(1) + [
+            {"title": "no access", "description": "d", "project": self.other_project.id},
+            {"title": "bad assignee", "description": "d", "project": self.project.id, "assigned_to": self.outsider.id},
+            {"title": "", "description": "d", "project": self.project.id},
+            {"title": "past", "description": "d", "project": self.project.id, "due_date": "2000-01-01"},
+            {"title": "missing", "description": "d", "project": 9999},
+        ]
+        res = self.client.post(self.url, items, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data), 6)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("permission", str(res.data[1]["non_field_errors"][0]))
+        self.assertIn("member of the team", str(res.data[2]["non_field_errors"][0]))
+        self.assertIn("title", res.data[3])
+        self.assertIn("due_date", res.data[4])
+        self.assertIn("project", res.data[5])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_requires_a_list(self):
+        self.client.force_authenticate(user=self.member)
+        res = self.client.post(self.url, {"title": "x"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # ==========================================================
+    # UPDATE
+    # ==========================================================
+
+    def test_bulk_update(self):
+        tasks = [
+            Task.objects.create(title=f"T{i}", description="d", project=self.project,
+                                created_by=self.member, assigned_to=self.member)
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.member)
+        res = self.client.patch(self.url, [
+            {"id": tasks[0].id, "status": "done"},
+            {"id": tasks[1].id, "title": "Renamed", "priority": 1},
+        ], format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["updated"], 2)
+
+        tasks[0].refresh_from_db()
+        tasks[1].refresh_from_db()
+        self.assertEqual(tasks[0].status, "done")
+        self.assertEqual((tasks[1].title, tasks[1].priority), ("Renamed", 1))
+
+    def test_bulk_update_applies_task_permissions(self):
+        mine = Task.objects.create(title="mine", description="d", project=self.project,
+                                   created_by=self.member, assigned_to=self.member)
+        theirs = Task.objects.create(title="theirs", description="d", project=self.project,
+                                     created_by=self.owner, assigned_to=None)
+        hidden = Task.objects.create(title="hidden", description="d", project=self.other_project,
+                                     created_by=self.outsider)
+
+        self.client.force_authenticate(user=self.member)
+        res = self.client.patch(self.url, [
+            {"id": mine.id, "status": "done"},
+            {"id": theirs.id, "title": "x"},
+            {"id": theirs.id, "status": "done"},
+            {"id": mine.id, "assigned_to": self.owner.id},
+            {"id": hidden.id, "status": "done"},
+            {"status": "done"},
+        ], format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("creator or team owner", res.data[1]["non_field_errors"][0])
+        self.assertIn("assigned user or team owner", res.data[2]["non_field_errors"][0])
+        self.assertIn("team owner can change", res.data[3]["non_field_errors"][0])
+        self.assertIn("id", res.data[4])
+        self.assertIn("id", res.data[5])
+
+        mine.refresh_from_db()
+        self.assertEqual(mine.status, "todo")
+
+    def test_bulk_update_bumps_versions(self):
+        task = Task.objects.create(title="T", description="d", project=self.project, created_by=self.owner)
+        version = Project.objects.get(pk=self.project.pk).version
+
+        self.client.force_authenticate(user=self.owner)
+        self.client.patch(self.url, [{"id": task.id, "status": "done"}], format="json")
+        self.assertGreater(Project.objects.get(pk=self.project.pk).version, version)
@@ -0,0 +1,163 @@
+import hashlib
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = b"0123456789abcdef"
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AttachmentDownloadTests(APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.post(reverse("task-list"), {
+            "title": "T", "description": "D", "project": self.project.id,
+            "attachment": SimpleUploadedFile("notes v2.txt", CONTENT),
+        }, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.task = Task.objects.get()
+        self.url = reverse("task-attachment", args=[self.task.id])
+        self.client.force_authenticate(user=self.member)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def download(self, url=None, **headers):
+        res = self.client.get(url or self.url, **{"HTTP_" + name.upper().replace("-", "_"): value
+                                                   for name, value in headers.items()})
+        body = b"".join(res.streaming_content) if res.streaming else res.content
+        return res, body
+
+    # ==========================================================
+    # WHOLE FILE AND PERMISSIONS
+    # ==========================================================
+
+    def test_download(self):
+        res, body = self.download()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(body, CONTENT)
+        self.assertEqual(res["Content-Type"], "text/plain")
+        self.assertEqual(res["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(res["Content-Disposition"], "attachment; filename*=UTF-8''notes%20v2.txt")
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("private", res["Cache-Control"])
+        self.assertTrue(res["ETag"] and res["Last-Modified"])
+
+    def test_only_visible_tasks(self):
+        self.client.force_authenticate(user=self.outsider)
+        self.assertEqual(self.download()[0].status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_media_url_is_not_served(self):
+        self.client.force_authenticate(user=None)
+        res, _ = self.download("/media/" + self.task.attachment.name)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_task_without_attachment(self):
+        task = Task.objects.create(title="T", description="D", project=self.project, created_by=self.owner)
+        res, _ = self.download(reverse("task-attachment", args=[task.id]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_one_query(self):
+        self.client.get(reverse("task-list"))   # warm the visible-team cache
+        with self.assertNumQueries(1):
+            self.download()
+
+    # ==========================================================
+    # RANGES
+    # ==========================================================
+
+    def test_ranges(self):
+        for header, expected, content_range in [
+            ("bytes=2-5", CONTENT[2:6], "bytes 2-5/16"),
+            ("bytes=10-", CONTENT[10:], "bytes 10-15/16"),
+            ("bytes=-3", CONTENT[-3:], "bytes 13-15/16"),
+            ("bytes=4-999", CONTENT[4:], "bytes 4-15/16"),
+        ]:
+            res, body = self.download(range=header)
+            self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT, header)
+            self.assertEqual((body, res["Content-Range"]), (expected, content_range))
+            self.assertEqual(res["Content-Length"], str(len(expected)))
+
+    def test_unsatisfiable_range(self):
+        res, _ = self.download(range="bytes=16-")
+        self.assertEqual(res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(res["Content-Range"], "bytes */16")
+
+    def test_several_ranges_get_the_whole_file(self):
+        res, body = self.download(range="bytes=0-1,4-5")
+        self.assertEqual((res.status_code, body), (status.HTTP_200_OK, CONTENT))
+
+    def test_if_range(self):
+        etag = self.download()[0]["ETag"]
+        self.assertEqual(self.download(range="bytes=0-1", if_range=etag)[0].status_code, 206)
+        res, body = self.download(range="bytes=0-1", if_range='"stale"')
+        self.assertEqual((res.status_code, body), (status.HTTP_200_OK, CONTENT))
+
+    # ==========================================================
+    # CONDITIONAL REQUESTS
+    # ==========================================================
+
+    def test_not_modified(self):
+        first, _ = self.download()
+        res, body = self.download(if_none_match=first["ETag"])
+        self.assertEqual((res.status_code, body), (status.HTTP_304_NOT_MODIFIED, b""))
+        self.assertEqual(res["ETag"], first["ETag"])
+        res, _ = self.download(if_modified_since=first["Last-Modified"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_blob_etag_is_the_content_hash(self):
+        self.client.force_authenticate(user=self.owner)
+        upload = self.client.post(reverse("task-upload-list"), {"filename": "plan.pdf", "size": len(CONTENT)},
+                                  format="json").data["id"]
+        self.client.patch(reverse("task-upload-detail", args=[upload]), CONTENT,
+                          content_type="application/octet-stream", HTTP_CONTENT_RANGE="bytes 0-15/16")
+        self.client.patch(reverse("task-detail", args=[self.task.id]), {"upload": upload}, format="json")
+
+        res, body = self.download()
+        self.assertEqual(res["ETag"], '"%s"' % hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual((res["Content-Type"], body), ("application/pdf", CONTENT))
+        self.assertIn("plan.pdf", res["Content-Disposition"])
+
+    # ==========================================================
+    # PROXY OFFLOAD
+    # ==========================================================
+
+    def test_x_accel_redirect(self):
+        with self.settings(ATTACHMENT_OFFLOAD="x-accel-redirect", ATTACHMENT_ACCEL_PREFIX="/internal/"):
+            res, body = self.download(range="bytes=0-1")
+        self.assertEqual((res.status_code, body), (status.HTTP_200_OK, b""))
+        self.assertEqual(res["X-Accel-Redirect"], "/internal/" + self.task.attachment.name.replace(" ", "%20"))
+        self.assertIn("notes%20v2.txt", res["Content-Disposition"])
+
+    def test_x_sendfile(self):
+        with self.settings(ATTACHMENT_OFFLOAD="x-sendfile"):
+            res, body = self.download()
+        self.assertEqual(body, b"")
+        self.assertEqual(res["X-Sendfile"], self.task.attachment.path)
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+
+class TaskExportTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.other_team = Teams.objects.create(name="Team B", owner=self.outsider)
+        self.other_project = Project.objects.create(name="Other", team=self.other_team, created_by=self.outsider)
+
+        Task.objects.bulk_create([
+            Task(title=f"Task {i}", description='say "hi",\nthen leave', project=self.project, team=self.team,
+                 created_by=self.owner, assigned_to=self.member if i % 2 else None,
+                 status="done" if i % 3 == 0 else "todo")
+            for i in range(1200)
+        ])
+        self.hidden = Task.objects.create(title="hidden", description="d", project=self.other_project,
+                                          created_by=self.outsider)
+        self.first = Task.objects.filter(project=self.project).order_by("pk").first()
+        Comment.objects.create(task=self.first, author=self.member, content="first")
+        Comment.objects.create(task=self.hidden, author=self.outsider, content="hidden")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def export(self, url, **params):
+        self.client.force_authenticate(user=self.member)
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b"".join(res.streaming_content).decode()
+
+    # ==========================================================
+    # FORMATS
+    # ==========================================================
+
+    def test_ndjson_is_the_default(self):
+        res, body = self.export(reverse("task-export"))
+        self.assertEqual(res["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 1200)
+        self.assertEqual(rows[0]["id"], self.first.id)
+        self.assertEqual(rows[0]["description"], 'say "hi",\nthen leave')
+        self.assertTrue(rows[0]["created_at"].endswith("Z"))
+        self.assertNotIn(self.hidden.id, {row["id"] for row in rows})
+
+    def test_csv(self):
+        res, body = self.export(reverse("task-export"), format="csv")
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="tasks.csv"', res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1200)
+        self.assertEqual(rows[0]["description"], 'say "hi",\nthen leave')
+        self.assertEqual(rows[0]["assigned_to"], "")
+
+    def test_unknown_format_is_not_found(self):
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get(reverse("task-export"), {"format": "xml"}).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    # ==========================================================
+    # FILTERS AND COMMENTS
+    # ==========================================================
+
+    def test_list_filters_apply(self):
+        _, body = self.export(reverse("task-export"), status="done", assigned_to="me")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 200)
+        self.assertEqual({(row["status"], row["assigned_to"]) for row in rows}, {("done", self.member.id)})
+
+    def test_comments(self):
+        _, body = self.export(reverse("task-export-comments"), format="csv")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(rows, [{
+            "id": str(Comment.objects.get(content="first").id), "task": str(self.first.id),
+            "author": str(self.member.id), "author_username": "member", "content": "first",
+            "created_at": rows[0]["created_at"],
+        }])
+
+    def test_query_count_does_not_depend_on_row_count(self):
+        self.client.force_authenticate(user=self.member)
+        self.client.get(reverse("task-list"))  # warm the visible-team cache
+        # 1200 rows in chunks of 2000: one SELECT
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse("task-export"))
+            b"".join(res.streaming_content)
@@ -0,0 +1,189 @@
+import io
+import json
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, ImportJob, ProjectStats
+from apps.tasks.importers import iter_json_array
+from apps.tasks.tasks import import_tasks
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TaskImportTests(APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.other_team = Teams.objects.create(name="Team B", owner=self.outsider)
+        self.other_project = Project.objects.create(name="Other", team=self.other_team, created_by=self.outsider)
+        self.url = reverse("task-import-list")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def upload(self, content, fmt, name="tasks.txt", **data):
+        self.client.force_authenticate(user=self.member)
+        file = SimpleUploadedFile(name, content.encode() if isinstance(content, str) else content)
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.post(self.url, {"file": file, "format": fmt, **data}, format="multipart")
+        return res, callbacks
+
+    def run_import(self, content, fmt, batch_size=1000, **data):
+        res, _ = self.upload(content, fmt, **data)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED, res.data)
+        self.assertEqual(import_tasks(res.data["id"], batch_size=batch_size), "done")
+        return self.client.get(reverse("task-import-detail", args=[res.data["id"]])).data
+
+    # ==========================================================
+    # UPLOAD
+    # ==========================================================
+
+    def test_upload_queues_the_job(self):
+        res, callbacks = self.upload("title,project\nx,%d\n" % self.project.id, "csv")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["status"], "pending")
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(ImportJob.objects.get().created_by, self.member)
+
+    def test_upload_checks_the_default_project(self):
+        res, _ = self.upload("{}", "trello")
+        self.assertIn("project", res.data)
+        res, _ = self.upload("{}", "trello", project=self.other_project.id)
+        self.assertIn("permission", str(res.data["project"][0]))
+
+    def test_jobs_are_private(self):
+        res, _ = self.upload("title\n", "csv")
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(reverse("task-import-detail", args=[res.data["id"]]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    # ==========================================================
+    # FORMATS
+    # ==========================================================
+
+    def test_csv_in_batches_with_row_errors(self):
+        rows = ["title,description,project,assigned_to,status,priority,due_date"]
+        rows += ["Task %d,d,%d,%d,todo,1," % (i, self.project.id, self.member.id) for i in range(25)]
+        rows += [
+            ",d,%d,,,," % self.project.id,                      # row 26: no title
+            "hidden,d,%d,,,," % self.other_project.id,          # row 27: not visible
+            "bad assignee,d,%d,%d,,," % (self.project.id, self.outsider.id),
+            "old,d,%d,,done,3,2001-01-01" % self.project.id,  # past due dates import fine
+        ]
+        job = self.run_import("\n".join(rows) + "\n", "csv", batch_size=10)
+
+        self.assertEqual((job["rows"], job["created_count"], job["error_count"]), (29, 26, 3))
+        self.assertEqual([error["row"] for error in job["errors"]], [26, 27, 28])
+        self.assertIn("title", job["errors"][0]["errors"])
+        self.assertEqual(job["progress"], 1.0)
+
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 26)
+        task = Task.objects.get(title="old")
+        self.assertEqual((task.status, task.priority, str(task.due_date)), ("done", 3, "2001-01-01"))
+        self.assertEqual(task.created_by, self.member)
+        self.assertEqual(ProjectStats.objects.get(project=self.project, status="todo", priority=1).count, 25)
+
+    def test_ndjson_uses_the_default_project(self):
+        lines = [json.dumps({"title": "a", "description": "d"}), "not json",
+                 json.dumps({"title": "b", "description": "d", "status": "doing"}), json.dumps([1])]
+        job = self.run_import("\n".join(lines), "ndjson", project=self.project.id)
+        self.assertEqual((job["created_count"], job["error_count"]), (2, 2))
+        self.assertEqual(job["errors"][0], {"row": 2, "errors": {"non_field_errors": ["Invalid JSON."]}})
+        self.assertEqual(set(Task.objects.values_list("title", "status")), {("a", "todo"), ("b", "doing")})
+
+    def test_trello_board(self):
+        board = {
+            "name": "Board",
+            "limits": {"cards": {"openPerBoard": {"status": "ok"}}},
+            "actions": [{"data": {"card": {"name": "not a card"}}}],
+            "cards": [
+                {"name": "Card 1", "desc": "first", "due": "2030-05-01T12:00:00.000Z", "closed": False},
+                {"name": "Card 2", "desc": "x" * 70000, "due": None, "dueComplete": True},
+            ],
+            "lists": [],
+        }
+        job = self.run_import(json.dumps(board), "trello", project=self.project.id)
+        self.assertEqual(job["created_count"], 2)
+        self.assertEqual(str(Task.objects.get(title="Card 1").due_date), "2030-05-01")
+        self.assertEqual(Task.objects.get(title="Card 2").status, "done")
+
+    def test_jira_issues(self):
+        export = {"total": 2, "issues": [
+            {"key": "A-1", "fields": {"summary": "Login", "description": "broken",
+                                      "status": {"statusCategory": {"key": "indeterminate"}},
+                                      "priority": {"name": "Highest"}, "duedate": "2030-01-01"}},
+            {"key": "A-2", "fields": {"summary": "Docs", "description": {"type": "doc", "content": [
+                {"type": "paragraph", "content": [{"type": "text", "text": "Write "},
+                                                  {"type": "text", "text": "them", "marks": [{"type": "em"}]}]},
+                {"type": "paragraph", "content": [{"type": "text", "text": "soon"}]},
+            ]}, "status": {"statusCategory": {"key": "done"}}}},
+            {"key": "A-3", "fields": {"summary": "No description", "description": None}},
+        ]}
+        job = self.run_import(json.dumps(export), "jira", project=self.project.id)
+        self.assertEqual((job["created_count"], job["error_count"]), (2, 1))
+        self.assertEqual(job["errors"][0]["row"], 3)
+        self.assertIn("description", job["errors"][0]["errors"])
+        login = Task.objects.get(title="Login")
+        self.assertEqual((login.status, login.priority), ("doing", 1))
+        self.assertEqual(Task.objects.get(title="Docs").description, "Write them\nsoon")
+
+    def test_broken_file_fails_the_job(self):
+        res, _ = self.upload('{"cards": [{"name": "a", "desc": "b"}, {"name": ', "trello", project=self.project.id)
+        self.assertEqual(import_tasks(res.data["id"], batch_size=1), "failed")
+        job = ImportJob.objects.get()
+        # batches written before the error stay imported
+        self.assertEqual((job.status, job.created_count), ("failed", 1))
+        self.assertIn("Truncated", job.detail)
+
+    def test_job_runs_once(self):
+        res, _ = self.upload("title,description\na,b\n", "csv", project=self.project.id)
+        self.assertEqual(import_tasks(res.data["id"]), "done")
+        self.assertIsNone(import_tasks(res.data["id"]))
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_export_round_trip(self):
+        Task.objects.create(title="exported", description='a "quoted",\nline', project=self.project,
+                            created_by=self.owner, priority=3)
+        self.client.force_authenticate(user=self.member)
+        export = b"".join(self.client.get(reverse("task-export"), {"format": "csv"}).streaming_content)
+        self.run_import(export, "csv")
+        copies = Task.objects.filter(title="exported").order_by("pk")
+        self.assertEqual([(t.description, t.priority) for t in copies], [('a "quoted",\nline', 3)] * 2)
+
+    def test_queries_are_per_batch_not_per_row(self):
+        rows = "title,description\n" + "".join("t%d,d\n" % i for i in range(300))
+        res, _ = self.upload(rows, "csv", project=self.project.id)
+        # claim + load, 14 per batch (project lookup, transaction, 2 inserts, stats,
+        # version bumps, search index, change log, job progress), then done
+        with self.assertNumQueries(2 + 3 * 14 + 1):
+            import_tasks(res.data["id"], batch_size=100)
+        self.assertEqual(Task.objects.count(), 300)
+
+    def test_json_array_reader_crosses_buffer_boundaries(self):
+        items = [{"n": i, "text": "é" * (i * 997 % 5000)} for i in range(300)]
+        text = io.StringIO(json.dumps({"meta": {"issues": 1}, "issues": items}))
+        self.assertEqual(list(iter_json_array(text, "issues")), items)
+
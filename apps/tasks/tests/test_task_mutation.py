@@ -0,0 +1,135 @@
+from datetime import timedelta
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+
+class TaskMutationTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.member2 = User.objects.create_user(username="member2", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member, self.member2)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+
+        self.other_team = Teams.objects.create(name="Team B", owner=self.outsider)
+        self.other_project = Project.objects.create(name="Other", team=self.other_team, created_by=self.outsider)
+
+        self.mine = [self.task(assigned_to=self.member) for _ in range(3)]
+        self.theirs = self.task(assigned_to=self.member2)
+        self.hidden = Task.objects.create(title="hidden", description="d", project=self.other_project,
+                                          created_by=self.outsider)
+        self.url = reverse("task-bulk-mutate")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def task(self, **kwargs):
+        return Task.objects.create(title="T", description="d", project=self.project, created_by=self.owner, **kwargs)
+
+    def mutate(self, user, payload):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url, payload, format="json")
+
+    # ==========================================================
+    # UPDATE
+    # ==========================================================
+
+    def test_assignee_moves_own_tasks_to_done_by_filter(self):
+        res = self.mutate(self.member, {"filter": {"assigned_to": "me", "status": "todo"}, "set": {"status": "done"}})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(res.data["updated"]), sorted(t.id for t in self.mine))
+        self.assertEqual(Task.objects.filter(status="done").count(), 3)
+        self.assertEqual(Task.objects.get(pk=self.theirs.pk).status, "todo")
+
+    def test_execution_rule_is_checked_for_the_whole_set(self):
+        res = self.mutate(self.member, {"filter": {"project": self.project.id}, "set": {"priority": 1}})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["task_ids"], [self.theirs.id])
+        self.assertFalse(Task.objects.filter(priority=1).exists())
+
+    def test_owner_reassigns_a_backlog(self):
+        ids = [t.id for t in self.mine]
+        res = self.mutate(self.owner, {"ids": ids, "set": {"assigned_to": self.member2.id}})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.filter(assigned_to=self.member2).count(), 4)
+
+        res = self.mutate(self.owner, {"ids": ids, "set": {"assigned_to": None}})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.filter(pk__in=ids, assigned_to=None).count(), 3)
+
+    def test_assignee_rules(self):
+        ids = [t.id for t in self.mine]
+        res = self.mutate(self.member, {"ids": ids, "set": {"assigned_to": self.member2.id}})
+        self.assertIn("team owner can change", res.data["non_field_errors"][0])
+
+        res = self.mutate(self.owner, {"ids": ids, "set": {"assigned_to": self.outsider.id}})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("member of the team", res.data["non_field_errors"][0])
+
+    def test_structural_and_due_date_rules(self):
+        past = (timezone.now().date() - timedelta(days=1)).isoformat()
+        res = self.mutate(self.member, {"ids": [self.mine[0].id], "set": {"due_date": None}})
+        self.assertIn("creator or team owner", res.data["non_field_errors"][0])
+
+        res = self.mutate(self.owner, {"ids": [self.mine[0].id], "set": {"due_date": past}})
+        self.assertIn("past", res.data["non_field_errors"][0])
+
+    def test_invisible_ids_are_not_found(self):
+        res = self.mutate(self.owner, {"ids": [self.mine[0].id, self.hidden.id], "set": {"status": "done"}})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["task_ids"], [self.hidden.id])
+        self.assertEqual(Task.objects.get(pk=self.mine[0].pk).status, "todo")
+
+    def test_payload_shape(self):
+        self.assertEqual(self.mutate(self.owner, {"set": {"status": "done"}}).status_code, 400)
+        self.assertEqual(self.mutate(self.owner, {"ids": [1], "set": {}}).status_code, 400)
+        self.assertEqual(self.mutate(self.owner, {"ids": [1], "set": {"status": "x"}}).status_code, 400)
+        self.assertEqual(self.mutate(self.owner, {"ids": [1], "filter": {}, "delete": True}).status_code, 400)
+
+    # ==========================================================
+    # DELETE
+    # ==========================================================
+
+    def test_delete_by_filter_removes_comments_too(self):
+        Comment.objects.create(task=self.mine[0], author=self.member, content="c")
+        version = Project.objects.get(pk=self.project.pk).version
+
+        res = self.mutate(self.member, {"filter": {"assigned_to": "me"}, "delete": True})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["deleted"]), 3)
+        self.assertFalse(Task.objects.filter(assigned_to=self.member).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(Task.objects.filter(pk=self.hidden.pk).exists())
+        self.assertGreater(Project.objects.get(pk=self.project.pk).version, version)
+
+    # ==========================================================
+    # SCALE
+    # ==========================================================
+
+    def test_query_count_does_not_depend_on_set_size(self):
+        Task.objects.bulk_create([
+            Task(title="T", description="d", project=self.project, team=self.team,
+                 created_by=self.owner, assigned_to=self.member)
+            for _ in range(2000)
+        ])
+        payload = {"filter": {"project": self.project.id}, "set": {"status": "doing", "assigned_to": self.member.id}}
+        self.client.force_authenticate(user=self.owner)
+        self.client.get(reverse("task-list"))  # warm the visible-team cache
+        # 3 of them record the change log (apps/sync)
+        with self.assertNumQueries(16):
+            res = self.client.post(self.url, payload, format="json")
+        self.assertEqual(len(res.data["updated"]), 2004)
+        self.assertEqual(Task.objects.filter(status="doing", assigned_to=self.member).count(), 2004)
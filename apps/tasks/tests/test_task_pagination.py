@@ -0,0 +1,143 @@
+from datetime import timedelta
+from unittest import mock
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task
+from apps.tasks.pagination import TaskCursorPagination, TaskPagination
+
+User = get_user_model()
+
+
+class TaskPaginationTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+
+        now = timezone.now()
+        today = now.date()
+        for i in range(25):
+            task = Task.objects.create(
+                title=f"Task {i:02d}",
+                description="desc",
+                project=self.project,
+                created_by=self.owner,
+                priority=(i % 3) + 1,
+                due_date=None if i % 4 == 0 else today + timedelta(days=i % 5),
+            )
+            # a few tasks share created_at so the id tie-breaker is exercised
+            Task.objects.filter(pk=task.pk).update(created_at=now - timedelta(minutes=i // 2))
+
+        self.list_url = reverse("task-list")
+        self.client.force_authenticate(user=self.owner)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def walk(self, url, params, link="next"):
+        titles = []
+        res = self.client.get(url, params)
+        pages = 0
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+            titles += [item["title"] for item in res.data["results"]]
+            pages += 1
+            if not res.data[link]:
+                return titles, res, pages
+            res = self.client.get(res.data[link])
+
+    def expected(self, *ordering):
+        return list(Task.objects.order_by(*ordering).values_list("title", flat=True))
+
+    # ==========================================================
+    # CURSOR
+    # ==========================================================
+
+    def test_cursor_walk_follows_created_at_then_id(self):
+        titles, _, pages = self.walk(self.list_url, {"pagination": "cursor", "page_size": 7})
+        self.assertEqual(titles, self.expected("-created_at", "-id"))
+        self.assertEqual(pages, 4)
+
+    def test_cursor_walk_ascending(self):
+        titles, _, _ = self.walk(self.list_url, {"pagination": "cursor", "page_size": 4, "ordering": "created_at"})
+        self.assertEqual(titles, self.expected("created_at", "id"))
+
+    def test_cursor_walk_by_priority(self):
+        titles, _, _ = self.walk(self.list_url, {"pagination": "cursor", "page_size": 6, "ordering": "-priority"})
+        self.assertEqual(titles, self.expected("-priority", "-created_at", "-id"))
+
+    def test_cursor_walk_by_due_date_puts_nulls_last(self):
+        titles, _, _ = self.walk(self.list_url, {"pagination": "cursor", "page_size": 4, "ordering": "due_date"})
+        expected = list(
+            Task.objects.order_by(F("due_date").asc(nulls_last=True), "-created_at", "-id")
+            .values_list("title", flat=True)
+        )
+        self.assertEqual(titles, expected)
+        self.assertEqual(len(set(titles)), 25)
+
+    def test_cursor_previous_links_walk_back(self):
+        forward, last_page, _ = self.walk(self.list_url, {"pagination": "cursor", "page_size": 4, "ordering": "due_date"})
+        backward = [item["title"] for item in last_page.data["results"]]
+        res = last_page
+        while res.data["previous"]:
+            res = self.client.get(res.data["previous"])
+            backward = [item["title"] for item in res.data["results"]] + backward
+        self.assertEqual(backward, forward)
+
+    def test_cursor_pages_do_not_use_offset_or_count(self):
+        res = self.client.get(self.list_url, {"pagination": "cursor", "page_size": 5})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(res.data["next"])
+        sql = " ".join(q["sql"] for q in ctx.captured_queries).upper()
+        self.assertNotIn("OFFSET", sql)
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("count", res.data)
+
+    def test_invalid_cursor_returns_404(self):
+        res = self.client.get(self.list_url, {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_capped_count(self):
+        with mock.patch.object(TaskCursorPagination, "count_cap", 10):
+            res = self.client.get(self.list_url, {"pagination": "cursor", "count": "capped"})
+        self.assertEqual(res.data["count"], 10)
+        self.assertFalse(res.data["count_exact"])
+
+    # ==========================================================
+    # PAGE NUMBER COUNT MODES
+    # ==========================================================
+
+    def test_page_number_default_is_exact(self):
+        res = self.client.get(self.list_url)
+        self.assertEqual(res.data["count"], 25)
+        self.assertNotIn("count_exact", res.data)
+
+    def test_page_number_walk_is_newest_first(self):
+        titles, _, pages = self.walk(self.list_url, {})
+        self.assertEqual(titles, self.expected("-created_at", "-id"))
+        self.assertEqual(pages, 3)
+
+    def test_page_number_capped_count_still_pages_past_cap(self):
+        with mock.patch.object(TaskPagination, "count_cap", 12):
+            res = self.client.get(self.list_url, {"count": "capped", "page": 3})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 12)
+        self.assertFalse(res.data["count_exact"])
+        self.assertEqual(len(res.data["results"]), 5)
+        self.assertIsNone(res.data["next"])
+
+    def test_page_number_estimated_falls_back_to_capped_on_sqlite(self):
+        res = self.client.get(self.list_url, {"count": "estimated"})
+        self.assertEqual(res.data["count"], 25)
+        self.assertTrue(res.data["count_exact"])
+        self.assertIsNotNone(res.data["next"])
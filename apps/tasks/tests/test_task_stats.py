@@ -0,0 +1,105 @@
+from datetime import timedelta
+from django.utils import timezone
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task
+
+User = get_user_model()
+
+
+class TaskStatsTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.project2 = Project.objects.create(name="Project 2", team=self.team, created_by=self.owner)
+
+        yesterday = timezone.now().date() - timedelta(days=1)
+        self.task(assigned_to=self.member, priority=1, due_date=yesterday)
+        self.task(assigned_to=self.member, priority=1)
+        self.task(assigned_to=self.member, status="done", due_date=yesterday)
+        self.task(assigned_to=self.owner, status="doing", priority=3)
+        self.task(priority=3, due_date=yesterday)
+        self.task(project=self.project2)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def task(self, **kwargs):
+        kwargs.setdefault("project", self.project)
+        # past due dates go around the API, which refuses them
+        return Task.objects.create(title="T", description="d", created_by=self.owner, **kwargs)
+
+    def stats(self, url, user=None):
+        self.client.force_authenticate(user=user or self.member)
+        return self.client.get(url)
+
+    # ==========================================================
+    # PROJECT
+    # ==========================================================
+
+    def test_project_stats(self):
+        res = self.stats(reverse("projects-stats", args=[self.project.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = res.data
+
+        self.assertEqual(data["total"], 5)
+        self.assertEqual(data["by_status"], {"todo": 3, "doing": 1, "done": 1})
+        self.assertEqual(data["by_status_priority"]["todo"], {1: 2, 2: 0, 3: 1})
+        self.assertEqual(data["by_status_priority"]["doing"], {1: 0, 2: 0, 3: 1})
+        # the done task is past its due date too, but not overdue
+        self.assertEqual(data["overdue"], {"total": 2, "by_priority": {1: 1, 2: 0, 3: 1}})
+        self.assertEqual(data["workload"], [
+            {"user": {"id": self.member.id, "username": "member"}, "open": 2, "overdue": 1},
+            {"user": {"id": self.owner.id, "username": "owner"}, "open": 1, "overdue": 0},
+            {"user": None, "open": 1, "overdue": 1},
+        ])
+
+    def test_team_stats_cover_every_project(self):
+        res = self.stats(reverse("teams-stats", args=[self.team.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["total"], 6)
+        self.assertEqual(res.data["workload"][1], {"user": None, "open": 2, "overdue": 1})
+
+    def test_other_teams_are_not_found(self):
+        self.assertEqual(self.stats(reverse("projects-stats", args=[self.project.id]), self.outsider).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.stats(reverse("teams-stats", args=[self.team.id]), self.outsider).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    # ==========================================================
+    # CACHING
+    # ==========================================================
+
+    def test_cached_until_a_task_write(self):
+        url = reverse("projects-stats", args=[self.project.id])
+        self.stats(url)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.stats(url).data["total"], 5)
+
+        self.client.force_authenticate(user=self.member)
+        res = self.client.post(reverse("task-list"), {"title": "new", "description": "d", "project": self.project.id},
+                               format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.stats(url).data["total"], 6)
+
+        task = Task.objects.get(title="new")
+        task.delete()
+        self.assertEqual(self.stats(reverse("teams-stats", args=[self.team.id])).data["total"], 6)
+
+    def test_uncached_stats_query_count(self):
+        self.stats(reverse("teams-stats", args=[self.team.id]))  # warm the visible-team cache
+        Teams.bump(self.team.pk)
+        # team, its ProjectStats cells, open tasks grouped by assignee
+        with self.assertNumQueries(3):
+            self.stats(reverse("teams-stats", args=[self.team.id]))
@@ -0,0 +1,110 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Comment
+
+User = get_user_model()
+
+
+class TaskTeamDenormalizationTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.owner, self.member)
+        self.other_team = Teams.objects.create(name="Team B", owner=self.owner)
+        self.other_team.members.add(self.owner)
+
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.task = Task.objects.create(title="Task 1", description="d", project=self.project, created_by=self.owner)
+        self.comment = Comment.objects.create(task=self.task, author=self.member, content="hi")
+
+    # ==========================================================
+    # KEEPING team IN SYNC
+    # ==========================================================
+
+    def test_task_and_comment_copy_team_on_create(self):
+        self.assertEqual(self.task.team_id, self.team.id)
+        self.assertEqual(self.comment.team_id, self.team.id)
+
+    def test_moving_project_moves_tasks_and_comments(self):
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.patch(
+            reverse("projects-detail", kwargs={"pk": self.project.id}),
+            {"team": self.other_team.id},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+
+        self.task.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual(self.task.team_id, self.other_team.id)
+        self.assertEqual(self.comment.team_id, self.other_team.id)
+
+    def test_moving_task_to_another_team_moves_its_comments(self):
+        other_project = Project.objects.create(name="Project 2", team=self.other_team, created_by=self.owner)
+        Comment.objects.create(task=self.task, author=self.owner, content="moved")
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.patch(reverse("task-detail", kwargs={"pk": self.task.id}),
+                                {"project": other_project.id}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.team_id, self.other_team.id)
+        # the comments are listed under the team the task is in now
+        res = self.client.get(reverse("task-comments-list", kwargs={"task_id": self.task.id}))
+        self.assertEqual([row["content"] for row in res.data["results"]], ["hi", "moved"])
+        # team A's member only keeps their own
+        self.client.force_authenticate(user=self.member)
+        res = self.client.get(reverse("task-comments-list", kwargs={"task_id": self.task.id}))
+        self.assertEqual([row["content"] for row in res.data["results"]], ["hi"])
+
+    def test_saving_task_without_move_leaves_comments_alone(self):
+        task = Task.objects.get(pk=self.task.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            task.title = "Renamed"
+            task.save()
+        self.assertFalse(any(q["sql"].startswith('UPDATE "tasks_comment"') for q in ctx.captured_queries))
+
+    def test_saving_project_without_move_leaves_tasks_alone(self):
+        project = Project.objects.get(pk=self.project.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            project.name = "Renamed"
+            project.save()
+        self.assertFalse(any("tasks_task" in q["sql"] for q in ctx.captured_queries))
+
+    # ==========================================================
+    # VISIBILITY FILTERS
+    # ==========================================================
+
+    def test_member_loses_tasks_after_project_moves(self):
+        self.project.team = self.other_team
+        self.project.save()
+
+        self.client.force_authenticate(user=self.member)
+        res = self.client.get(reverse("task-list"))
+        self.assertEqual(res.data["count"], 0)
+
+    def test_task_list_filters_without_distinct_or_member_join(self):
+        self.client.force_authenticate(user=self.member)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("task-list"))
+        self.assertEqual(res.data["count"], 1)
+        task_sql = [q["sql"] for q in ctx.captured_queries if 'FROM "tasks_task"' in q["sql"]]
+        self.assertTrue(task_sql)
+        for sql in task_sql:
+            self.assertNotIn("DISTINCT", sql)
+            self.assertNotIn('JOIN "teams_teams_members"', sql)
+
+    def test_comment_list_has_no_duplicates(self):
+        # owner is both team owner and member: the old join returned rows twice
+        self.client.force_authenticate(user=self.owner)
+        res = self.client.get(reverse("task-comments-list", kwargs={"task_id": self.task.id}))
+        self.assertEqual(len(res.data["results"]), 1)
@@ -0,0 +1,226 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task, Blob, AttachmentUpload
+from apps.tasks.blobs import UploadError, write_chunk
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 40   # 10240 bytes
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AttachmentUploadTests(APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.outsider = User.objects.create_user(username="outsider", password="1234")
+
+        self.team = Teams.objects.create(name="Team A", owner=self.owner)
+        self.team.members.add(self.member)
+        self.project = Project.objects.create(name="Project 1", team=self.team, created_by=self.owner)
+        self.client.force_authenticate(user=self.owner)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def start(self, size=len(CONTENT), **data):
+        res = self.client.post(reverse("task-upload-list"), {"filename": "design.fig", "size": size, **data},
+                               format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return res.data["id"]
+
+    def send(self, upload_id, start, end, content=CONTENT):
+        return self.client.patch(
+            reverse("task-upload-detail", args=[upload_id]), content[start:end],
+            content_type="application/offset+octet-stream",
+            HTTP_CONTENT_RANGE="bytes %d-%d/%d" % (start, end - 1, len(content)),
+        )
+
+    def upload(self, content=CONTENT):
+        upload_id = self.start(size=len(content))
+        self.assertEqual(self.send(upload_id, 0, len(content), content).status_code, status.HTTP_200_OK)
+        return upload_id
+
+    def create_task(self, **data):
+        res = self.client.post(reverse("task-list"), {
+            "title": "T", "description": "D", "project": self.project.id, **data,
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return Task.objects.latest("pk")
+
+    # ==========================================================
+    # CHUNKS
+    # ==========================================================
+
+    def test_chunks_resume_and_complete(self):
+        upload_id = self.start(sha256=SHA256.upper())
+
+        res = self.send(upload_id, 0, 4096)
+        self.assertEqual((res.data["offset"], res.data["complete"]), (4096, False))
+
+        # a retry of an old chunk (or a skipped one) is told where to go on
+        for start in (0, 8192):
+            res = self.send(upload_id, start, start + 100)
+            self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(res.data["offset"], 4096)
+
+        self.assertEqual(self.client.get(reverse("task-upload-detail", args=[upload_id])).data["offset"], 4096)
+        self.send(upload_id, 4096, 8192)
+        res = self.send(upload_id, 8192, len(CONTENT))
+        self.assertEqual((res.data["complete"], res.data["blob_sha256"]), (True, SHA256))
+
+        blob = Blob.objects.get()
+        self.assertEqual((blob.size, blob.file.name), (len(CONTENT), "blobs/%s/%s/%s" % (SHA256[:2], SHA256[2:4], SHA256)))
+        with blob.file.open("rb") as file:
+            self.assertEqual(file.read(), CONTENT)
+        self.assertFalse(default_storage.exists("uploads/%d.part" % upload_id))
+
+        self.assertEqual(self.send(upload_id, 0, 10).status_code, status.HTTP_409_CONFLICT)
+
+    def test_dropped_connection_keeps_the_bytes_that_arrived(self):
+        upload = AttachmentUpload.objects.create(created_by=self.owner, filename="f", size=len(CONTENT))
+        write_chunk(upload, 0, 6000, io.BytesIO(CONTENT[:2500]))
+        self.assertEqual(AttachmentUpload.objects.get().offset, 2500)
+        write_chunk(upload, 2500, len(CONTENT), io.BytesIO(CONTENT[2500:]))
+        self.assertEqual(upload.blob.sha256, SHA256)
+
+    def test_losing_chunk_for_the_same_offset_leaves_the_file_alone(self):
+        upload = AttachmentUpload.objects.create(created_by=self.owner, filename="f", size=len(CONTENT))
+        racer = AttachmentUpload.objects.get(pk=upload.pk)
+        write_chunk(upload, 0, 2500, io.BytesIO(CONTENT[:2500]))
+        # a second request that read offset 0 before the first one moved it
+        with self.assertRaises(UploadError) as ctx:
+            write_chunk(racer, 0, 2500, io.BytesIO(b"x" * 2500))
+        self.assertEqual(ctx.exception.offset, 2500)
+        with default_storage.open(upload.part_name) as part:
+            self.assertEqual(part.read(), CONTENT[:2500])
+        self.assertFalse([name for name in os.listdir(os.path.join(MEDIA_ROOT, "uploads"))
+                          if name.startswith("%d.part." % upload.pk)])
+
+        write_chunk(upload, 2500, len(CONTENT), io.BytesIO(CONTENT[2500:]))
+        self.assertEqual(upload.blob.sha256, SHA256)
+
+    def test_checksum_mismatch_starts_over(self):
+        upload_id = self.start(sha256="0" * 64)
+        res = self.send(upload_id, 0, len(CONTENT))
+        self.assertEqual((res.status_code, res.data["offset"]), (status.HTTP_409_CONFLICT, 0))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_bad_requests(self):
+        res = self.client.post(reverse("task-upload-list"), {"filename": "f", "size": 0, "sha256": "xyz"}, format="json")
+        self.assertEqual(set(res.data), {"size", "sha256"})
+        upload_id = self.start()
+        url = reverse("task-upload-detail", args=[upload_id])
+        self.assertEqual(self.client.patch(url, b"abc", content_type="application/octet-stream").status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        res = self.client.patch(url, b"abc", content_type="application/octet-stream",
+                                HTTP_CONTENT_RANGE="bytes 0-2/3")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_uploads_are_private(self):
+        upload_id = self.upload()
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get(reverse("task-upload-detail", args=[upload_id])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        res = self.client.post(reverse("task-list"), {
+            "title": "T", "description": "D", "project": self.project.id, "upload": upload_id,
+        }, format="json")
+        self.assertIn("upload", res.data)
+
+    # ==========================================================
+    # DEDUPLICATION AND REFERENCES
+    # ==========================================================
+
+    def test_same_content_is_stored_once(self):
+        first, second = self.upload(), self.upload()
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(len(os.listdir(os.path.join(MEDIA_ROOT, "blobs", SHA256[:2], SHA256[2:4]))), 1)
+
+        a = self.create_task(upload=first)
+        b = self.create_task(upload=second)
+        self.assertEqual(a.attachment.name, b.attachment.name)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+
+        res = self.client.get(reverse("task-detail", args=[a.id]))
+        self.assertTrue(res.data["attachment"].endswith(SHA256))
+
+    def test_references_follow_the_tasks(self):
+        upload_id = self.upload()
+        tasks = [self.create_task(upload=upload_id) for _ in range(4)]
+        blob = Blob.objects.get()
+        self.assertEqual(blob.ref_count, 4)
+
+        # replaced by a plain file
+        res = self.client.patch(reverse("task-detail", args=[tasks[0].id]),
+                                {"attachment": SimpleUploadedFile("a.txt", b"a")}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(Task.objects.get(pk=tasks[0].id).blob_id)
+        # re-attaching the same blob changes nothing
+        self.client.patch(reverse("task-detail", args=[tasks[1].id]), {"upload": upload_id}, format="json")
+        self.client.delete(reverse("task-detail", args=[tasks[1].id]))
+        self.client.post(reverse("task-bulk-mutate"), {"ids": [tasks[2].id], "delete": True}, format="json")
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        self.project.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 0)
+
+    def test_incomplete_upload_cannot_be_attached(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, 100)
+        res = self.client.post(reverse("task-list"), {
+            "title": "T", "description": "D", "project": self.project.id, "upload": upload_id,
+        }, format="json")
+        self.assertIn("upload", res.data)
+
+    # ==========================================================
+    # GARBAGE COLLECTION
+    # ==========================================================
+
+    def test_gc_removes_orphans_after_the_grace_period(self):
+        kept_id, orphan_id = self.upload(), self.upload(content=b"orphan")
+        self.create_task(upload=kept_id)
+        stale_id = self.start()
+        self.send(stale_id, 0, 100)
+
+        out = io.StringIO()
+        call_command("gc_blobs", stdout=out)
+        self.assertEqual(Blob.objects.count(), 2)   # orphan still in its grace period
+
+        past = timezone.now() - timedelta(days=2)
+        Blob.objects.update(touched_at=past)
+        AttachmentUpload.objects.update(updated_at=past)
+        orphan = Blob.objects.get(uploads=orphan_id)
+        call_command("gc_blobs", stdout=out)
+
+        self.assertEqual(list(Blob.objects.values_list("sha256", flat=True)), [SHA256])
+        self.assertFalse(default_storage.exists(orphan.file.name))
+        self.assertFalse(default_storage.exists("uploads/%d.part" % stale_id))
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertIn("blobs: 1 removed, 6 bytes freed", out.getvalue())
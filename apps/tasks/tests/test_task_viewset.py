@@ -1,4 +1,7 @@
+import shutil
+import tempfile
 from datetime import timedelta
+from django.test import override_settings
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -12,9 +15,17 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 
 User = get_user_model()
 
+MEDIA_ROOT = tempfile.mkdtemp()
 
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TasksViewSetTests(APITestCase):
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         # Users
         self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
@@ -3,6 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import *
 
 router = DefaultRouter()
+# before '': the task detail route would take "imports" / "uploads" for a pk
+router.register('imports', ImportJobViewSet, basename='task-import')
+router.register('uploads', AttachmentUploadViewSet, basename='task-upload')
 router.register('', TasksViewSet, basename='task')
 router.register(r'(?P<task_id>\d+)/comments', CommentViewSet, basename='task-comments')
 # /api/tasks/<task_id>/comments/
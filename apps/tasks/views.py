@@ -1,32 +1,39 @@
 from .models import *
 from .serializers import *
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, GenericViewSet
+from rest_framework import mixins
+from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django.db.models import Q
 from apps.projects.models import *
 from apps.teams.models import *
 from django.shortcuts import get_object_or_404
-from rest_framework.decorators import api_view
-from .pagination import TaskPagination
+from rest_framework.decorators import api_view, action
+from rest_framework.response import Response
+from rest_framework import status
+from .bulk import bulk_create_tasks, bulk_update_tasks, mutate_tasks, BulkError, MutationError
+from .pagination import TaskPagination, TaskCursorPagination, CommentCursorPagination, CursorSwitchMixin
+from .export import RENDERERS, TASK_COLUMNS, COMMENT_COLUMNS, stream
+from .tasks import import_tasks
+from .blobs import UploadError, parse_content_range, write_chunk
+from .downloads import serve
+from django.http import Http404
+import os
+from apps.core.prefetch import PrefetchPlannerMixin
+from apps.core.fastpath import CompiledReadMixin
+from apps.core.etag import ConditionalGetMixin
+from apps.teams.visibility import visible_teams_q, visible_team_versions
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
-class TasksViewSet(ModelViewSet):
-    serializer_class = TaskSerializer
-    permission_classes = [IsAuthenticated]
-    pagination_class = TaskPagination
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+class TaskFiltersMixin:
+    """?status=, ?assigned_to=me and ?ordering= of the task list, shared with the async views."""
+    # "recently active" boards and comment badges, see task_team_activity_idx / task_team_comments_idx
+    ordering_fields = ('last_activity_at', 'comment_count')
 
-  
-
-    def get_queryset(self):
+    def filter_tasks(self, qs):
         user = self.request.user
 
-    # 1) queryset اصلی: فقط تسک‌هایی که کاربر اجازه دیدن دارد
-        qs = Task.objects.filter(
-            Q(project__team__owner=user) | Q(project__team__members=user)
-        ).distinct()
-
     # 2) فیلتر status
         status_param = self.request.query_params.get('status')
         if status_param:
@@ -37,9 +44,40 @@ class TasksViewSet(ModelViewSet):
         if assigned_to_param == "me":
             qs = qs.filter(assigned_to=user)
 
+    # 4) ?ordering= (the cursor paginator applies its own); newest first
+    # otherwise, so offset pages are stable (task_team_created_idx)
+        ordering = self.request.query_params.get('ordering', '')
+        if ordering.lstrip('-') in self.ordering_fields:
+            qs = qs.order_by(ordering, '-created_at', '-id')
+        else:
+            qs = qs.order_by('-created_at', '-id')
+
         return qs
 
 
+class TasksViewSet(ConditionalGetMixin, CompiledReadMixin, PrefetchPlannerMixin, CursorSwitchMixin, TaskFiltersMixin,
+                   ModelViewSet):
+    serializer_class = TaskSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = TaskPagination
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    cursor_pagination_class = TaskCursorPagination
+    version_lookup = 'project__version'
+    # downloads don't render the serializer
+    unplanned_actions = ('attachment',)
+
+    def get_queryset(self):
+        user = self.request.user
+
+    # 1) queryset اصلی: فقط تسک‌هایی که کاربر اجازه دیدن دارد
+        qs = Task.objects.filter(visible_teams_q(user))
+
+        return self.filter_tasks(qs)
+
+    def get_list_versions(self):
+        return visible_team_versions(self.request.user)
+
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -64,17 +102,171 @@ class TasksViewSet(ModelViewSet):
             raise PermissionDenied("You do not have permission to delete this task")
 
         instance.delete()
+
+    @action(detail=True, methods=['get'], url_path='attachment')
+    def attachment(self, request, pk=None):
+        """
+        GET /api/tasks/<id>/attachment/
+        The attachment itself, with Range and conditional GET support, or
+        handed to the proxy (ATTACHMENT_OFFLOAD). See apps/tasks/downloads.py.
+        """
+        task = get_object_or_404(self.get_queryset().select_related('blob'), pk=pk)
+        if not task.attachment:
+            raise Http404('This task has no attachment.')
+        response = serve(
+            request, task.attachment.name,
+            task.attachment_name or os.path.basename(task.attachment.name),
+            # same bytes, same ETag, whichever task they're downloaded from
+            etag='"%s"' % task.blob.sha256 if task.blob_id else None,
+        )
+        if response is None:
+            raise Http404('The attachment file is missing.')
+        return response
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk', parser_classes=[JSONParser])
+    def bulk(self, request):
+        """
+        POST  /api/tasks/bulk/  [{title, description, project, ...}, ...]
+        PATCH /api/tasks/bulk/  [{id, status, ...}, ...]
+
+        All or nothing: a 400 carries one error dict per item ({} for the
+        items that were fine), in input order.
+        """
+        try:
+            if request.method == 'POST':
+                tasks = bulk_create_tasks(request.user, request.data)
+                return Response({'created': len(tasks), 'ids': [task.pk for task in tasks]},
+                                status=status.HTTP_201_CREATED)
+            tasks = bulk_update_tasks(request.user, request.data)
+            return Response({'updated': len(tasks)})
+        except BulkError as exc:
+            return Response(exc.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], url_path='bulk/mutate', parser_classes=[JSONParser])
+    def bulk_mutate(self, request):
+        """
+        POST /api/tasks/bulk/mutate/
+            {"ids": [1, 2]} or {"filter": {"project": 3, "status": "doing", "assigned_to": "me"}}
+            plus {"set": {"status": "done"}} or {"delete": true}
+
+        One UPDATE / DELETE for the whole set; returns the affected ids.
+        """
+        serializer = TaskMutationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            ids = mutate_tasks(request.user, serializer.validated_data)
+        except MutationError as exc:
+            return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'deleted' if serializer.validated_data['delete'] else 'updated': ids})
+
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=RENDERERS)
+    def export(self, request):
+        """
+        GET /api/tasks/export/?format=ndjson|csv
+        Every visible task matching the list filters (?status=, ?assigned_to=me,
+        ?ordering=), streamed in one response.
+        """
+        tasks = self.get_queryset()
+        if request.query_params.get('ordering', '').lstrip('-') not in self.ordering_fields:
+            # without ?ordering=, exports go in id order (see stream())
+            tasks = tasks.order_by()
+        return stream(tasks, TASK_COLUMNS, request.accepted_renderer.format, 'tasks')
+
+    @action(detail=False, methods=['get'], url_path='export/comments', renderer_classes=RENDERERS)
+    def export_comments(self, request):
+        """
+        GET /api/tasks/export/comments/?format=ndjson|csv
+        The comments of those same tasks, oldest first.
+        """
+        tasks = self.get_queryset().order_by().values('pk')
+        comments = Comment.objects.filter(task__in=tasks)
+        return stream(comments, COMMENT_COLUMNS, request.accepted_renderer.format, 'comments')
+#--------------------------import------------------------------
+class ImportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, GenericViewSet):
+    """
+    POST /api/tasks/imports/      multipart: file, format (csv|ndjson|trello|jira), project
+    GET  /api/tasks/imports/<id>/ progress, counters and the failed rows
+
+    The upload is answered with 202 right away; a Celery worker imports it.
+    """
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(created_by=self.request.user).order_by('-created_at', '-id')
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def perform_create(self, serializer):
+        job = serializer.save(created_by=self.request.user)
+        transaction.on_commit(lambda: import_tasks.delay(job.pk))
+
+
+#--------------------------upload------------------------------
+class AttachmentUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, GenericViewSet):
+    """
+    POST  /api/tasks/uploads/       {filename, size, sha256 (optional)}
+    PATCH /api/tasks/uploads/<id>/  raw bytes, Content-Range: bytes <start>-<end>/<size>
+    GET   /api/tasks/uploads/<id>/  offset to resume from
+
+    A complete upload is attached with {"upload": <id>} on task create/update.
+    See apps/tasks/blobs.py.
+    """
+    serializer_class = AttachmentUploadSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser]
+
+    def get_queryset(self):
+        return AttachmentUpload.objects.filter(created_by=self.request.user).select_related('blob')
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    def partial_update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            start, end, total = parse_content_range(request.headers.get('Content-Range'))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if total != upload.size:
+            return Response({'detail': 'Content-Range size does not match the upload size %d.' % upload.size},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # the body is read as a stream, request.data is never parsed
+        try:
+            write_chunk(upload, start, end, request.stream)
+        except UploadError as exc:
+            return Response({'detail': str(exc), 'offset': exc.offset}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(upload).data)
+
+
 #--------------------------comment------------------------------
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(CompiledReadMixin, PrefetchPlannerMixin, ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CommentCursorPagination
+
+    def get_serializer_class(self):
+        # lists carry author cards instead of the nested task
+        if self.action == 'list':
+            return CommentCompactSerializer
+        return self.serializer_class
 
     def get_queryset(self):
         user = self.request.user
-        return Comment.objects.filter(Q(author = user)|
-                                      Q(task__project__team__owner = user)|
-                                      Q(task__project__team__members = user)|
-                                      Q(task__assigned_to = user)).select_related('task','author').distinct()
+        task_id = self.kwargs.get('task_id')
+
+        # who may read the task's comments is decided once for the task:
+        # team owner/member or assignee see all of them, anyone else only their own
+        qs = Comment.objects.filter(task_id=task_id)
+        can_see_task = Task.objects.filter(pk=task_id).filter(visible_teams_q(user) | Q(assigned_to=user)).exists()
+        if not can_see_task:
+            qs = qs.filter(author=user)
+        return qs
     
     def perform_create(self, serializer):
         task_id = self.kwargs.get("task_id")
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TeamsConfig(AppConfig):
     name = 'apps.teams'
+
+    def ready(self):
+        from . import signals  # noqa: F401
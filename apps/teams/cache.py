@@ -0,0 +1,107 @@
+"""
+Ids of the teams each user owns or belongs to.
+
+Two layers: a per-request dict in the handling thread (filled and dropped
+with request_started / request_finished, so the ETag check, the queryset
+and any nested lookup share one answer), then the shared Django cache.
+Entries are invalidated by the membership / team signals in signals.py
+through apps/core/generations.py, so a miss that read the memberships
+before a change can't cache them after it. Invalidations only reach the
+other workers through a shared cache (settings.SHARED_CACHE); on a per-process
+cache entries live LOCAL_TIMEOUT seconds instead, which bounds how long
+another worker keeps showing a team someone has left.
+
+avisible_team_ids() is the same lookup for the async views; it skips the
+per-request layer (request signals don't run in the event loop's thread).
+"""
+import threading
+
+from django.conf import settings
+from django.core.signals import request_started, request_finished
+from django.dispatch import receiver
+
+from apps.core import generations, metrics
+from .models import Teams
+
+KEY = 'teams:visible:%s'
+TIMEOUT = 60 * 60
+LOCAL_TIMEOUT = 10
+
+HIT = metrics.counter('teams.visible.hit')
+MISS = metrics.counter('teams.visible.miss')
+
+_local = threading.local()
+
+
+@receiver(request_started)
+def _begin_request(**kwargs):
+    _local.ids = {}
+
+
+@receiver(request_finished)
+def _end_request(**kwargs):
+    _local.ids = None
+
+
+def _query(user_id):
+    memberships = Teams.members.through.objects.filter(user_id=user_id).values_list('teams_id', flat=True)
+    owned = Teams.objects.filter(owner_id=user_id).values_list('id', flat=True)
+    return memberships.union(owned)
+
+
+def _timeout():
+    return TIMEOUT if getattr(settings, 'SHARED_CACHE', False) else LOCAL_TIMEOUT
+
+
+def _load(user_id):
+    return tuple(sorted(set(_query(user_id))))
+
+
+def visible_team_ids(user):
+    """Sorted tuple of the ids of the teams `user` owns or is a member of."""
+    if user is None or user.pk is None:
+        return ()
+
+    local = getattr(_local, 'ids', None)
+    if local is not None and user.pk in local:
+        return local[user.pk]
+
+    key = KEY % user.pk
+    ids, generation = generations.lookup(key)
+    if ids is None:
+        metrics.incr(MISS)
+        ids = _load(user.pk)
+        generations.fill(key, generation, ids, _timeout())
+    else:
+        metrics.incr(HIT)
+
+    if local is not None:
+        local[user.pk] = ids
+    return ids
+
+
+async def avisible_team_ids(user):
+    if user is None or user.pk is None:
+        return ()
+
+    key = KEY % user.pk
+    ids, generation = await generations.alookup(key)
+    if ids is None:
+        await metrics.aincr(MISS)
+        ids = tuple(sorted({pk async for pk in _query(user.pk).aiterator()}))
+        await generations.afill(key, generation, ids, _timeout())
+    else:
+        await metrics.aincr(HIT)
+    return ids
+
+
+def invalidate(user_ids):
+    user_ids = {pk for pk in user_ids if pk is not None}
+    if not user_ids:
+        return
+    keys = [KEY % pk for pk in user_ids]
+    local = getattr(_local, 'ids', None)
+    if local:
+        for pk in user_ids:
+            local.pop(pk, None)
+    generations.invalidate(keys)
@@ -1,12 +1,26 @@
 from django.db import models
 from apps.users.models import User
+from apps.core.models import VersionedModel
 
 
-class Teams(models.Model):
+class Teams(VersionedModel):
     name = models.CharField(max_length=30)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_teams')
     members = models.ManyToManyField(User, related_name='teams')
     created_at = models.DateField(auto_now_add=True)
 
+    # owner_id as loaded from the database, to notice ownership changes
+    _loaded_owner_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get('owner_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_owner_id = self.owner_id
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -2,8 +2,11 @@ from .models import *
 from rest_framework import serializers
 from apps.users.serializers import *
 from django.utils import timezone
+from apps.core.serializers import DynamicFieldsMixin
+
+class TeamSerialiser(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('owner_detail', 'members_detail')
 
-class TeamSerialiser(serializers.ModelSerializer):
     owner = serializers.PrimaryKeyRelatedField(read_only=True)
     owner_detail = UserSerializer(source='owner', read_only=True)
 
@@ -0,0 +1,78 @@
+from django.db.models.signals import post_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.projects.models import Project
+from apps.users.models import User
+from .models import Teams
+from . import cache
+from .visibility import visible_teams_q
+
+
+def touch_teams(team_ids):
+    """
+    Bumps the teams and every project in them; team details (members,
+    owner) are embedded in project and task responses.
+    """
+    team_ids = list(team_ids)
+    if team_ids:
+        Teams.bump(*team_ids)
+        Project.bump(team_id__in=team_ids)
+
+
+@receiver(post_save, sender=Teams)
+def bump_versions_on_team_save(sender, instance, **kwargs):
+    touch_teams([instance.pk])
+
+
+@receiver(m2m_changed, sender=Teams.members.through)
+def bump_versions_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_teams([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        touch_teams(pk_set)
+    elif action == 'pre_clear':
+        # user.teams.clear(): the team ids are gone after the clear
+        touch_teams(instance.teams.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def bump_versions_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    # user details are embedded as owner/member of the teams the user is in;
+    # a login only touches last_login
+    if created or (update_fields and set(update_fields) <= {'last_login', 'password'}):
+        return
+    touch_teams(Teams.objects.filter(visible_teams_q(instance, field='pk')).values_list('pk', flat=True))
+
+
+# ----------------------------
+# VISIBLE-TEAM CACHE
+# ----------------------------
+@receiver(post_save, sender=Teams)
+def invalidate_visible_teams_on_team_save(sender, instance, created, **kwargs):
+    if created or instance._loaded_owner_id != instance.owner_id:
+        cache.invalidate([instance.owner_id, instance._loaded_owner_id])
+
+
+@receiver(pre_delete, sender=Teams)
+def invalidate_visible_teams_on_team_delete(sender, instance, **kwargs):
+    members = list(instance.members.values_list('pk', flat=True))
+    cache.invalidate(members + [instance.owner_id])
+
+
+@receiver(m2m_changed, sender=Teams.members.through)
+def invalidate_visible_teams_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            cache.invalidate([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        cache.invalidate(pk_set)
+    elif action == 'pre_clear':
+        cache.invalidate(instance.members.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_visible_teams_on_user_create(sender, instance, created, **kwargs):
+    # ids can be reused (e.g. SQLite after a rollback); never inherit an entry
+    if created:
+        cache.invalidate([instance.pk])
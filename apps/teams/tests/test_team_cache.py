@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from apps.core import metrics
+from apps.teams import cache as team_cache
+from apps.teams.cache import visible_team_ids
+from apps.teams.models import Teams
+from apps.projects.models import Project
+from apps.tasks.models import Task
+
+User = get_user_model()
+
+
+class VisibleTeamCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="1234", role="team_owner")
+        self.member = User.objects.create_user(username="member", password="1234")
+        self.admin = User.objects.create_user(username="admin", password="1234", role="admin")
+
+        self.team1 = Teams.objects.create(name="Team 1", owner=self.owner)
+        self.team1.members.add(self.owner, self.member)
+        self.team2 = Teams.objects.create(name="Team 2", owner=self.member)
+
+        project = Project.objects.create(name="Project 1", team=self.team1, created_by=self.owner)
+        self.task = Task.objects.create(title="Task 1", description="d", project=project, created_by=self.owner)
+        metrics.reset()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def lookups(self):
+        data = metrics.snapshot()
+        return data["teams.visible.hit"], data["teams.visible.miss"]
+
+    # ==========================================================
+    # LOOKUP
+    # ==========================================================
+
+    def test_owned_and_member_teams(self):
+        self.assertEqual(visible_team_ids(self.member), (self.team1.id, self.team2.id))
+        self.assertEqual(visible_team_ids(self.owner), (self.team1.id,))
+
+    def test_second_lookup_is_a_hit(self):
+        with self.assertNumQueries(1):
+            visible_team_ids(self.member)
+        with self.assertNumQueries(0):
+            visible_team_ids(self.member)
+        self.assertEqual(self.lookups(), (1, 1))
+
+    def test_one_shared_lookup_per_request(self):
+        self.client.force_authenticate(user=self.member)
+        self.client.get(reverse("task-list"))  # ETag check + queryset
+        self.assertEqual(sum(self.lookups()), 1)
+
+    # ==========================================================
+    # INVALIDATION
+    # ==========================================================
+
+    def test_membership_changes(self):
+        visible_team_ids(self.owner)
+        self.team2.members.add(self.owner)
+        self.assertIn(self.team2.id, visible_team_ids(self.owner))
+
+        self.owner.teams.remove(self.team2)
+        self.assertNotIn(self.team2.id, visible_team_ids(self.owner))
+
+        self.team1.members.clear()
+        self.assertEqual(visible_team_ids(self.member), (self.team2.id,))
+
+    def test_team_create_delete_and_owner_change(self):
+        visible_team_ids(self.owner)
+        team3 = Teams.objects.create(name="Team 3", owner=self.owner)
+        self.assertIn(team3.id, visible_team_ids(self.owner))
+
+        team3 = Teams.objects.get(pk=team3.pk)
+        team3.owner = self.admin
+        team3.save()
+        self.assertNotIn(team3.id, visible_team_ids(self.owner))
+        self.assertIn(team3.id, visible_team_ids(self.admin))
+
+        self.team1.delete()
+        self.assertEqual(visible_team_ids(self.member), (self.team2.id,))
+
+    def test_removed_member_loses_access_at_once(self):
+        url = reverse("task-detail", kwargs={"pk": self.task.id})
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.team1.members.remove(self.member)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_load_that_lost_the_race_with_a_removal_is_not_kept(self):
+        load = team_cache._load
+
+        def racing(user_id):
+            ids = load(user_id)
+            # the removal commits between the miss's query and its fill
+            with self.captureOnCommitCallbacks(execute=True):
+                self.team1.members.remove(self.member)
+            return ids
+
+        with override_settings(SHARED_CACHE=True), mock.patch.object(team_cache, "_load", racing):
+            self.assertIn(self.team1.id, visible_team_ids(self.member))
+        self.assertEqual(visible_team_ids(self.member), (self.team2.id,))
+
+    def test_entries_are_short_lived_without_a_shared_cache(self):
+        # other workers' deletes can't reach a per-process cache
+        for shared, timeout in ((False, team_cache.LOCAL_TIMEOUT), (True, team_cache.TIMEOUT)):
+            cache.clear()
+            with override_settings(SHARED_CACHE=shared), mock.patch.object(cache, "set", wraps=cache.set) as set_:
+                visible_team_ids(self.member)
+            self.assertEqual(set_.call_args.args[2], timeout)
+
+    # ==========================================================
+    # METRICS ENDPOINT
+    # ==========================================================
+
+    def test_metrics_endpoint(self):
+        visible_team_ids(self.member)
+        visible_team_ids(self.member)
+        visible_team_ids(self.member)
+
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.get(reverse("metrics"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["teams.visible.miss"], 1)
+        self.assertEqual(res.data["teams.visible.hit"], 2)
+        self.assertEqual(res.data["teams.visible.hit_rate"], 0.6667)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN)
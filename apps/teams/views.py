@@ -1,22 +1,39 @@
-from django.db.models import Q
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from apps.core.etag import ConditionalGetMixin
+from apps.tasks.stats import team_stats
 
 from .models import Teams
+from .visibility import visible_teams_q, visible_team_versions
 from .serializers import TeamSerialiser
 
 
 
-class TeamsView(ModelViewSet):
+class TeamsView(ConditionalGetMixin, ModelViewSet):
     serializer_class = TeamSerialiser
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
-        return Teams.objects.filter(
-            Q(owner=user) | Q(members=user)
-        ).distinct().select_related('owner').prefetch_related('members')
+        queryset = Teams.objects.filter(visible_teams_q(user, field='pk'))
+        if self.action == 'stats':
+            return queryset
+        return queryset.select_related('owner').prefetch_related('members')
+
+    def get_list_versions(self):
+        return visible_team_versions(self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        GET /api/teams/<id>/stats/
+        Status x priority counts, overdue tasks and open tasks per assignee.
+        """
+        return Response(team_stats(self.get_object()))
 
 
     def perform_update(self, serializer):
@@ -0,0 +1,27 @@
+from django.db.models import Q
+
+from .cache import visible_team_ids, avisible_team_ids
+from .models import Teams
+
+
+def visible_teams_q(user, field='team'):
+    """
+    Q for rows whose `field` is a team the user owns or belongs to
+    (field='pk' filters Teams itself).
+
+    The team ids come from the visible-team cache, so the filter is a plain
+    IN (...) list on the indexed team column: no subqueries, no DISTINCT.
+    """
+    return Q(**{'%s__in' % field: visible_team_ids(user)})
+
+
+async def avisible_teams_q(user, field='team'):
+    """visible_teams_q() for the async views."""
+    return Q(**{'%s__in' % field: await avisible_team_ids(user)})
+
+
+def visible_team_versions(user):
+    """(team id, version) for every team the user can see, the ETag input for list endpoints."""
+    return list(
+        Teams.objects.filter(visible_teams_q(user, field='pk')).order_by('pk').values_list('pk', 'version')
+    )
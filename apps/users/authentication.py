@@ -0,0 +1,161 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from apps.core import metrics
+from . import cache as user_cache
+from .tokens import USER_CLAIMS, VERSION_CLAIM
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication for the async views (apps/core/asyncviews.py). The
+    token is checked exactly like the sync path does it (that part is pure
+    CPU); only the user lookup changes, it goes through the async ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class StatelessJWTAuthentication(AsyncJWTAuthentication):
+    """
+    JWTAuthentication without the user SELECT. A validated token is kept
+    in a per-process LRU (apps/users/cache.py) with the user state it
+    resolves to: its claims (apps/users/tokens.py) or, for a token without
+    them, the row read the first time it is seen. While the state's version
+    is the user's current User.auth_version (a shared-cache read), the user
+    is built from it: id, role, is_active, is_staff and is_superuser loaded,
+    the rest deferred, so a view that touches another field reads the row
+    then. Otherwise the row is read as usual and becomes the new state.
+
+    A version change only reaches the other workers through a shared cache
+    (settings.SHARED_CACHE); without one the row is read on every request,
+    as JWTAuthentication does.
+    """
+    state_fields = ('id', 'role', 'is_active', 'is_staff', 'is_superuser', 'auth_version')
+
+    def authenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+        return self.resolve(raw_token)
+
+    async def aauthenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+        return await self.aresolve(raw_token)
+
+    def get_request_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        return self.get_raw_token(header)
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+    def resolve(self, raw_token):
+        """(user, validated token) for a raw token, like authenticate()."""
+        validated_token, state, hit = self.lookup(raw_token)
+        metrics.incr(user_cache.HIT if hit else user_cache.MISS)
+        shared = user_cache.shared()
+        if shared and state is not None and state[-1] == user_cache.auth_version(state[0]):
+            return self.build_user(state), validated_token
+        user = self.get_user(validated_token)
+        if shared and state is None:
+            # the next request checks this version; the row read above can't fill it
+            user_cache.auth_version(user.pk)
+        return self.refresh(raw_token, validated_token, user)
+
+    async def aresolve(self, raw_token):
+        validated_token, state, hit = self.lookup(raw_token)
+        await metrics.aincr(user_cache.HIT if hit else user_cache.MISS)
+        shared = user_cache.shared()
+        if shared and state is not None and state[-1] == await user_cache.aauth_version(state[0]):
+            return self.build_user(state), validated_token
+        user = await self.aget_user(validated_token)
+        if shared and state is None:
+            await user_cache.aauth_version(user.pk)
+        return self.refresh(raw_token, validated_token, user)
+
+    def lookup(self, raw_token):
+        """
+        The validated token, the state cached for it (None if none yet) and
+        whether it came from the LRU.
+        """
+        entry = user_cache.tokens.get(raw_token)
+        if entry is not None and entry[0].get('exp', 0) > time.time():
+            return (*entry, True)
+        user_cache.tokens.pop(raw_token)
+        validated_token = self.get_validated_token(raw_token)
+        state = self.claims_state(validated_token)
+        user_cache.tokens.set(raw_token, (validated_token, state))
+        return validated_token, state, False
+
+    def refresh(self, raw_token, validated_token, user):
+        user_cache.tokens.set(raw_token, (validated_token, self.user_state(user)))
+        return user, validated_token
+
+    # ------------------------------------------------------------------
+    # User state: the values of state_fields
+    # ------------------------------------------------------------------
+    def claims_state(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # needs the password hash, i.e. the row
+            return None
+        try:
+            user_id = self.user_model._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+            claims = tuple(validated_token[name] for name in USER_CLAIMS)
+            return (user_id, *claims, validated_token[VERSION_CLAIM])
+        except (KeyError, ValidationError):
+            return None
+
+    def user_state(self, user):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return None
+        return tuple(getattr(user, name) for name in self.state_fields)
+
+    def build_user(self, state):
+        values = dict(zip(self.state_fields, state))
+        if api_settings.CHECK_USER_IS_ACTIVE and not values['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        # from_db() takes the loaded fields in model order
+        names = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in values]
+        return self.user_model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
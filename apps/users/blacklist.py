@@ -0,0 +1,188 @@
+"""
+Which refresh tokens might be blacklisted, without the BlacklistedToken /
+OutstandingToken join.
+
+Each worker keeps a Bloom filter of the JTIs of the blacklisted tokens
+that haven't expired (an expired token is refused anyway). A JTI the
+filter doesn't know is certainly not blacklisted; only the rest are
+checked in the database (RefreshToken.check_blacklist in tokens.py).
+
+The filter is built from the database the first time it is used, again
+once a day (to drop expired JTIs) or when it is over capacity. Tokens
+blacklisted since are added by the signal in signals.py: to this
+worker's filter right away and, after commit, to a numbered log in the
+shared Django cache that the other workers read before each check. The
+log is numbered within an epoch, a random id that publish() draws anew
+whenever it finds the counter gone; a worker that finds another epoch,
+or a gap in the log (evicted, cache cleared), rebuilds.
+
+Other workers only see the log through a shared cache
+(settings.SHARED_CACHE). Without one there is no filter: every check
+goes to the database.
+
+Metrics: users.blacklist.skipped (checks answered by the filter),
+.checked / .false_positive (database checks, and those that found
+nothing), .false_positive_rate (of the tokens that aren't blacklisted),
+and the gauges .entries, .memory_bytes and .expected_false_positive_rate
+of the last filter a worker built or grew.
+"""
+import hashlib
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.core import metrics
+
+EPOCH_KEY = 'users:blacklist:epoch'
+SEQ_KEY = 'users:blacklist:seq'
+JTI_KEY = 'users:blacklist:jti:%s:%s'
+LOG_TIMEOUT = 60 * 60
+# past this many unread log entries, rebuilding is cheaper
+MAX_LAG = 1000
+REBUILD_AFTER = 24 * 60 * 60
+
+SKIPPED = metrics.counter('users.blacklist.skipped')
+CHECKED = metrics.counter('users.blacklist.checked')
+FALSE_POSITIVE = metrics.counter('users.blacklist.false_positive')
+FALSE_POSITIVE_RATE = metrics.ratio('users.blacklist.false_positive_rate', FALSE_POSITIVE,
+                                    [FALSE_POSITIVE, SKIPPED])
+ENTRIES = metrics.gauge('users.blacklist.entries')
+MEMORY = metrics.gauge('users.blacklist.memory_bytes')
+EXPECTED_RATE = metrics.gauge('users.blacklist.expected_false_positive_rate')
+
+
+class BloomFilter:
+    """`capacity` entries at `error_rate` false positives, k hashes by double hashing."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def memory(self):
+        return len(self.bits)
+
+    @property
+    def error_rate(self):
+        """Expected false-positive rate at the current count."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class BlacklistFilter:
+    """This worker's filter, and its position in the shared log."""
+
+    def __init__(self):
+        self.capacity = getattr(settings, 'BLACKLIST_FILTER_CAPACITY', 10000)
+        self.error_rate = getattr(settings, 'BLACKLIST_FILTER_ERROR_RATE', 0.001)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drops the filter; the next check rebuilds it."""
+        self.bloom = None
+        self.epoch, self.seq = None, 0
+        self.built_at = 0
+
+    def rebuild(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        # read first: whatever is logged after that is read on the next check
+        epoch, seq = _position()
+        jtis = (BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+                .values_list('token__jti', flat=True))
+        bloom = BloomFilter(max(self.capacity, 2 * jtis.count()), self.error_rate)
+        for jti in jtis.iterator():
+            bloom.add(jti)
+        self.bloom, self.epoch, self.seq, self.built_at = bloom, epoch, seq, time.monotonic()
+        self.publish_stats()
+
+    def publish_stats(self):
+        metrics.set_value(ENTRIES, self.bloom.count)
+        metrics.set_value(MEMORY, self.bloom.memory)
+        metrics.set_value(EXPECTED_RATE, round(self.bloom.error_rate, 6))
+
+    def sync(self):
+        """Catches up with the shared log, rebuilding when that isn't possible."""
+        if (self.bloom is None or self.bloom.count > self.bloom.capacity
+                or time.monotonic() - self.built_at > REBUILD_AFTER):
+            return self.rebuild()
+        epoch, seq = _position()
+        if (epoch, seq) == (self.epoch, self.seq):
+            return
+        if epoch != self.epoch or seq < self.seq or seq - self.seq > MAX_LAG:
+            return self.rebuild()
+        keys = [JTI_KEY % (epoch, n) for n in range(self.seq + 1, seq + 1)]
+        jtis = cache.get_many(keys)
+        if len(jtis) < len(keys):
+            return self.rebuild()
+        for jti in jtis.values():
+            self.bloom.add(jti)
+        self.seq = seq
+        self.publish_stats()
+
+    def might_contain(self, jti):
+        if not getattr(settings, 'SHARED_CACHE', False):
+            return True
+        with self._lock:
+            self.sync()
+            found = jti in self.bloom
+        if not found:
+            metrics.incr(SKIPPED)
+        return found
+
+    def add(self, jti):
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+                self.publish_stats()
+
+    def confirmed(self, blacklisted):
+        """Records the outcome of a database check after might_contain()."""
+        metrics.incr(CHECKED)
+        if not blacklisted:
+            metrics.incr(FALSE_POSITIVE)
+
+
+def _position():
+    """The shared log's (epoch, seq); (None, 0) before anything is published."""
+    log = cache.get_many([EPOCH_KEY, SEQ_KEY])
+    return log.get(EPOCH_KEY), log.get(SEQ_KEY, 0)
+
+
+def publish(jti):
+    """Appends `jti` to the shared log; call after commit."""
+    epoch, seq = cache.get(EPOCH_KEY), None
+    if epoch is not None:
+        try:
+            seq = cache.incr(SEQ_KEY)
+        except ValueError:
+            pass
+    if seq is None:
+        # counter gone: a new epoch, so nobody mistakes its numbers for the old ones
+        epoch, seq = uuid.uuid4().hex, 1
+        cache.set_many({EPOCH_KEY: epoch, SEQ_KEY: seq}, timeout=None)
+    cache.set(JTI_KEY % (epoch, seq), jti, LOG_TIMEOUT)
+
+
+blacklist = BlacklistFilter()
@@ -0,0 +1,108 @@
+"""
+What apps/users/authentication.py needs to trust a token without reading
+the user row.
+
+Two layers:
+
+    versions   User.auth_version per user, in the shared Django cache so
+               every worker sees a change at once. Invalidated by the user
+               signals in signals.py through apps/core/generations.py, so
+               a miss that read the row before the write can't cache the
+               old version after it. Only trusted with a shared cache
+               (settings.SHARED_CACHE, see shared()).
+    tokens     a per-process LRU of validated access tokens and the user
+               state they resolve to (settings.AUTH_TOKEN_CACHE_SIZE
+               entries). Only used while the state's version is the
+               current one.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from apps.core import generations, metrics
+from .models import User
+
+KEY = 'users:auth_version:%s'
+TIMEOUT = 60 * 60
+
+HIT = metrics.counter('users.token.hit')
+MISS = metrics.counter('users.token.miss')
+
+
+# ----------------------------
+# VERSIONS
+# ----------------------------
+def shared():
+    """Whether an invalidated version is gone for every worker, not just this one."""
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _query(user_id):
+    return User.objects.filter(pk=user_id).values_list('auth_version', flat=True)
+
+
+def auth_version(user_id):
+    """The user's current auth_version, None if there is no such user."""
+    key = KEY % user_id
+    version, generation = generations.lookup(key)
+    if version is None:
+        version = _query(user_id).first()
+        if version is not None:
+            generations.fill(key, generation, version, TIMEOUT)
+    return version
+
+
+async def aauth_version(user_id):
+    key = KEY % user_id
+    version, generation = await generations.alookup(key)
+    if version is None:
+        version = await _query(user_id).afirst()
+        if version is not None:
+            await generations.afill(key, generation, version, TIMEOUT)
+    return version
+
+
+def invalidate(user_id):
+    generations.invalidate([KEY % user_id])
+
+
+# ----------------------------
+# TOKENS
+# ----------------------------
+class TokenCache:
+    """A thread-safe LRU: raw token -> (validated token, user state)."""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry is not None:
+                self._entries.move_to_end(raw_token)
+            return entry
+
+    def set(self, raw_token, entry):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[raw_token] = entry
+            self._entries.move_to_end(raw_token)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def pop(self, raw_token):
+        with self._lock:
+            self._entries.pop(raw_token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+tokens = TokenCache(getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000))
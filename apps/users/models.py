@@ -1,12 +1,59 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
 
-class User(AbstractUser):
+from apps.core.models import CounterFieldsModel
+
+class User(CounterFieldsModel, AbstractUser):
     ROLE_CHOICES = (
         ('admin', 'Admin'),
         ('team_owner', 'Team Owner'),
         ('member', 'Member'),
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='member')
-  
+    # moves on whenever one of AUTH_FIELDS changes; access tokens resolved
+    # without a query (apps/users/authentication.py) are only trusted while
+    # it matches
+    auth_version = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ('auth_version',)
+
+    class Meta(AbstractUser.Meta):
+        pass
+
+    # what a token-resolved user carries, and what invalidates it
+    AUTH_FIELDS = ('role', 'is_active', 'is_staff', 'is_superuser', 'password')
+
+    _loaded_auth = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_auth = {name: instance.__dict__[name] for name in cls.AUTH_FIELDS
+                                 if name in instance.__dict__}
+        return instance
+
+    def auth_changed(self, update_fields=None):
+        """Whether the save about to happen writes a different AUTH_FIELDS value."""
+        if self._state.adding or self._loaded_auth is None:
+            return False
+        loaded = self._loaded_auth
+        names = self.AUTH_FIELDS if update_fields is None else set(self.AUTH_FIELDS) & set(update_fields)
+        # a field deferred at load time and set since counts as changed
+        return any(name in self.__dict__ and (name not in loaded or self.__dict__[name] != loaded[name])
+                   for name in names)
 
+    def save(self, *args, **kwargs):
+        bump = self.auth_changed(kwargs.get('update_fields'))
+        if bump:
+            # in the UPDATE that writes the fields: nobody reads the new
+            # version with the old role, or the other way round
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [*update_fields, 'auth_version']
+            self.auth_version = F('auth_version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['auth_version'])
+        self._loaded_auth = {name: self.__dict__[name] for name in self.AUTH_FIELDS if name in self.__dict__}
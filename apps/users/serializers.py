@@ -16,6 +16,13 @@ class UserSerializer(serializers.ModelSerializer):
             'is_active',
         ]
 
+#____________________________________________________________________________________________
+class UserCardSerializer(serializers.ModelSerializer):
+    """The few user fields shown next to content the user wrote."""
+    class Meta:
+        model = User
+        fields = ['id', 'username']
+
 #____________________________________________________________________________________________
 class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .models import User
+from . import cache
+from .blacklist import blacklist, publish
+
+
+# ----------------------------
+# AUTH VERSION CACHE
+# ----------------------------
+@receiver(post_save, sender=User)
+def invalidate_auth_version_on_save(sender, instance, created, update_fields=None, **kwargs):
+    # a login only writes last_login; on create too, as ids can be reused
+    # (e.g. SQLite after a rollback)
+    if not created and update_fields is not None and not set(update_fields) & set(User.AUTH_FIELDS):
+        return
+    cache.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_auth_version_on_delete(sender, instance, **kwargs):
+    cache.invalidate(instance.pk)
+
+
+# ----------------------------
+# BLACKLIST FILTER
+# ----------------------------
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_blacklist_filter(sender, instance, created, **kwargs):
+    # logout, rotation or the admin: any way a token gets blacklisted
+    if created:
+        jti = instance.token.jti
+        blacklist.add(jti)
+        transaction.on_commit(lambda: publish(jti))
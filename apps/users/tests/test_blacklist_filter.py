@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from apps.core import metrics
+from apps.users import blacklist as blacklist_module
+from apps.users.blacklist import BloomFilter, BlacklistFilter, blacklist
+from apps.users.tokens import RefreshToken
+
+User = get_user_model()
+
+
+class BloomFilterTests(APITestCase):
+
+    def test_no_false_negatives_and_the_expected_error_rate(self):
+        bloom = BloomFilter(2000, 0.01)
+        keys = [f"jti-{i}" for i in range(2000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+        self.assertAlmostEqual(bloom.error_rate, 0.01, delta=0.002)
+        # ~9.6 bits per entry at 1%
+        self.assertLess(bloom.memory, 2000 * 10 / 8 + 8)
+
+
+@override_settings(SHARED_CACHE=True)
+class BlacklistFilterTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()  # the login throttle, the shared log and the metrics
+        blacklist.reset()
+        self.user = User.objects.create_user(username="member", password="MemberPass123!")
+        self.refresh_url = reverse("token_refresh")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def login(self):
+        res = self.client.post("/api/users/login/", {"username": "member", "password": "MemberPass123!"},
+                               format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        return res.data["refresh"]
+
+    def blacklist_queries(self, refresh):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(self.refresh_url, {"refresh": refresh}, format="json")
+        return res, [q["sql"] for q in ctx.captured_queries if "token_blacklist_blacklistedtoken" in q["sql"]]
+
+    # ==========================================================
+    # REFRESH AND LOGOUT
+    # ==========================================================
+
+    def test_refresh_skips_the_blacklist_query(self):
+        refresh = self.login()
+        self.client.post(self.refresh_url, {"refresh": refresh}, format="json")   # builds the filter
+        res, queries = self.blacklist_queries(refresh)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("access", res.data)
+        self.assertEqual(queries, [])
+        self.assertEqual(metrics.snapshot()["users.blacklist.skipped"], 2)
+
+    def test_logged_out_token_is_refused(self):
+        refresh = self.login()
+        res = self.client.post(reverse("user-logout"), {"refresh": refresh}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_205_RESET_CONTENT)
+
+        res, queries = self.blacklist_queries(refresh)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(queries), 1)
+        data = metrics.snapshot()
+        self.assertEqual((data["users.blacklist.checked"], data["users.blacklist.false_positive"]), (1, 0))
+
+        # logging out twice is refused by the filter and the database too
+        res = self.client.post(reverse("user-logout"), {"refresh": refresh}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_false_positives_are_counted(self):
+        token = RefreshToken.for_user(self.user)
+        blacklist.might_contain("warm")
+        blacklist.add(token["jti"])   # as if the filter had collided
+        token.check_blacklist()
+        data = metrics.snapshot()
+        self.assertEqual((data["users.blacklist.false_positive"], data["users.blacklist.false_positive_rate"]),
+                         (1, 0.5))
+
+    # ==========================================================
+    # REBUILDS AND OTHER WORKERS
+    # ==========================================================
+
+    def test_rebuilt_from_the_database(self):
+        token = RefreshToken.for_user(self.user)
+        token.blacklist()
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired["jti"]).update(expires_at=timezone.now() - timedelta(days=1))
+
+        blacklist.reset()
+        self.assertTrue(blacklist.might_contain(token["jti"]))
+        self.assertEqual(metrics.snapshot()["users.blacklist.entries"], 1)
+        self.assertGreater(metrics.snapshot()["users.blacklist.memory_bytes"], 0)
+
+    def test_other_workers_read_the_shared_log(self):
+        other = BlacklistFilter()
+        with self.captureOnCommitCallbacks(execute=True):
+            RefreshToken.for_user(self.user).blacklist()   # starts the log
+        self.assertFalse(other.might_contain("nothing"))
+
+        token = RefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(other.might_contain(token["jti"]))
+        # read from the log, not rebuilt
+        self.assertEqual(ctx.captured_queries, [])
+
+    def test_gap_in_the_log_rebuilds(self):
+        other = BlacklistFilter()
+        with self.captureOnCommitCallbacks(execute=True):
+            RefreshToken.for_user(self.user).blacklist()
+        other.might_contain("nothing")
+        token = RefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+        cache.delete(blacklist_module.JTI_KEY % (other.epoch, 2))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(other.might_contain(token["jti"]))
+        self.assertTrue(ctx.captured_queries)
+        self.assertEqual(other.seq, 2)
+
+    def test_reset_counter_rebuilds(self):
+        other = BlacklistFilter()
+        first = RefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.blacklist()
+        self.assertTrue(other.might_contain(first["jti"]))
+        epoch = other.epoch
+
+        # evicted: the next publish starts again at 1, the number this worker has read up to
+        cache.delete(blacklist_module.SEQ_KEY)
+        second = RefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.blacklist()
+        self.assertTrue(other.might_contain(second["jti"]))
+        self.assertNotEqual(other.epoch, epoch)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_process_local_cache_checks_the_database(self):
+        refresh = self.login()
+        self.client.post(self.refresh_url, {"refresh": refresh}, format="json")
+        res, queries = self.blacklist_queries(refresh)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertIsNone(blacklist.bloom)
@@ -0,0 +1,179 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users import cache as user_cache
+from apps.users.tokens import VERSION_CLAIM
+
+User = get_user_model()
+
+
+@override_settings(SHARED_CACHE=True)
+class StatelessAuthTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()  # the login throttle
+        user_cache.tokens.clear()
+        self.admin = User.objects.create_user(username="admin", password="AdminPass123!", role="admin")
+        self.member = User.objects.create_user(username="member", password="MemberPass123!")
+        self.login_url = "/api/users/login/"
+        self.user_list_url = reverse("user-list")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def login(self, username="admin", password="AdminPass123!"):
+        res = self.client.post(self.login_url, {"username": username, "password": password}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        return res.data["access"]
+
+    def user_queries(self, url):
+        """The response and the queries that touched users_user."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        return res, [q["sql"] for q in ctx.captured_queries if "users_user" in q["sql"]]
+
+    def usernames(self, res):
+        return sorted(row["username"] for row in res.json())
+
+    # ==========================================================
+    # CLAIMS AND THE WARM PATH
+    # ==========================================================
+
+    def test_tokens_carry_the_claims(self):
+        for token in (self.login(),
+                      self.client.post(reverse("token_obtain_pair"),
+                                       {"username": "admin", "password": "AdminPass123!"}).data["access"]):
+            claims = AccessToken(token)
+            self.assertEqual((claims["role"], claims["is_active"], claims["is_staff"], claims[VERSION_CLAIM]),
+                             ("admin", True, False, 0))
+
+    def test_warm_get_skips_the_user_lookup(self):
+        self.login("member", "MemberPass123!")
+        self.client.get(reverse("projects-list"))   # warm the version and visible-team caches
+        res, queries = self.user_queries(reverse("projects-list"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_resolved_user_reads_other_fields_on_demand(self):
+        self.login()
+        self.client.get(self.user_list_url)
+        res = self.client.get(self.user_list_url)
+        # the admin branch of UserViewSet saw the role from the token
+        self.assertEqual(self.usernames(res), ["admin", "member"])
+
+    def test_token_without_claims_is_read_once(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.member)}")
+        res, queries = self.user_queries(reverse("projects-list"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(queries)
+        res, queries = self.user_queries(reverse("projects-list"))
+        self.assertEqual(queries, [])
+
+    def test_async_views(self):
+        access = self.login("member", "MemberPass123!")
+        get = async_to_sync(self.async_client.get)
+        headers = {"Authorization": f"Bearer {access}"}
+        get(reverse("async-project-list"), headers=headers)
+        with CaptureQueriesContext(connection) as ctx:
+            res = get(reverse("async-project-list"), headers=headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in ctx.captured_queries if "users_user" in q["sql"]])
+
+    # ==========================================================
+    # INVALIDATION
+    # ==========================================================
+
+    def test_role_change_applies_to_issued_tokens(self):
+        self.login()
+        self.assertEqual(self.usernames(self.client.get(self.user_list_url)), ["admin", "member"])
+
+        self.admin.role = "member"
+        self.admin.save()
+        self.assertEqual(self.usernames(self.client.get(self.user_list_url)), ["admin"])
+
+    def test_deactivated_user_is_rejected(self):
+        self.login("member", "MemberPass123!")
+        self.assertEqual(self.client.get(reverse("projects-list")).status_code, status.HTTP_200_OK)
+
+        member = User.objects.get(pk=self.member.pk)
+        member.is_active = False
+        member.save(update_fields=["is_active"])
+        self.assertEqual(self.client.get(reverse("projects-list")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.login("member", "MemberPass123!")
+        self.client.get(reverse("projects-list"))
+        self.member.delete()
+        self.assertEqual(self.client.get(reverse("projects-list")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_version_moves_only_for_auth_fields(self):
+        user = User.objects.get(pk=self.member.pk)
+        user.email = "member@test.com"
+        user.last_login = None
+        user.save()
+        self.assertEqual(User.objects.get(pk=user.pk).auth_version, 0)
+
+        user.set_password("NewPass123!")
+        user.save(update_fields=["password"])
+        self.assertEqual(User.objects.get(pk=user.pk).auth_version, 1)
+
+        # logging in only writes last_login
+        self.login("member", "NewPass123!")
+        self.assertEqual(User.objects.get(pk=user.pk).auth_version, 1)
+
+    def test_stale_copy_cannot_roll_the_version_back(self):
+        stale = User.objects.get(pk=self.member.pk)
+        fresh = User.objects.get(pk=self.member.pk)
+        fresh.role = "team_owner"
+        fresh.save()
+        stale.first_name = "M"
+        stale.save()
+        self.assertEqual(User.objects.get(pk=self.member.pk).auth_version, 1)
+
+    def test_version_moves_in_the_same_update(self):
+        user = User.objects.get(pk=self.member.pk)
+        user.role = "team_owner"
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"auth_version" = ("users_user"."auth_version" + 1)', updates[0])
+        self.assertEqual(user.auth_version, 1)
+
+    def test_late_miss_cannot_cache_the_old_version(self):
+        query = user_cache._query
+
+        def racing(user_id):
+            stale = query(user_id).first()
+            # the write commits and invalidates before the miss caches what it read
+            with self.captureOnCommitCallbacks(execute=True):
+                member = User.objects.get(pk=user_id)
+                member.is_active = False
+                member.save()
+            return mock.Mock(first=lambda: stale)
+
+        with mock.patch.object(user_cache, "_query", racing):
+            self.assertEqual(user_cache.auth_version(self.member.pk), 0)
+        self.assertEqual(user_cache.auth_version(self.member.pk), 1)
+
+    def test_process_local_cache_reads_the_row(self):
+        self.login("member", "MemberPass123!")
+        with self.settings(SHARED_CACHE=False):
+            self.client.get(reverse("projects-list"))
+            res, queries = self.user_queries(reverse("projects-list"))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(queries)
+            # as if deactivated by another worker: no invalidation reaches this one
+            User.objects.filter(pk=self.member.pk).update(is_active=False)
+            self.assertEqual(self.client.get(reverse("projects-list")).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,63 @@
+"""
+JWTs that carry what StatelessJWTAuthentication (authentication.py) needs
+to resolve the user without reading its row:
+
+    role, is_active, is_staff, is_superuser   as when the token was issued
+    ver                                       User.auth_version at that time
+
+The claims are only believed while `ver` is the user's current version;
+any change to those fields (or the password) moves it on.
+
+Refresh tokens are checked against the blacklist through the filter in
+blacklist.py first.
+"""
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .blacklist import blacklist
+
+VERSION_CLAIM = 'ver'
+USER_CLAIMS = ('role', 'is_active', 'is_staff', 'is_superuser')
+
+
+class UserClaimsMixin:
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for name in USER_CLAIMS:
+            token[name] = getattr(user, name)
+        token[VERSION_CLAIM] = user.auth_version
+        return token
+
+
+class AccessToken(UserClaimsMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(UserClaimsMixin, tokens.RefreshToken):
+    # refresh.access_token copies the claims over; a token refreshed later
+    # keeps the old ones and is read from the database once the version moved
+    access_token_class = AccessToken
+
+    def check_blacklist(self):
+        if not blacklist.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            return
+        try:
+            super().check_blacklist()
+        except TokenError:
+            blacklist.confirmed(True)
+            raise
+        blacklist.confirmed(False)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """/api/token/ hands out the same tokens as /api/users/login/."""
+    token_class = RefreshToken
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    """/api/token/refresh/, with the blacklist check of RefreshToken above."""
+    token_class = RefreshToken
@@ -5,7 +5,8 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
+from .tokens import RefreshToken
 from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.throttling import ScopedRateThrottle
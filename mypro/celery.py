@@ -13,4 +13,8 @@ app.conf.beat_schedule = {
         'task': 'apps.users.tasks.deactivate_inactive_users',
         'schedule': crontab(hour=0, minute=0),  # هر روز ساعت ۰۰:۰۰
     },
+    'reconcile-project-stats-nightly': {
+        'task': 'apps.tasks.tasks.reconcile_project_stats',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
\ No newline at end of file
@@ -40,10 +40,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'rest_framework',
+    'apps.core',
     'apps.users',
     'apps.teams',
     'apps.projects',
     'apps.tasks',
+    'apps.search',
+    'apps.events',
+    'apps.sync',
     'rest_framework_simplejwt', 
     'rest_framework_simplejwt.token_blacklist',
     'drf_spectacular',
@@ -82,6 +86,22 @@ TEMPLATES = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Attachment downloads (apps/tasks/downloads.py): None sends the file from
+# Django; 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd)
+# leaves it to the proxy, which serves ATTACHMENT_ACCEL_PREFIX from MEDIA_ROOT
+ATTACHMENT_OFFLOAD = None
+ATTACHMENT_ACCEL_PREFIX = '/protected-media/'
+
+# project event streams (apps/events): LocalBackend only reaches streams in the
+# same process; with several workers use
+#   EVENTS_BACKEND = 'apps.events.backends.RedisBackend'
+#   EVENTS_BACKEND_OPTIONS = {'url': 'redis://localhost:6379/0', 'history': 1000}
+EVENTS_BACKEND = 'apps.events.backends.LocalBackend'
+EVENTS_BACKEND_OPTIONS = {'history': 1000}
+# seconds between keepalive comments, and before a stream is closed (the client reconnects)
+EVENTS_KEEPALIVE = 15
+EVENTS_STREAM_TIMEOUT = 300
+
 
 WSGI_APPLICATION = 'mypro.wsgi.application'
 
@@ -97,6 +117,20 @@ DATABASES = {
 }
 
 
+# Cache
+# The visible-team cache (apps/teams/cache.py), the auth versions
+# (apps/users/cache.py), the blacklist log (apps/users/blacklist.py) and
+# the metrics must be seen by every worker: set REDIS_URL. Without it
+# each process has its own LocMemCache, fine for a single process
+# (runserver, tests); SHARED_CACHE tells the caches which one they run on.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED_CACHE = bool(REDIS_URL)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -134,7 +168,7 @@ USE_TZ = True
 STATIC_URL = 'static/'
 
 REST_FRAMEWORK = { 'DEFAULT_AUTHENTICATION_CLASSES':
-                   ('rest_framework_simplejwt.authentication.JWTAuthentication', ),
+                   ('apps.users.authentication.StatelessJWTAuthentication', ),
                     'EXCEPTION_HANDLER': 'apps.users.utils.custom_exception_handler',
                     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
                     'DEFAULT_THROTTLE_RATES': {
@@ -148,8 +182,20 @@ SIMPLE_JWT = {
     # Token lifetimes
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),   # Short-lived access token
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),     # Refresh token validity
+    # tokens carry role / is_active / version claims (apps/users/tokens.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'apps.users.tokens.ClaimsTokenObtainPairSerializer',
+    # blacklist checks through the filter in apps/users/blacklist.py
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.tokens.FilteredTokenRefreshSerializer',
 }
 
+# validated access tokens each worker keeps (apps/users/cache.py)
+AUTH_TOKEN_CACHE_SIZE = 10000
+
+# refresh-token blacklist filter (apps/users/blacklist.py): sized for this
+# many unexpired blacklisted tokens (it grows past it) at this false-positive rate
+BLACKLIST_FILTER_CAPACITY = 10000
+BLACKLIST_FILTER_ERROR_RATE = 0.001
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Task & Team Management API',
     'DESCRIPTION': 'A simple Trello/Jira-like API with JWT auth, permissions, and tests.',
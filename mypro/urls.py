@@ -19,8 +19,8 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from django.conf import settings
-from django.conf.urls.static import static
+from apps.tasks.asyncviews import AsyncTaskListView, AsyncTaskDetailView, AsyncCommentListView
+from apps.projects.asyncviews import AsyncProjectListView
 
 
 urlpatterns = [
@@ -29,10 +29,19 @@ urlpatterns = [
     path('api/teams/', include('apps.teams.urls')),   
     path('api/projects/', include('apps.projects.urls')), 
     path('api/tasks/', include('apps.tasks.urls')),
+    path('api/search/', include('apps.search.urls')),
+    path('api/sync/', include('apps.sync.urls')),
+    path('api/metrics/', include('apps.core.urls')),
+    # native async reads, see apps/core/asyncviews.py
+    path('api/async/tasks/', AsyncTaskListView.as_view(), name='async-task-list'),
+    path('api/async/tasks/<int:pk>/', AsyncTaskDetailView.as_view(), name='async-task-detail'),
+    path('api/async/tasks/<int:task_id>/comments/', AsyncCommentListView.as_view(), name='async-task-comments'),
+    path('api/async/projects/', AsyncProjectListView.as_view(), name='async-project-list'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'), 
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'), 
     # swagger
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# no route for MEDIA_URL: attachments are only served by /api/tasks/<id>/attachment/,
+# after the task's permission check (apps/tasks/downloads.py)